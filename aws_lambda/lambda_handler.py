@@ -1,22 +1,39 @@
-import json
 import logging
 import os
 import sys
 
-# Agrega el directorio raíz al path para encontrar el módulo 'src'
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# Agrega el directorio raíz al path para encontrar el módulo 'src' (una sola vez por proceso)
+RAIZ_PROYECTO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if RAIZ_PROYECTO not in sys.path:
+    sys.path.insert(0, RAIZ_PROYECTO)
 
-from src.services import ConsultaNitService, DatosGovCoService, RuesService
-from src.exceptions import NitNotFoundError, DataSourceError
+from src.configuracion import crear_manejador_consultas, crear_plazo
+from src.manejador import RespuestaHttp, SolicitudHttp
 
 # --- Instanciación de Servicios ---
-# En un escenario real, esto podría ser más sofisticado (ej. singleton)
-datos_gov_co_url = os.environ.get("DATOS_GOV_CO_URL", "https://www.datos.gov.co/resource/c82u-588k.json")
-rues_url = os.environ.get("RUES_URL", "https://ruesapi.rues.org.co/WEB2/api/Expediente/DetalleRM")
+# Los servicios, el pool HTTP y la caché se crean una vez por instancia y se reutilizan entre invocaciones.
+# Solo se construye el motor que se va a usar; los módulos que no hacen falta para atender una consulta
+# individual (asyncio en el motor síncrono, sqlite3, los esquemas de lote) se cargan en su primer uso.
+# La configuración (URLs, pool, caché, snapshot, lotes) se lee de las variables de entorno; ver src/configuracion.py.
+# Lambda atiende una solicitud a la vez por instancia, así que siempre usa el motor síncrono.
+manejador = crear_manejador_consultas(usar_motor_async=False)
+
+
+def _solicitud(event) -> SolicitudHttp:
+    """
+    Traduce el evento de API Gateway a la solicitud normalizada. Las cabeceras llegan con los nombres tal como los
+    envió el cliente (API REST) o en minúscula (API HTTP), así que se pasan a minúscula.
+    """
+    cabeceras = {nombre.lower(): valor for nombre, valor in (event.get('headers') or {}).items()}
+    # API REST (payload 1.0) informa el método en httpMethod; API HTTP (payload 2.0), en requestContext.http
+    metodo = event.get('httpMethod') or (event.get('requestContext') or {}).get('http', {}).get('method') or 'GET'
+    return SolicitudHttp(parametros=event.get('queryStringParameters') or {}, cuerpo=event.get('body'),
+                         cabeceras=cabeceras, metodo=metodo)
+
+
+def _respuesta(respuesta: RespuestaHttp) -> dict:
+    return {"statusCode": respuesta.estado, "headers": respuesta.cabeceras, "body": respuesta.cuerpo.decode("utf-8")}
 
-datos_gov_co_service = DatosGovCoService(base_url=datos_gov_co_url)
-rues_service = RuesService(base_url=rues_url)
-consulta_nit_service = ConsultaNitService(datos_gov_co_service, rues_service)
 
 # --- Handler de AWS Lambda ---
 def lambda_handler(event, context):
@@ -24,49 +41,15 @@ def lambda_handler(event, context):
     Punto de entrada para AWS Lambda con trigger de API Gateway.
     """
     logging.info('La función Lambda para Consulta NIT procesó una solicitud.')
-    headers = {"Content-Type": "application/json"}
-    
-    try:
-        # 1. Extraer NIT del evento de API Gateway
-        nit = None
-        if event.get('queryStringParameters') and 'nit' in event['queryStringParameters']:
-            nit = event['queryStringParameters']['nit']
-        elif event.get('body'):
-            try:
-                body = json.loads(event['body'])
-                nit = body.get('nit')
-            except (json.JSONDecodeError, AttributeError):
-                return {
-                    "statusCode": 400,
-                    "headers": headers,
-                    "body": json.dumps({"error": "Cuerpo JSON malformado."})
-                }
-
-        # 2. Validar NIT
-        if not nit or not str(nit).strip():
-            return {"statusCode": 400, "headers": headers, "body": json.dumps({"error": "El NIT es requerido."})}
+    plazo = crear_plazo(context.get_remaining_time_in_millis() if context else None)
+    return _respuesta(manejador.consultar_nit(_solicitud(event), plazo))
 
-        nit = str(nit).strip()
-        if not nit.isdigit() or not (8 <= len(nit) <= 10):
-            return {"statusCode": 400, "headers": headers, "body": json.dumps({"error": "Formato de NIT inválido. Debe ser un número entre 8 y 10 dígitos."})}
 
-        # 3. Delegar a la Capa de Lógica de Negocio
-        empresa = consulta_nit_service.consultar_nit(nit)
-        
-        # 4. Devolver Respuesta Exitosa
-        return {
-            "statusCode": 200,
-            "headers": headers,
-            "body": empresa.model_dump_json()
-        }
-    
-    # 5. Manejar Errores Específicos
-    except NitNotFoundError as e:
-        logging.warning(str(e))
-        return {"statusCode": 404, "headers": headers, "body": json.dumps({"error": str(e)})}
-    except DataSourceError as e:
-        logging.error(f"Falló una fuente de datos: {str(e)}")
-        return {"statusCode": 502, "headers": headers, "body": json.dumps({"error": "Una fuente de datos externa no está disponible. Por favor, intente de nuevo más tarde."})}
-    except Exception as e:
-        logging.error(f"Ocurrió un error inesperado: {str(e)}")
-        return {"statusCode": 500, "headers": headers, "body": json.dumps({"error": "Ocurrió un error interno en el servidor."})}
+# --- Handler de AWS Lambda para consultas por lote ---
+def lambda_handler_lote(event, context):
+    """
+    Punto de entrada para consultar un lote de NITs: POST con cuerpo {"nits": [...]}.
+    """
+    logging.info('La función Lambda para Consulta NIT por lote procesó una solicitud.')
+    plazo = crear_plazo(context.get_remaining_time_in_millis() if context else None)
+    return _respuesta(manejador.consultar_nits(_solicitud(event), plazo))
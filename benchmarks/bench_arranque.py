@@ -0,0 +1,129 @@
+"""
+Benchmark de arranque en frío de los adaptadores serverless.
+
+Cada medición es un proceso nuevo de Python que importa el adaptador y atiende su primera solicitud contra las
+fuentes simuladas de benchmarks/upstream_simulado.py. Se informa el tiempo de importación del adaptador, el
+tiempo desde el inicio de la importación hasta la primera respuesta y el tiempo total del proceso.
+
+Uso:
+    python -m benchmarks.bench_arranque [--repeticiones 10] [--adaptador aws] [--motor async]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.upstream_simulado import UpstreamSimulado  # noqa: E402
+
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+NIT = "900123456"
+
+# Código que ejecuta el proceso hijo. Solo importa lo mínimo antes de tomar el tiempo inicial para no precargar
+# módulos que el adaptador tendría que importar por su cuenta.
+PLANTILLA_HIJO = """
+import time
+inicio = time.perf_counter()
+import importlib.util
+spec = importlib.util.spec_from_file_location("adaptador", {ruta!r})
+adaptador = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(adaptador)
+importado = time.perf_counter()
+{invocacion}
+respondido = time.perf_counter()
+import json
+print(json.dumps({{"importacion": importado - inicio, "primera_respuesta": respondido - inicio, "estado": estado}}))
+"""
+
+ADAPTADORES: Dict[str, Dict[str, str]] = {
+    "aws": {
+        "ruta": "aws_lambda/lambda_handler.py",
+        "invocacion": (
+            "respuesta = adaptador.lambda_handler({{'queryStringParameters': {{'nit': {nit!r}}}}}, None)\n"
+            "estado = respuesta['statusCode']"
+        ),
+    },
+    "azure": {
+        "ruta": "azure_function/function_app.py",
+        "invocacion": (
+            "import asyncio\n"
+            "import azure.functions as func\n"
+            "solicitud = func.HttpRequest('GET', '/api/consulta_nit', params={{'nit': {nit!r}}}, body=b'')\n"
+            "funcion = adaptador.consulta_nit._function.get_user_function()\n"
+            "estado = asyncio.run(funcion(solicitud)).status_code"
+        ),
+    },
+    "gcp": {
+        "ruta": "google_cloud_function/main.py",
+        "invocacion": (
+            "import flask\n"
+            "with flask.Flask('bench').test_request_context('/?nit={nit}'):\n"
+            "    respuesta = adaptador.consulta_nit_gcp(flask.request)\n"
+            "estado = respuesta[1]"
+        ),
+    },
+}
+
+
+def medir_arranque(adaptador: str, entorno: Dict[str, str]) -> Dict[str, float]:
+    """
+    Arranca un proceso nuevo, importa el adaptador y atiende una solicitud. Devuelve los tiempos en segundos.
+    """
+    configuracion = ADAPTADORES[adaptador]
+    codigo = PLANTILLA_HIJO.format(
+        ruta=os.path.join(RAIZ, configuracion["ruta"]),
+        invocacion=configuracion["invocacion"].format(nit=NIT),
+    )
+    inicio = time.perf_counter()
+    salida = subprocess.run([sys.executable, "-c", codigo], env=entorno, cwd=RAIZ, capture_output=True, text=True)
+    total = time.perf_counter() - inicio
+    if salida.returncode != 0:
+        raise SystemExit(f"El adaptador {adaptador} falló:\n{salida.stderr}")
+    medicion = json.loads(salida.stdout.strip().splitlines()[-1])
+    if medicion["estado"] != 200:
+        raise SystemExit(f"El adaptador {adaptador} respondió {medicion['estado']}:\n{salida.stderr}")
+    medicion["proceso"] = total
+    return medicion
+
+
+def ejecutar(adaptadores: List[str], repeticiones: int, motor: str) -> List[Dict[str, float]]:
+    filas = []
+    with UpstreamSimulado() as upstream:
+        entorno = dict(
+            os.environ,
+            DATOS_GOV_CO_URL=upstream.url_datos_gov_co,
+            RUES_URL=upstream.url_rues,
+            CONSULTA_NIT_MOTOR=motor,
+            CACHE_BACKEND="memoria",
+            PYTHONDONTWRITEBYTECODE="1",
+        )
+        entorno.pop("PYTHONPATH", None)
+        for adaptador in adaptadores:
+            mediciones = [medir_arranque(adaptador, entorno) for _ in range(repeticiones)]
+            fila: Dict[str, float] = {"adaptador": adaptador}
+            for clave in ("importacion", "primera_respuesta", "proceso"):
+                fila[clave] = statistics.median(m[clave] for m in mediciones) * 1000
+            filas.append(fila)
+    return filas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=10)
+    parser.add_argument("--adaptador", choices=sorted(ADAPTADORES), action="append")
+    parser.add_argument("--motor", choices=("sync", "async"), default="sync")
+    args = parser.parse_args()
+
+    print(f"{'adaptador':<12}{'importacion (ms)':>18}{'primera respuesta (ms)':>24}{'proceso (ms)':>14}")
+    for fila in ejecutar(args.adaptador or sorted(ADAPTADORES), args.repeticiones, args.motor):
+        print(f"{fila['adaptador']:<12}{fila['importacion']:>18.1f}{fila['primera_respuesta']:>24.1f}{fila['proceso']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
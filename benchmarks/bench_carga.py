@@ -0,0 +1,325 @@
+"""
+Benchmark de latencia y rendimiento contra fuentes simuladas.
+
+Para cada escenario (latencia, tasa de errores y tamaño de respuesta de las fuentes) levanta un
+benchmarks/upstream_simulado.py y envía solicitudes concurrentes a cada objetivo: los orquestadores
+(`servicio`, `servicio_async`) y los handlers de los adaptadores (`aws`, `azure`, `gcp`). Informa p50/p95/p99,
+rendimiento y códigos de estado, y con --salida guarda los resultados en JSON para comparar versiones
+(--comparar muestra la variación respecto de un archivo anterior).
+
+Cada solicitud consulta un NIT distinto y la caché de resultados está deshabilitada (salvo --con-cache),
+de modo que todas llegan a las fuentes.
+
+Uso:
+    python -m benchmarks.bench_carga [--escenario latencia] [--objetivo aws] [--solicitudes 200]
+        [--concurrencia 8] [--salida resultados.json] [--comparar anterior.json]
+"""
+import argparse
+import contextlib
+import importlib.util
+import json
+import logging
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.upstream_simulado import UpstreamSimulado  # noqa: E402
+
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Una invocación recibe un NIT y devuelve el código de estado HTTP de la respuesta
+Invocacion = Callable[[str], int]
+
+
+@dataclass(frozen=True)
+class Escenario:
+    """
+    Comportamiento de las fuentes simuladas, por fuente ("datos_gov_co", "rues").
+    """
+    latencias: Dict[str, float] = field(default_factory=dict)
+    tasas_error: Dict[str, float] = field(default_factory=dict)
+    rellenos: Dict[str, int] = field(default_factory=dict)
+
+
+ESCENARIOS: Dict[str, Escenario] = {
+    "base": Escenario(),
+    "latencia": Escenario(latencias={"datos_gov_co": 0.03, "rues": 0.05}),
+    "errores": Escenario(latencias={"datos_gov_co": 0.03, "rues": 0.05}, tasas_error={"datos_gov_co": 0.05, "rues": 0.05}),
+    "respuestas_grandes": Escenario(rellenos={"datos_gov_co": 64 * 1024, "rues": 64 * 1024}),
+}
+
+
+@dataclass
+class Resultado:
+    escenario: str
+    objetivo: str
+    solicitudes: int
+    concurrencia: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    media_ms: float
+    max_ms: float
+    rendimiento_rps: float
+    estados: Dict[str, int]
+    solicitudes_upstream: Dict[str, int]
+
+
+def percentil(valores_ordenados: List[float], p: float) -> float:
+    """
+    Percentil por rango más cercano de una lista ya ordenada.
+    """
+    indice = math.ceil(len(valores_ordenados) * p / 100) - 1
+    return valores_ordenados[max(0, min(len(valores_ordenados) - 1, indice))]
+
+
+@contextlib.contextmanager
+def variables_de_entorno(valores: Dict[str, str]) -> Iterator[None]:
+    """
+    Aplica variables de entorno mientras dura el bloque; los adaptadores leen su configuración al importarse.
+    """
+    anteriores = {clave: os.environ.get(clave) for clave in valores}
+    os.environ.update(valores)
+    try:
+        yield
+    finally:
+        for clave, valor in anteriores.items():
+            if valor is None:
+                os.environ.pop(clave, None)
+            else:
+                os.environ[clave] = valor
+
+
+def _importar_adaptador(ruta: str, nombre: str) -> Any:
+    spec = importlib.util.spec_from_file_location(nombre, os.path.join(RAIZ, ruta))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def _estado_de_excepcion(error: Exception) -> int:
+    from src.manejador import respuesta_de_excepcion
+
+    return respuesta_de_excepcion(error).estado
+
+
+def _ejecutor_async():
+    from src.async_services import EjecutorAsync
+
+    return EjecutorAsync()
+
+
+# --- Objetivos: cada uno se prepara con el entorno del escenario ya aplicado ---
+def preparar_servicio(nombre: str) -> Invocacion:
+    from src.configuracion import crear_consulta_nit_service
+
+    servicio = crear_consulta_nit_service()
+
+    def invocar(nit: str) -> int:
+        try:
+            servicio.consultar_nit(nit)
+            return 200
+        except Exception as e:
+            return _estado_de_excepcion(e)
+    return invocar
+
+
+def preparar_servicio_async(nombre: str) -> Invocacion:
+    from src.configuracion import crear_consulta_nit_service_async
+
+    servicio = crear_consulta_nit_service_async()
+    ejecutor = _ejecutor_async()
+
+    def invocar(nit: str) -> int:
+        try:
+            ejecutor.ejecutar(servicio.consultar_nit(nit))
+            return 200
+        except Exception as e:
+            return _estado_de_excepcion(e)
+    return invocar
+
+
+def preparar_aws(nombre: str) -> Invocacion:
+    adaptador = _importar_adaptador("aws_lambda/lambda_handler.py", nombre)
+
+    def invocar(nit: str) -> int:
+        return adaptador.lambda_handler({"queryStringParameters": {"nit": nit}}, None)["statusCode"]
+    return invocar
+
+
+def preparar_azure(nombre: str) -> Invocacion:
+    import azure.functions as func
+
+    adaptador = _importar_adaptador("azure_function/function_app.py", nombre)
+    funcion = adaptador.consulta_nit._function.get_user_function()
+    # Como en el worker de Azure, todas las invocaciones comparten un bucle de eventos
+    ejecutor = _ejecutor_async()
+
+    def invocar(nit: str) -> int:
+        solicitud = func.HttpRequest("GET", "/api/consulta_nit", params={"nit": nit}, body=b"")
+        return ejecutor.ejecutar(funcion(solicitud)).status_code
+    return invocar
+
+
+def preparar_gcp(nombre: str) -> Invocacion:
+    import flask
+
+    adaptador = _importar_adaptador("google_cloud_function/main.py", nombre)
+    app = flask.Flask("bench_carga")
+
+    def invocar(nit: str) -> int:
+        with app.test_request_context(f"/?nit={nit}"):
+            return adaptador.consulta_nit_gcp(flask.request)[1]
+    return invocar
+
+
+OBJETIVOS: Dict[str, Callable[[str], Invocacion]] = {
+    "servicio": preparar_servicio,
+    "servicio_async": preparar_servicio_async,
+    "aws": preparar_aws,
+    "azure": preparar_azure,
+    "gcp": preparar_gcp,
+}
+
+
+def medir(invocar: Invocacion, nits: List[str], concurrencia: int) -> Tuple[List[float], Counter, float]:
+    """
+    Envía una solicitud por NIT con `concurrencia` en vuelo. Devuelve las latencias, los estados y la duración total.
+    """
+    def una(nit: str) -> Tuple[float, int]:
+        inicio = time.perf_counter()
+        estado = invocar(nit)
+        return time.perf_counter() - inicio, estado
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+        mediciones = list(executor.map(una, nits))
+    duracion = time.perf_counter() - inicio
+    return [latencia for latencia, _ in mediciones], Counter(estado for _, estado in mediciones), duracion
+
+
+def ejecutar_escenario(nombre: str, escenario: Escenario, objetivos: List[str], solicitudes: int, concurrencia: int,
+                       calentamiento: int, entorno_extra: Dict[str, str]) -> List[Resultado]:
+    resultados = []
+    for indice_objetivo, objetivo in enumerate(objetivos):
+        # Un servidor por objetivo, para contar sus solicitudes a las fuentes por separado
+        with UpstreamSimulado(escenario.latencias, escenario.tasas_error, escenario.rellenos, semilla=0) as upstream:
+            entorno = dict(entorno_extra, DATOS_GOV_CO_URL=upstream.url_datos_gov_co, RUES_URL=upstream.url_rues)
+            with variables_de_entorno(entorno):
+                invocar = OBJETIVOS[objetivo](f"bench_carga_{nombre}_{objetivo}")
+            # NITs distintos por objetivo: ninguna solicitud se resuelve con datos de otra
+            base = 800000000 + indice_objetivo * 1000000
+            nits = [str(base + i) for i in range(calentamiento + solicitudes)]
+            medir(invocar, nits[:calentamiento], concurrencia)
+            upstream.solicitudes = {fuente: 0 for fuente in upstream.solicitudes}
+            latencias, estados, duracion = medir(invocar, nits[calentamiento:], concurrencia)
+
+        ordenadas = sorted(latencias)
+        resultados.append(Resultado(
+            escenario=nombre,
+            objetivo=objetivo,
+            solicitudes=len(latencias),
+            concurrencia=concurrencia,
+            p50_ms=percentil(ordenadas, 50) * 1000,
+            p95_ms=percentil(ordenadas, 95) * 1000,
+            p99_ms=percentil(ordenadas, 99) * 1000,
+            media_ms=sum(ordenadas) / len(ordenadas) * 1000,
+            max_ms=ordenadas[-1] * 1000,
+            rendimiento_rps=len(latencias) / duracion,
+            estados={str(estado): cantidad for estado, cantidad in sorted(estados.items())},
+            solicitudes_upstream=dict(upstream.solicitudes),
+        ))
+    return resultados
+
+
+def _version() -> Optional[str]:
+    try:
+        salida = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=RAIZ, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return salida.stdout.strip() or None
+
+
+def imprimir(resultados: List[Resultado]) -> None:
+    print(f"{'escenario':<20}{'objetivo':<16}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}{'rps':>10}  estados")
+    for r in resultados:
+        estados = " ".join(f"{estado}:{cantidad}" for estado, cantidad in r.estados.items())
+        print(f"{r.escenario:<20}{r.objetivo:<16}{r.p50_ms:>10.1f}{r.p95_ms:>10.1f}{r.p99_ms:>10.1f}{r.rendimiento_rps:>10.1f}  {estados}")
+
+
+def comparar(resultados: List[Resultado], ruta_anterior: str) -> None:
+    """
+    Muestra la variación de p95 y del rendimiento respecto de los resultados guardados en `ruta_anterior`.
+    """
+    with open(ruta_anterior, encoding="utf-8") as archivo:
+        anterior = json.load(archivo)
+    previos = {(r["escenario"], r["objetivo"]): r for r in anterior["resultados"]}
+    print(f"\nComparación con {ruta_anterior} ({anterior.get('version') or 'sin versión'}):")
+    print(f"{'escenario':<20}{'objetivo':<16}{'p95 antes':>10}{'p95 ahora':>10}{'variación':>11}{'rps antes':>11}{'rps ahora':>11}")
+    for r in resultados:
+        previo = previos.get((r.escenario, r.objetivo))
+        if previo is None:
+            continue
+        variacion = (r.p95_ms / previo["p95_ms"] - 1) * 100 if previo["p95_ms"] else 0.0
+        print(f"{r.escenario:<20}{r.objetivo:<16}{previo['p95_ms']:>10.1f}{r.p95_ms:>10.1f}{variacion:>+10.1f}%"
+              f"{previo['rendimiento_rps']:>11.1f}{r.rendimiento_rps:>11.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escenario", choices=sorted(ESCENARIOS), action="append")
+    parser.add_argument("--objetivo", choices=sorted(OBJETIVOS), action="append")
+    parser.add_argument("--solicitudes", type=int, default=200)
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--calentamiento", type=int, default=10)
+    parser.add_argument("--motor", choices=("sync", "async"), default="sync", help="Motor de los adaptadores de Azure y Google Cloud")
+    parser.add_argument("--con-cache", action="store_true", help="No deshabilitar la caché de resultados")
+    parser.add_argument("--salida", help="Archivo JSON donde guardar los resultados")
+    parser.add_argument("--comparar", help="Archivo JSON de una ejecución anterior")
+    args = parser.parse_args()
+
+    # Las sesiones aiohttp de los objetivos asíncronos se descartan sin cerrarlas al terminar cada objetivo;
+    # se silencian sus avisos de "Unclosed client session" para no ensuciar la tabla
+    logging.getLogger("asyncio").setLevel(logging.CRITICAL)
+
+    entorno_extra = {"CONSULTA_NIT_MOTOR": args.motor}
+    if not args.con_cache:
+        entorno_extra["CACHE_MAX_ENTRADAS"] = "0"
+
+    resultados: List[Resultado] = []
+    for nombre in args.escenario or list(ESCENARIOS):
+        resultados.extend(ejecutar_escenario(
+            nombre, ESCENARIOS[nombre], args.objetivo or list(OBJETIVOS), args.solicitudes, args.concurrencia,
+            args.calentamiento, entorno_extra
+        ))
+    imprimir(resultados)
+
+    if args.salida:
+        documento = {
+            "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "version": _version(),
+            "python": platform.python_version(),
+            "parametros": {k: v for k, v in vars(args).items() if k not in ("salida", "comparar")},
+            "escenarios": {nombre: asdict(ESCENARIOS[nombre]) for nombre in args.escenario or list(ESCENARIOS)},
+            "resultados": [asdict(r) for r in resultados],
+        }
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(documento, archivo, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.salida}")
+    if args.comparar:
+        comparar(resultados, args.comparar)
+
+
+if __name__ == "__main__":
+    main()
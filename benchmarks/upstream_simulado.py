@@ -0,0 +1,151 @@
+"""
+Servidor HTTP local que simula las APIs de datos.gov.co y RUES para los benchmarks.
+
+Responde a cualquier NIT con un registro sintético, con latencia, tasa de errores y tamaño de respuesta
+configurables, de modo que las mediciones no dependan de la red ni de la disponibilidad de las fuentes reales.
+"""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+RUTA_DATOS_GOV_CO = "/resource/c82u-588k.json"
+RUTA_RUES = "/WEB2/api/Expediente/DetalleRM"
+
+
+def registro_datos_gov_co(nit: str) -> Dict[str, Any]:
+    return {
+        "nit": nit,
+        "razon_social": f"EMPRESA {nit} S.A.S.",
+        "digito_verificacion": "1",
+        "camara_comercio": "BOGOTA",
+        "codigo_camara": "04",
+        "matricula": nit[-7:],
+        "estado_matricula": "ACTIVA",
+        "fecha_matricula": "20150101",
+        "cod_ciiu_act_econ_pri": "6201",
+        "organizacion_juridica": "SOCIEDAD POR ACCIONES SIMPLIFICADA",
+    }
+
+
+def registro_rues(codigo_rues: str) -> Dict[str, Any]:
+    return {
+        "codigo_error": "0000",
+        "registros": {
+            "razon_social": f"EMPRESA {codigo_rues}",
+            "tipo_sociedad": "SOCIEDAD COMERCIAL",
+            "fecha_renovacion": "20250301",
+            "ultimo_ano_renovado": "2025",
+            "cod_ciiu_act_econ_sec": "4711",
+        },
+    }
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    server: "UpstreamSimulado"
+    # Conexiones keep-alive, como las APIs reales, para que el pool HTTP de los servicios se ejercite. Sin Nagle,
+    # para que las cabeceras y el cuerpo escritos por separado no esperen el ACK retardado del cliente (~40 ms).
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        partes = urlsplit(self.path)
+        fuente = "rues" if partes.path.startswith(RUTA_RUES) else "datos_gov_co"
+        self.server.registrar_solicitud(fuente)
+        latencia = self.server.latencias.get(fuente, 0.0)
+        if latencia:
+            time.sleep(latencia)
+        if self.server.fallar(fuente):
+            self._responder(503, {"error": "servicio no disponible"})
+        elif fuente == "rues":
+            respuesta = registro_rues(partes.path.rsplit("/", 1)[-1])
+            self.server.rellenar(fuente, respuesta["registros"])
+            self._responder(200, respuesta)
+        elif partes.path == RUTA_DATOS_GOV_CO:
+            registros = [registro_datos_gov_co(nit) for nit in _nits_consultados(partes.query)]
+            for registro in registros:
+                self.server.rellenar(fuente, registro)
+            self._responder(200, registros)
+        else:
+            self._responder(404, {"error": "ruta no registrada"})
+
+    def _responder(self, status: int, payload: Any) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _nits_consultados(query: str) -> List[str]:
+    """
+    NITs de una consulta Socrata: `?nit=...` o `$where=nit in('...', ...)`.
+    """
+    parametros = parse_qs(query)
+    if "nit" in parametros:
+        return parametros["nit"]
+    return re.findall(r"'(\d+)'", unquote(parametros.get("$where", [""])[0]))
+
+
+class UpstreamSimulado(ThreadingHTTPServer):
+    """
+    Servidor de las fuentes simuladas en 127.0.0.1, en un hilo propio. Se usa como context manager.
+
+    `latencias`, `tasas_error` y `rellenos` se indican por fuente ("datos_gov_co", "rues"). Los errores son
+    respuestas 503, y el relleno agrega a cada registro un campo de ese número de bytes que los servicios ignoran.
+    """
+    daemon_threads = True
+
+    def __init__(self, latencias: Optional[Dict[str, float]] = None, tasas_error: Optional[Dict[str, float]] = None,
+                 rellenos: Optional[Dict[str, int]] = None, semilla: Optional[int] = None):
+        super().__init__(("127.0.0.1", 0), _Manejador)
+        self.latencias = dict(latencias or {})
+        self.tasas_error = dict(tasas_error or {})
+        self.rellenos = {fuente: "x" * tamano for fuente, tamano in (rellenos or {}).items() if tamano > 0}
+        self.solicitudes: Dict[str, int] = {"datos_gov_co": 0, "rues": 0}
+        self._aleatorio = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._hilo = threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    @property
+    def url_datos_gov_co(self) -> str:
+        return self.url + RUTA_DATOS_GOV_CO
+
+    @property
+    def url_rues(self) -> str:
+        return self.url + RUTA_RUES
+
+    def registrar_solicitud(self, fuente: str) -> None:
+        with self._lock:
+            self.solicitudes[fuente] += 1
+
+    def fallar(self, fuente: str) -> bool:
+        tasa = self.tasas_error.get(fuente, 0.0)
+        with self._lock:
+            return tasa > 0 and self._aleatorio.random() < tasa
+
+    def rellenar(self, fuente: str, registro: Dict[str, Any]) -> None:
+        relleno = self.rellenos.get(fuente)
+        if relleno:
+            registro["relleno"] = relleno
+
+    def __enter__(self) -> "UpstreamSimulado":
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+        self.server_close()
@@ -1,23 +1,35 @@
 import logging
 import os
 import sys
-import json
 import functions_framework
-from flask import jsonify
 
-# Agrega el directorio raíz al path para encontrar el módulo 'src'
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# Agrega el directorio raíz al path para encontrar el módulo 'src' (una sola vez por proceso)
+RAIZ_PROYECTO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if RAIZ_PROYECTO not in sys.path:
+    sys.path.insert(0, RAIZ_PROYECTO)
 
-from src.services import ConsultaNitService, DatosGovCoService, RuesService
-from src.exceptions import NitNotFoundError, DataSourceError
+from src.configuracion import crear_manejador_consultas, crear_plazo
+from src.manejador import RespuestaHttp, SolicitudHttp
 
 # --- Instanciación de Servicios ---
-datos_gov_co_url = os.environ.get("DATOS_GOV_CO_URL", "https://www.datos.gov.co/resource/c82u-588k.json")
-rues_url = os.environ.get("RUES_URL", "https://ruesapi.rues.org.co/WEB2/api/Expediente/DetalleRM")
+# Los servicios, el pool HTTP y la caché se crean una vez por instancia y se reutilizan entre invocaciones.
+# Solo se construye el motor que se va a usar; los módulos que no hacen falta para atender una consulta
+# individual (asyncio en el motor síncrono, sqlite3, los esquemas de lote) se cargan en su primer uso.
+# La configuración (URLs, pool, caché, snapshot, lotes) se lee de las variables de entorno; ver src/configuracion.py.
+# Con CONSULTA_NIT_MOTOR=async las consultas corren en un bucle de eventos propio compartido entre invocaciones.
+manejador = crear_manejador_consultas()
+
+
+def _solicitud(request) -> SolicitudHttp:
+    """
+    Traduce la solicitud de Flask a la solicitud normalizada.
+    """
+    return SolicitudHttp(parametros=request.args, cuerpo=request.get_data(), cabeceras=request.headers, metodo=request.method)
+
+
+def _respuesta(respuesta: RespuestaHttp):
+    return (respuesta.cuerpo, respuesta.estado, respuesta.cabeceras)
 
-datos_gov_co_service = DatosGovCoService(base_url=datos_gov_co_url)
-rues_service = RuesService(base_url=rues_url)
-consulta_nit_service = ConsultaNitService(datos_gov_co_service, rues_service)
 
 # --- Handler de Google Cloud Function ---
 @functions_framework.http
@@ -26,40 +38,14 @@ def consulta_nit_gcp(request):
     Punto de entrada para Google Cloud Function (HTTP).
     """
     logging.info('La función de Google Cloud para Consulta NIT procesó una solicitud.')
-    
-    try:
-        # 1. Extraer NIT de la solicitud (objeto tipo Flask)
-        request_json = request.get_json(silent=True)
-        request_args = request.args
+    return _respuesta(manejador.consultar_nit(_solicitud(request), crear_plazo()))
 
-        nit = None
-        if request_args and 'nit' in request_args:
-            nit = request_args['nit']
-        elif request_json and 'nit' in request_json:
-            nit = request_json['nit']
-        
-        # 2. Validar NIT
-        if not nit or not str(nit).strip():
-            return (jsonify({"error": "El NIT es requerido."}), 400)
 
-        nit = str(nit).strip()
-        if not nit.isdigit() or not (8 <= len(nit) <= 10):
-            return (jsonify({"error": "Formato de NIT inválido. Debe ser un número entre 8 y 10 dígitos."}), 400)
-
-        # 3. Delegar a la Capa de Lógica de Negocio
-        empresa = consulta_nit_service.consultar_nit(nit)
-        
-        # 4. Devolver Respuesta Exitosa
-        # Usamos jsonify para establecer Content-Type a application/json
-        return (empresa.model_dump_json(), 200)
-
-    # 5. Manejar Errores Específicos
-    except NitNotFoundError as e:
-        logging.warning(str(e))
-        return (jsonify({"error": str(e)}), 404)
-    except DataSourceError as e:
-        logging.error(f"Falló una fuente de datos: {str(e)}")
-        return (jsonify({"error": "Una fuente de datos externa no está disponible. Por favor, intente de nuevo más tarde."}), 502)
-    except Exception as e:
-        logging.error(f"Ocurrió un error inesperado: {str(e)}")
-        return (jsonify({"error": "Ocurrió un error interno en el servidor."}), 500)
+# --- Handler de Google Cloud Function para consultas por lote ---
+@functions_framework.http
+def consulta_nits_gcp(request):
+    """
+    Punto de entrada para consultar un lote de NITs: POST con cuerpo {"nits": [...]}.
+    """
+    logging.info('La función de Google Cloud para Consulta NIT por lote procesó una solicitud.')
+    return _respuesta(manejador.consultar_nits(_solicitud(request), crear_plazo()))
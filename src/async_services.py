@@ -0,0 +1,557 @@
+import asyncio
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+import aiohttp
+
+from src.cache import CacheResultados
+from src.models import Empresa, ResultadoConsulta
+from src.plazo import Plazo, timeout_para
+from src.reintentos import ESTADOS_REINTENTABLES, PoliticaReintentos
+from src.circuito import Interruptor
+from src.cobertura import PoliticaCobertura
+from src.indice_rues import IndiceCodigosRues
+from src.metricas import ESTADO_ERROR, ESTADO_OK, ESTADO_VACIO, SumideroMetricas, registrar_medicion
+from src.exceptions import CircuitoAbiertoError, DataSourceError, NitNotFoundError
+from src.singleflight import AsyncSingleFlight
+from src.validators import normalizar_nit
+from src.services import (
+    BaseConsultaNitService,
+    DataSource,
+    agrupar_registros_por_nit,
+    codigo_rues_de,
+    construir_consultas_socrata_por_nit,
+    contar_registros,
+)
+
+
+T = TypeVar("T")
+
+
+def clasificar_error_aiohttp(error: BaseException) -> Optional[Tuple[str, Optional[str]]]:
+    """
+    Clasifica un error de aiohttp para la política de reintentos, igual que clasificar_error_http en el motor síncrono.
+    """
+    if isinstance(error, aiohttp.ClientResponseError):
+        if error.status in ESTADOS_REINTENTABLES:
+            return f"http_{error.status}", (error.headers or {}).get("Retry-After")
+        return None
+    if isinstance(error, aiohttp.ClientConnectionError):
+        return "conexion", None
+    if isinstance(error, asyncio.TimeoutError):
+        return "timeout", None
+    return None
+
+
+class SesionHttpAsync:
+    """
+    Mantiene una única aiohttp.ClientSession con pool de conexiones keep-alive.
+
+    La sesión se crea de forma perezosa dentro del bucle de eventos que la usa por primera vez,
+    ya que aiohttp la asocia a ese bucle.
+    """
+    def __init__(self, limit: int = 100, limit_per_host: int = 10, timeout: float = 10):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def obtener(self) -> aiohttp.ClientSession:
+        """
+        Devuelve la sesión compartida, creándola si aún no existe o si fue cerrada.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    def timeout_http(self, plazo: Optional[Plazo]) -> aiohttp.ClientTimeout:
+        """
+        Timeout de una solicitud: el tiempo restante del plazo, sin superar el timeout de la sesión.
+        Lanza asyncio.TimeoutError si el plazo ya está agotado.
+        """
+        segundos = timeout_para(plazo, self.timeout)
+        if segundos is None:
+            raise asyncio.TimeoutError("Se agotó el plazo de la solicitud.")
+        return aiohttp.ClientTimeout(total=segundos)
+
+    async def obtener_json(self, url: str, fuente: str, plazo: Optional[Plazo] = None,
+                           reintentos: Optional[PoliticaReintentos] = None) -> Any:
+        """
+        Hace un GET con el timeout que permite el plazo y devuelve el cuerpo JSON; lanza ClientResponseError
+        si el estado es de error. Con una política de reintentos, los errores transitorios se reintentan.
+        """
+        async def intento() -> Any:
+            async with self.obtener().get(url, timeout=self.timeout_http(plazo)) as response:
+                response.raise_for_status()
+                return await response.json(content_type=None)
+
+        if reintentos is None:
+            return await intento()
+        return await reintentos.ejecutar_async(fuente, intento, clasificar_error_aiohttp, plazo)
+
+    async def cerrar(self) -> None:
+        """
+        Cierra la sesión y libera las conexiones del pool.
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+class AsyncDataSource(ABC):
+    """
+    Clase base abstracta para una fuente de datos de empresas consultada de forma asíncrona.
+    """
+    @abstractmethod
+    async def consultar(self, nit: str, **kwargs) -> Optional[Dict[str, Any]]:
+        """
+        Consulta la fuente de datos para obtener información sobre un NIT dado.
+
+        Args:
+            nit: El número de identificación tributaria de la empresa.
+
+        Returns:
+            Un diccionario con los datos de la empresa o None si no se encuentra.
+
+        Las fuentes remotas reciben en `plazo` el presupuesto de tiempo de la solicitud y lo usan como timeout.
+        """
+        pass
+
+    async def consultar_lote(self, nits: Iterable[str], plazo: Optional[Plazo] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Consulta varios NITs. Por defecto hace una consulta por NIT; las fuentes que soportan
+        consultas múltiples pueden sobrescribirlo.
+
+        Returns:
+            Un diccionario NIT -> datos de la empresa, con None para los NITs no encontrados.
+        """
+        nits = list(nits)
+        return dict(zip(nits, await asyncio.gather(*(self.consultar(nit, plazo=plazo) for nit in nits))))
+
+
+class AsyncDatosGovCoService(AsyncDataSource):
+    """
+    Implementación asíncrona de fuente de datos para datos.gov.co.
+    """
+    def __init__(self, base_url: str = "https://www.datos.gov.co/resource/c82u-588k.json", sesion: Optional[SesionHttpAsync] = None,
+                 reintentos: Optional[PoliticaReintentos] = None):
+        self.base_url = base_url
+        self.sesion = sesion or SesionHttpAsync()
+        self.reintentos = reintentos
+
+    async def consultar(self, nit: str, **kwargs) -> Optional[Dict[str, Any]]:
+        url = f"{self.base_url}?nit={nit}"
+        try:
+            data = await self.sesion.obtener_json(url, "datos.gov.co", kwargs.get("plazo"), self.reintentos)
+            if not data:
+                return None
+
+            # Esta fuente devuelve una lista, tomamos el primer elemento
+            return data[0]
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.error(f"Error al consultar Datos.gov.co: {e}")
+            raise DataSourceError(source_name="datos.gov.co", original_exception=e)
+        except (ValueError, IndexError) as e:
+            logging.error(f"Error al analizar la respuesta de Datos.gov.co para el NIT {nit}")
+            raise DataSourceError(source_name="datos.gov.co", original_exception=e)
+
+    async def consultar_lote(self, nits: Iterable[str], plazo: Optional[Plazo] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Consulta varios NITs con `$where=nit in(...)`; los grupos de NITs se consultan en paralelo.
+        """
+        nits = list(dict.fromkeys(nits))
+        consultas = construir_consultas_socrata_por_nit(self.base_url, nits)
+        respuestas = await asyncio.gather(*(self._consultar_grupo(url, grupo, plazo) for url, grupo in consultas))
+        return agrupar_registros_por_nit(nits, [registro for registros in respuestas for registro in registros])
+
+    async def _consultar_grupo(self, url: str, grupo: List[str], plazo: Optional[Plazo] = None) -> List[Dict[str, Any]]:
+        try:
+            return await self.sesion.obtener_json(url, "datos.gov.co", plazo, self.reintentos)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.error(f"Error al consultar Datos.gov.co por lote: {e}")
+            raise DataSourceError(source_name="datos.gov.co", original_exception=e)
+        except ValueError as e:
+            logging.error(f"Error al analizar la respuesta por lote de Datos.gov.co ({len(grupo)} NITs)")
+            raise DataSourceError(source_name="datos.gov.co", original_exception=e)
+
+
+class AsyncRuesService(AsyncDataSource):
+    """
+    Implementación asíncrona de fuente de datos para rues.org.co.
+
+    Este servicio requiere que 'codigo_camara' y 'matricula' se pasen a través de argumentos de palabra clave,
+    o directamente 'codigo_rues' si ya se conoce.
+    """
+    def __init__(self, base_url: str = "https://ruesapi.rues.org.co/WEB2/api/Expediente/DetalleRM", sesion: Optional[SesionHttpAsync] = None,
+                 reintentos: Optional[PoliticaReintentos] = None):
+        self.base_url = base_url
+        self.sesion = sesion or SesionHttpAsync()
+        self.reintentos = reintentos
+
+    async def consultar(self, nit: str, **kwargs) -> Optional[Dict[str, Any]]:
+        codigo_rues = kwargs.get('codigo_rues') or codigo_rues_de(kwargs)
+
+        if not codigo_rues:
+            return None
+
+        url = f"{self.base_url}/{codigo_rues}"
+
+        try:
+            data = await self.sesion.obtener_json(url, "rues.org.co", kwargs.get("plazo"), self.reintentos)
+
+            if data.get("codigo_error") == '0000':
+                return data.get("registros", {})
+            else:
+                logging.warning(f"La API de RUES devolvió un error de negocio para el NIT {nit}: {data.get('mensaje_error')}")
+                return None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.error(f"Error al consultar RUES: {e}")
+            raise DataSourceError(source_name="rues.org.co", original_exception=e)
+        except ValueError as e:
+            logging.error(f"Error al analizar la respuesta de RUES para el NIT {nit}")
+            raise DataSourceError(source_name="rues.org.co", original_exception=e)
+
+
+class AsyncFuenteLocal(AsyncDataSource):
+    """
+    Expone una fuente síncrona local y rápida (p. ej. el snapshot SQLite) como AsyncDataSource.
+
+    La consulta se ejecuta directamente en el bucle de eventos: solo debe usarse con fuentes que
+    respondan en microsegundos y sin E/S de red.
+    """
+    def __init__(self, fuente: DataSource):
+        self.fuente = fuente
+
+    async def consultar(self, nit: str, **kwargs) -> Optional[Dict[str, Any]]:
+        return self.fuente.consultar(nit, **kwargs)
+
+    async def consultar_lote(self, nits: Iterable[str], plazo: Optional[Plazo] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        return self.fuente.consultar_lote(nits, plazo=plazo)
+
+
+class AsyncFuenteConRespaldo(AsyncDataSource):
+    """
+    Versión asíncrona de FuenteConRespaldo: consulta la fuente primaria y recurre a la de respaldo
+    cuando la primera no encuentra el NIT o falla.
+    """
+    def __init__(self, primaria: AsyncDataSource, respaldo: AsyncDataSource):
+        self.primaria = primaria
+        self.respaldo = respaldo
+
+    async def consultar(self, nit: str, **kwargs) -> Optional[Dict[str, Any]]:
+        try:
+            data = await self.primaria.consultar(nit, **kwargs)
+        except DataSourceError as e:
+            logging.warning(f"Falló la fuente primaria para el NIT {nit}, se usa la de respaldo: {e}")
+            data = None
+        if data:
+            return data
+        return await self.respaldo.consultar(nit, **kwargs)
+
+    async def consultar_lote(self, nits: Iterable[str], plazo: Optional[Plazo] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        nits = list(nits)
+        try:
+            resultado = await self.primaria.consultar_lote(nits, plazo=plazo)
+        except DataSourceError as e:
+            logging.warning(f"Falló la fuente primaria para el lote, se usa la de respaldo: {e}")
+            resultado = {}
+        faltantes = [nit for nit in nits if not resultado.get(nit)]
+        if faltantes:
+            resultado.update(await self.respaldo.consultar_lote(faltantes, plazo=plazo))
+        return resultado
+
+
+class AsyncFuenteConInterruptor(AsyncDataSource):
+    """
+    Versión asíncrona de FuenteConInterruptor: mientras el circuito está abierto, las consultas fallan
+    de inmediato con CircuitoAbiertoError.
+    """
+    def __init__(self, fuente: AsyncDataSource, nombre: str, interruptor: Optional[Interruptor] = None):
+        self.fuente = fuente
+        self.nombre = nombre
+        self.interruptor = interruptor or Interruptor()
+
+    async def consultar(self, nit: str, **kwargs) -> Optional[Dict[str, Any]]:
+        return await self._llamar(lambda: self.fuente.consultar(nit, **kwargs), kwargs.get("plazo"))
+
+    async def consultar_lote(self, nits: Iterable[str], plazo: Optional[Plazo] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        return await self._llamar(lambda: self.fuente.consultar_lote(nits, plazo=plazo), plazo)
+
+    async def _llamar(self, funcion: Callable[[], Awaitable[T]], plazo: Optional[Plazo]) -> T:
+        if not self.interruptor.permitir():
+            raise CircuitoAbiertoError(self.nombre)
+        try:
+            resultado = await funcion()
+        except DataSourceError:
+            # Un timeout causado por el plazo agotado de la solicitud no indica que la fuente esté caída
+            if plazo is not None and plazo.agotado():
+                self.interruptor.liberar()
+            else:
+                self.interruptor.registrar_fallo()
+            raise
+        except BaseException:
+            self.interruptor.liberar()
+            raise
+        self.interruptor.registrar_exito()
+        return resultado
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return self.interruptor.estadisticas()
+
+
+class AsyncFuenteConCobertura(AsyncDataSource):
+    """
+    Versión asíncrona de FuenteConCobertura: la consulta que pierde la carrera se cancela y su conexión se cierra.
+    """
+    def __init__(self, fuente: AsyncDataSource, politica: Optional[PoliticaCobertura] = None):
+        self.fuente = fuente
+        self.politica = politica or PoliticaCobertura()
+
+    async def consultar(self, nit: str, **kwargs) -> Optional[Dict[str, Any]]:
+        retardo = self.politica.iniciar_solicitud()
+        if retardo is None:
+            return await self._medir(nit, kwargs)
+
+        tareas: List["asyncio.Future[Optional[Dict[str, Any]]]"] = [asyncio.ensure_future(self._medir(nit, kwargs))]
+        try:
+            terminadas, _ = await asyncio.wait(tareas, timeout=retardo)
+            if terminadas or not self.politica.permitir_cobertura():
+                return await tareas[0]
+
+            tareas.append(asyncio.ensure_future(self._medir(nit, kwargs)))
+            pendientes = set(tareas)
+            error: Optional[BaseException] = None
+            while pendientes:
+                terminadas, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+                for tarea in terminadas:
+                    if tarea.exception() is None:
+                        if tarea is tareas[1]:
+                            self.politica.registrar_ganadora()
+                        return tarea.result()
+                    error = error or tarea.exception()
+            raise error
+        finally:
+            for tarea in tareas:
+                if not tarea.done():
+                    tarea.cancel()
+
+    async def consultar_lote(self, nits: Iterable[str], plazo: Optional[Plazo] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        return await self.fuente.consultar_lote(nits, plazo=plazo)
+
+    async def _medir(self, nit: str, kwargs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        inicio = time.monotonic()
+        resultado = await self.fuente.consultar(nit, **kwargs)
+        self.politica.registrar_latencia(time.monotonic() - inicio)
+        return resultado
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return self.politica.estadisticas()
+
+
+class AsyncFuenteMedida(AsyncDataSource):
+    """
+    Versión asíncrona de FuenteMedida. Una consulta cancelada (p. ej. la consulta anticipada a RUES que se descarta)
+    no se registra.
+    """
+    def __init__(self, fuente: AsyncDataSource, etapa: str, metricas: Optional[SumideroMetricas] = None):
+        self.fuente = fuente
+        self.etapa = etapa
+        self.metricas = metricas
+
+    async def consultar(self, nit: str, **kwargs) -> Optional[Dict[str, Any]]:
+        return await self._llamar(lambda: self.fuente.consultar(nit, **kwargs))
+
+    async def consultar_lote(self, nits: Iterable[str], plazo: Optional[Plazo] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        return await self._llamar(lambda: self.fuente.consultar_lote(nits, plazo=plazo), lote=True)
+
+    async def _llamar(self, funcion: Callable[[], Awaitable[T]], lote: bool = False) -> T:
+        inicio = time.perf_counter()
+        try:
+            resultado = await funcion()
+        except Exception:
+            registrar_medicion(self.metricas, self.etapa, inicio, ESTADO_ERROR)
+            raise
+        registrar_medicion(self.metricas, self.etapa, inicio, ESTADO_OK if resultado else ESTADO_VACIO,
+                           tamano=contar_registros(resultado, lote))
+        return resultado
+
+
+class AsyncConsultaNitService(BaseConsultaNitService):
+    """
+    Orquesta de forma asíncrona la recuperación de datos de empresas de múltiples fuentes.
+    """
+    def __init__(self, datos_gov_co_service: AsyncDataSource, rues_service: AsyncDataSource, cache: Optional[CacheResultados] = None,
+                 indice_rues: Optional[IndiceCodigosRues] = None, metricas: Optional[SumideroMetricas] = None):
+        self.datos_gov_co_service = datos_gov_co_service
+        self.rues_service = rues_service
+        self.cache = cache
+        self.indice_rues = indice_rues
+        self.metricas = metricas
+        self._refrescos_en_curso: Dict[str, "asyncio.Task[None]"] = {}
+        self._single_flight = AsyncSingleFlight()
+
+    async def consultar_nit(self, nit: str, plazo: Optional[Plazo] = None) -> Empresa:
+        """
+        Realiza una búsqueda exhaustiva de un NIT en todas las fuentes de datos disponibles.
+
+        Si hay caché configurada, los resultados (incluido "no encontrado") se sirven desde ella mientras estén vigentes,
+        y si una fuente falla se devuelve la última Empresa conocida del NIT. Con `plazo`, cada fuente usa el tiempo
+        restante como timeout y RUES se omite si ya no queda tiempo para consultarlo.
+
+        El NIT se normaliza como en la solicitud HTTP (puntos de miles, dígito de verificación) y, si no es válido,
+        se lanza NitInvalidoError sin consultar las fuentes.
+        """
+        nit = normalizar_nit(nit)
+        empresa = self._leer_cache(nit)
+        if empresa is not None:
+            return empresa
+        try:
+            return await self._consultar_fuentes(nit, plazo)
+        except DataSourceError as e:
+            return self._respaldo_ultimo_valido(nit, e)
+
+    def _programar_refresco(self, nit: str) -> None:
+        if nit in self._refrescos_en_curso:
+            return
+        tarea = asyncio.get_running_loop().create_task(self._refrescar(nit))
+        self._refrescos_en_curso[nit] = tarea
+        tarea.add_done_callback(lambda _: self._refrescos_en_curso.pop(nit, None))
+
+    async def _refrescar(self, nit: str) -> None:
+        try:
+            await self._consultar_fuentes(nit)
+        except NitNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning(f"No se pudo refrescar la caché para el NIT {nit}: {e}")
+
+    async def _consultar_fuentes(self, nit: str, plazo: Optional[Plazo] = None) -> Empresa:
+        """
+        Consulta las fuentes para el NIT. Las corrutinas que piden el mismo NIT a la vez comparten una sola consulta,
+        que se rige por el plazo de quien la inició.
+        """
+        return await self._single_flight.ejecutar(nit, lambda: self._consultar_fuentes_sin_coalescer(nit, plazo))
+
+    async def _consultar_fuentes_sin_coalescer(self, nit: str, plazo: Optional[Plazo] = None) -> Empresa:
+        codigo_rues = self._codigo_rues_conocido(nit)
+        if codigo_rues is None:
+            gov_data = await self.datos_gov_co_service.consultar(nit, plazo=plazo)
+            return await self._completar_con_rues(nit, gov_data, plazo)
+
+        # Con el código RUES ya aprendido no hace falta esperar a datos.gov.co: ambas fuentes se consultan en paralelo
+        rues_tarea = asyncio.ensure_future(self.rues_service.consultar(nit, codigo_rues=codigo_rues, plazo=plazo))
+        # Evita el aviso de excepción no recuperada si la tarea se descarta
+        rues_tarea.add_done_callback(lambda tarea: tarea.cancelled() or tarea.exception())
+        try:
+            gov_data = await self.datos_gov_co_service.consultar(nit, plazo=plazo)
+        except BaseException:
+            rues_tarea.cancel()
+            raise
+        if self._codigo_anticipado_vigente(nit, codigo_rues, gov_data):
+            return await self._completar_con_rues(nit, gov_data, plazo, rues_tarea)
+        rues_tarea.cancel()
+        return await self._completar_con_rues(nit, gov_data, plazo)
+
+    async def _completar_con_rues(self, nit: str, gov_data: Optional[Dict[str, Any]], plazo: Optional[Plazo] = None,
+                                  consulta_rues: Optional[Awaitable[Optional[Dict[str, Any]]]] = None) -> Empresa:
+        """
+        Consulta RUES con los datos ya obtenidos de datos.gov.co y construye la Empresa.
+        `consulta_rues` es una consulta a RUES ya lanzada en paralelo.
+        """
+        rues_data = None
+        completa = True
+        if gov_data:
+            self._aprender_codigo_rues(nit, gov_data)
+            if consulta_rues is None and self._rues_omitible(nit, plazo):
+                completa = False
+            else:
+                try:
+                    if consulta_rues is not None:
+                        rues_data = await consulta_rues
+                    else:
+                        rues_data = await self.rues_service.consultar(
+                            nit,
+                            codigo_camara=gov_data.get("codigo_camara"),
+                            matricula=gov_data.get("matricula"),
+                            plazo=plazo
+                        )
+                except DataSourceError as e:
+                    if not self._rues_omitible(nit, plazo, e):
+                        raise
+                    completa = False
+
+        return self._construir_empresa(nit, gov_data, rues_data, completa)
+
+    async def consultar_nits(self, nits: List[Any], max_concurrencia: int = 10, plazo: Optional[Plazo] = None) -> List[ResultadoConsulta]:
+        """
+        Consulta un lote de NITs de forma concurrente, con un máximo de `max_concurrencia` consultas en vuelo.
+
+        Un NIT inválido o fallido no interrumpe el lote: cada posición recibe su empresa o su error tipado,
+        en el mismo orden de entrada. Los NITs repetidos se consultan una sola vez.
+        """
+        preparados = self._preparar_lote(nits)
+        unicos = list(dict.fromkeys(item for item in preparados if isinstance(item, str)))
+        resultados, pendientes = self._resolver_lote_desde_cache(unicos)
+        gov_lote = await self._prefetch_gov_lote(pendientes, plazo) if pendientes else {}
+        semaforo = asyncio.Semaphore(max(1, max_concurrencia))
+
+        async def consultar_uno(nit: str) -> ResultadoConsulta:
+            async with semaforo:
+                try:
+                    try:
+                        if nit in gov_lote:
+                            empresa = await self._completar_con_rues(nit, gov_lote[nit], plazo)
+                        else:
+                            empresa = await self._consultar_fuentes(nit, plazo)
+                    except DataSourceError as e:
+                        empresa = self._respaldo_ultimo_valido(nit, e)
+                    return self._resultado_exitoso(nit, empresa)
+                except Exception as e:
+                    return self._resultado_error(nit, e)
+
+        resultados.update(zip(pendientes, await asyncio.gather(*(consultar_uno(nit) for nit in pendientes))))
+        return self._ensamblar_lote(preparados, resultados)
+
+    async def _prefetch_gov_lote(self, nits: List[str], plazo: Optional[Plazo] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Obtiene los datos de datos.gov.co de todo el lote con consultas múltiples. Si la consulta
+        por lote falla, devuelve un diccionario vacío y cada NIT se consulta individualmente.
+        """
+        try:
+            return await self.datos_gov_co_service.consultar_lote(nits, plazo=plazo)
+        except DataSourceError as e:
+            logging.warning(f"Falló la consulta por lote a datos.gov.co, se consultará NIT por NIT: {e}")
+            return {}
+
+
+class EjecutorAsync:
+    """
+    Ejecuta corrutinas en un bucle de eventos propio que vive en un hilo en segundo plano.
+
+    Permite que adaptadores síncronos (p. ej. Flask en Google Cloud Functions) usen el motor asíncrono
+    compartiendo un solo bucle y, con él, el pool de conexiones entre invocaciones.
+    """
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def _obtener_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                hilo = threading.Thread(target=self._loop.run_forever, name="consulta-nit-async", daemon=True)
+                hilo.start()
+            return self._loop
+
+    def ejecutar(self, corrutina: Coroutine[Any, Any, T]) -> T:
+        """
+        Ejecuta la corrutina en el bucle de fondo y bloquea hasta obtener su resultado.
+        """
+        return asyncio.run_coroutine_threadsafe(corrutina, self._obtener_loop()).result()
@@ -0,0 +1,346 @@
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Mapping, Optional
+
+from src.models import Empresa
+
+
+@dataclass
+class EntradaCache:
+    """
+    Resultado almacenado para un NIT. `empresa` es None cuando el NIT no fue encontrado (caché negativa).
+
+    `guardado_en` es una marca de tiempo de reloj de pared (time.time), para que las entradas persistidas
+    sigan siendo comparables entre procesos.
+    """
+    empresa: Optional[Empresa]
+    guardado_en: float
+
+
+class CacheBackend(ABC):
+    """
+    Almacenamiento de entradas de caché por NIT. La vigencia de las entradas la decide CacheResultados;
+    el backend solo guarda, devuelve y elimina.
+
+    Implementaciones: CacheLRU (memoria del proceso) y CacheSQLite (archivo local). Un backend compartido
+    tipo Redis solo necesita implementar estos métodos.
+    """
+    @abstractmethod
+    def obtener(self, nit: str) -> Optional[EntradaCache]:
+        pass
+
+    @abstractmethod
+    def guardar(self, nit: str, entrada: EntradaCache) -> None:
+        pass
+
+    @abstractmethod
+    def invalidar(self, nit: str) -> None:
+        pass
+
+    def estadisticas(self) -> Dict[str, int]:
+        return {}
+
+
+class CacheLRU(CacheBackend):
+    """
+    Backend en memoria con tamaño acotado y expulsión LRU. Es seguro para uso concurrente desde varios hilos.
+    """
+    def __init__(self, max_entradas: int = 1024):
+        self.max_entradas = max_entradas
+        self._entradas: "OrderedDict[str, EntradaCache]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.expulsiones = 0
+
+    def obtener(self, nit: str) -> Optional[EntradaCache]:
+        with self._lock:
+            entrada = self._entradas.get(nit)
+            if entrada is not None:
+                self._entradas.move_to_end(nit)
+            return entrada
+
+    def guardar(self, nit: str, entrada: EntradaCache) -> None:
+        with self._lock:
+            self._entradas[nit] = entrada
+            self._entradas.move_to_end(nit)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.expulsiones += 1
+
+    def invalidar(self, nit: str) -> None:
+        with self._lock:
+            self._entradas.pop(nit, None)
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {"expulsiones": self.expulsiones, "entradas": len(self._entradas)}
+
+
+class CacheSQLite(CacheBackend):
+    """
+    Backend persistente en un archivo SQLite local. Sobrevive a los reinicios del proceso y puede
+    compartirse entre procesos de la misma máquina o a través de un volumen montado.
+    """
+    def __init__(self, ruta: str, max_entradas: Optional[int] = None):
+        self.ruta = ruta
+        self.max_entradas = max_entradas
+        self.expulsiones = 0
+        self._lock = threading.Lock()
+        import sqlite3
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False, timeout=5)
+        with self._lock, self._conexion:
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute(
+                "CREATE TABLE IF NOT EXISTS cache_empresas ("
+                "nit TEXT PRIMARY KEY, empresa TEXT, guardado_en REAL NOT NULL)"
+            )
+            self._conexion.execute("CREATE INDEX IF NOT EXISTS idx_cache_guardado_en ON cache_empresas (guardado_en)")
+
+    def obtener(self, nit: str) -> Optional[EntradaCache]:
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT empresa, guardado_en FROM cache_empresas WHERE nit = ?", (nit,)
+            ).fetchone()
+        if fila is None:
+            return None
+        empresa_json, guardado_en = fila
+        empresa = Empresa.model_validate_json(empresa_json) if empresa_json is not None else None
+        return EntradaCache(empresa=empresa, guardado_en=guardado_en)
+
+    def guardar(self, nit: str, entrada: EntradaCache) -> None:
+        empresa_json = entrada.empresa.model_dump_json() if entrada.empresa is not None else None
+        with self._lock, self._conexion:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO cache_empresas (nit, empresa, guardado_en) VALUES (?, ?, ?)",
+                (nit, empresa_json, entrada.guardado_en)
+            )
+            if self.max_entradas is not None:
+                cursor = self._conexion.execute(
+                    "DELETE FROM cache_empresas WHERE nit IN ("
+                    "SELECT nit FROM cache_empresas ORDER BY guardado_en DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entradas,)
+                )
+                self.expulsiones += cursor.rowcount
+
+    def invalidar(self, nit: str) -> None:
+        with self._lock, self._conexion:
+            self._conexion.execute("DELETE FROM cache_empresas WHERE nit = ?", (nit,))
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._conexion.close()
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            entradas = self._conexion.execute("SELECT COUNT(*) FROM cache_empresas").fetchone()[0]
+        return {"expulsiones": self.expulsiones, "entradas": entradas}
+
+
+class CacheResultados:
+    """
+    Política de caché de resultados por NIT sobre un CacheBackend.
+
+    - Una entrada es fresca durante `ttl_encontrado` (empresas) o `ttl_no_encontrado` (NITs no encontrados).
+    - Durante los `ventana_obsoleta` segundos siguientes se sirve de inmediato como obsoleta, y el servicio
+      la refresca en segundo plano (stale-while-revalidate).
+    - Las empresas se conservan hasta `retencion_respaldo` segundos para usarse como último dato válido
+      cuando una fuente falla con DataSourceError.
+
+    Nunca debe almacenar errores de las fuentes de datos: solo resultados definitivos.
+    """
+    def __init__(
+        self,
+        backend: Optional[CacheBackend] = None,
+        ttl_encontrado: float = 3600,
+        ttl_no_encontrado: float = 300,
+        ventana_obsoleta: float = 0,
+        retencion_respaldo: float = 7 * 24 * 3600,
+        reloj: Callable[[], float] = time.time
+    ):
+        self.backend = backend if backend is not None else CacheLRU()
+        self.ttl_encontrado = ttl_encontrado
+        self.ttl_no_encontrado = ttl_no_encontrado
+        self.ventana_obsoleta = ventana_obsoleta
+        self.retencion_respaldo = retencion_respaldo
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.aciertos_negativos = 0
+        self.aciertos_obsoletos = 0
+        self.fallos = 0
+        self.expiraciones = 0
+        self.respaldos = 0
+
+    def _ttl(self, entrada: EntradaCache) -> float:
+        return self.ttl_encontrado if entrada.empresa is not None else self.ttl_no_encontrado
+
+    def obtener(self, nit: str) -> Optional[EntradaCache]:
+        """
+        Devuelve la entrada fresca u obsoleta-servible del NIT, o None si no hay ninguna utilizable.
+        Use `es_obsoleta` para saber si debe refrescarse.
+        """
+        entrada = self.backend.obtener(nit)
+        with self._lock:
+            if entrada is None:
+                self.fallos += 1
+                return None
+            edad = self._reloj() - entrada.guardado_en
+            ttl = self._ttl(entrada)
+            if edad >= ttl + self.ventana_obsoleta:
+                self.expiraciones += 1
+                self.fallos += 1
+                return None
+            if edad >= ttl:
+                self.aciertos_obsoletos += 1
+            elif entrada.empresa is None:
+                self.aciertos_negativos += 1
+            else:
+                self.aciertos += 1
+            return entrada
+
+    def es_obsoleta(self, entrada: EntradaCache) -> bool:
+        return self._reloj() - entrada.guardado_en >= self._ttl(entrada)
+
+    def ultimo_valido(self, nit: str) -> Optional[Empresa]:
+        """
+        Devuelve la última Empresa conocida del NIT, aunque haya expirado, dentro de la retención de respaldo.
+        """
+        entrada = self.backend.obtener(nit)
+        if entrada is None or entrada.empresa is None:
+            return None
+        if self._reloj() - entrada.guardado_en >= self.retencion_respaldo:
+            return None
+        with self._lock:
+            self.respaldos += 1
+        return entrada.empresa
+
+    def contiene(self, nit: str, empresa: Empresa) -> bool:
+        """
+        Indica si `empresa` es la misma instancia guardada para el NIT. Solo puede serlo con el backend en memoria:
+        los demás entregan una Empresa nueva en cada lectura.
+        """
+        if not isinstance(self.backend, CacheLRU):
+            return False
+        entrada = self.backend.obtener(nit)
+        return entrada is not None and entrada.empresa is empresa
+
+    def guardar(self, nit: str, empresa: Optional[Empresa]) -> None:
+        """
+        Guarda la empresa del NIT, o None para registrar que el NIT no fue encontrado.
+        """
+        self.backend.guardar(nit, EntradaCache(empresa=empresa, guardado_en=self._reloj()))
+
+    def invalidar(self, nit: str) -> None:
+        self.backend.invalidar(nit)
+
+    def estadisticas(self) -> Dict[str, int]:
+        """
+        Devuelve los contadores de aciertos, fallos, respaldos y los del backend (expulsiones, entradas).
+        """
+        with self._lock:
+            estadisticas = {
+                "aciertos": self.aciertos,
+                "aciertos_negativos": self.aciertos_negativos,
+                "aciertos_obsoletos": self.aciertos_obsoletos,
+                "fallos": self.fallos,
+                "expiraciones": self.expiraciones,
+                "respaldos": self.respaldos,
+            }
+        estadisticas.update(self.backend.estadisticas())
+        return estadisticas
+
+
+@dataclass(frozen=True)
+class RespuestaSerializada:
+    """
+    Cuerpo de respuesta ya codificado de una Empresa, con su ETag.
+    """
+    empresa: Empresa
+    cuerpo: bytes
+    etag: str
+
+
+class CacheRespuestas:
+    """
+    Cuerpos de respuesta ya serializados por NIT y variante (la representación de la respuesta, p. ej. "json"),
+    para que un acierto de caché no vuelva a serializar la Empresa.
+
+    Cada entrada recuerda la instancia de Empresa de la que salió y solo se entrega mientras la consulta devuelva esa
+    misma instancia, es decir, mientras la entrada de CacheResultados siga siendo la misma: cuando la empresa se
+    refresca, expira o se invalida, la consulta devuelve otra instancia y el cuerpo guardado se descarta. Por eso solo
+    sirve sobre un backend en memoria (CacheLRU), que entrega siempre la misma instancia.
+    """
+    def __init__(self, max_entradas: int = 1024):
+        self.max_entradas = max_entradas
+        self._entradas: "OrderedDict[str, Dict[str, RespuestaSerializada]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, nit: str, variante: str, empresa: Empresa) -> Optional[RespuestaSerializada]:
+        """
+        Devuelve el cuerpo guardado del NIT en la variante, o None si no hay uno o salió de otra Empresa.
+        """
+        with self._lock:
+            variantes = self._entradas.get(nit)
+            respuesta = variantes.get(variante) if variantes is not None else None
+            if respuesta is None or respuesta.empresa is not empresa:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(nit)
+            self.aciertos += 1
+            return respuesta
+
+    def guardar(self, nit: str, variante: str, respuesta: RespuestaSerializada) -> None:
+        """
+        Guarda el cuerpo de una variante; las variantes guardadas de una Empresa anterior del mismo NIT se descartan.
+        """
+        with self._lock:
+            variantes = self._entradas.get(nit)
+            if variantes is None or any(guardada.empresa is not respuesta.empresa for guardada in variantes.values()):
+                variantes = self._entradas[nit] = {}
+            variantes[variante] = respuesta
+            self._entradas.move_to_end(nit)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def invalidar(self, nit: str) -> None:
+        with self._lock:
+            self._entradas.pop(nit, None)
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {"aciertos": self.aciertos, "fallos": self.fallos, "entradas": len(self._entradas)}
+
+
+def crear_cache_desde_entorno(entorno: Mapping[str, str] = os.environ) -> Optional[CacheResultados]:
+    """
+    Crea la caché a partir de las variables de entorno:
+
+    - CACHE_BACKEND: `memoria` (por defecto) o `sqlite`; CACHE_SQLITE_RUTA indica el archivo.
+    - CACHE_MAX_ENTRADAS: tamaño máximo; 0 deshabilita la caché.
+    - CACHE_TTL_SEGUNDOS, CACHE_TTL_NO_ENCONTRADO_SEGUNDOS, CACHE_VENTANA_OBSOLETA_SEGUNDOS
+      y CACHE_RETENCION_RESPALDO_SEGUNDOS.
+    """
+    max_entradas = int(entorno.get("CACHE_MAX_ENTRADAS", "1024"))
+    if max_entradas <= 0:
+        return None
+
+    if entorno.get("CACHE_BACKEND", "memoria") == "sqlite":
+        backend: CacheBackend = CacheSQLite(entorno.get("CACHE_SQLITE_RUTA", "/tmp/consulta_nit_cache.sqlite3"), max_entradas=max_entradas)
+    else:
+        backend = CacheLRU(max_entradas=max_entradas)
+
+    return CacheResultados(
+        backend=backend,
+        ttl_encontrado=float(entorno.get("CACHE_TTL_SEGUNDOS", "3600")),
+        ttl_no_encontrado=float(entorno.get("CACHE_TTL_NO_ENCONTRADO_SEGUNDOS", "300")),
+        ventana_obsoleta=float(entorno.get("CACHE_VENTANA_OBSOLETA_SEGUNDOS", "0")),
+        retencion_respaldo=float(entorno.get("CACHE_RETENCION_RESPALDO_SEGUNDOS", str(7 * 24 * 3600)))
+    )
@@ -0,0 +1,116 @@
+"""
+Catálogo CIIU Rev. 4 A.C. (DANE) empaquetado con el servicio, para describir códigos de actividad
+económica sin consultar fuentes externas.
+
+El catálogo se lee de src/datos/ciiu_rev4_ac.tsv la primera vez que se usa y queda en memoria
+como un único diccionario código -> descripción (secciones, divisiones, grupos y clases).
+"""
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+
+
+RUTA_CATALOGO = os.path.join(os.path.dirname(__file__), "datos", "ciiu_rev4_ac.tsv")
+
+
+@dataclass(frozen=True)
+class JerarquiaCiiu:
+    """
+    Niveles de la clasificación a los que pertenece una clase CIIU.
+    """
+    seccion: Optional[str]
+    division: str
+    grupo: str
+    clase: str
+
+
+@lru_cache(maxsize=1)
+def _cargar_catalogo() -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Lee el catálogo y devuelve las descripciones por código y la sección de cada división.
+    La sección de una división es la última letra que la precede en el archivo.
+    """
+    descripciones: Dict[str, str] = {}
+    secciones: Dict[str, str] = {}
+    seccion_actual = None
+    with open(RUTA_CATALOGO, encoding="utf-8") as archivo:
+        for linea in archivo:
+            if not linea.strip() or linea.startswith("#"):
+                continue
+            codigo, descripcion = linea.rstrip("\n").split("\t", 1)
+            descripciones[codigo] = descripcion
+            if codigo.isalpha():
+                seccion_actual = codigo
+            elif len(codigo) == 2 and seccion_actual:
+                secciones[codigo] = seccion_actual
+    return descripciones, secciones
+
+
+def normalizar_codigo_ciiu(codigo: Optional[str]) -> Optional[str]:
+    """
+    Lleva un código de actividad a su clase de 4 dígitos: acepta el prefijo de sección ("G4711")
+    y restituye el cero inicial que algunas fuentes omiten ("111" -> "0111").
+    """
+    if not codigo:
+        return None
+    codigo = str(codigo).strip().upper()
+    if codigo[:1].isalpha():
+        codigo = codigo[1:]
+    if not codigo.isdigit() or len(codigo) > 4:
+        return None
+    return codigo.zfill(4)
+
+
+def describir_ciiu(codigo: Optional[str]) -> Optional[str]:
+    """
+    Devuelve la descripción oficial de un código CIIU (sección, división, grupo o clase), o None si no existe.
+    """
+    if not codigo:
+        return None
+    descripciones, _ = _cargar_catalogo()
+    codigo = str(codigo).strip().upper()
+    if codigo in descripciones:
+        return descripciones[codigo]
+    clase = normalizar_codigo_ciiu(codigo)
+    return descripciones.get(clase) if clase else None
+
+
+def jerarquia_ciiu(codigo: Optional[str]) -> Optional[JerarquiaCiiu]:
+    """
+    Devuelve la sección, división y grupo de una clase CIIU, o None si la clase no está en el catálogo.
+    """
+    clase = normalizar_codigo_ciiu(codigo)
+    descripciones, secciones = _cargar_catalogo()
+    if clase is None or clase not in descripciones:
+        return None
+    return JerarquiaCiiu(seccion=secciones.get(clase[:2]), division=clase[:2], grupo=clase[:3], clase=clase)
+
+
+def campos_ciiu(codigo: Optional[str], descripcion: Optional[str] = None) -> Dict[str, Optional[str]]:
+    """
+    Campos de un Ciiu (código, descripción de la fuente o del catálogo, y jerarquía), listos para validarse
+    dentro de Empresa. El resultado se memoiza por (código, descripción) y es compartido: no debe modificarse.
+    """
+    try:
+        return _campos_ciiu(codigo, descripcion)
+    except TypeError:
+        # Valores no hashables enviados por una fuente: se calculan sin memoizar y la validación los rechazará
+        return _campos_ciiu.__wrapped__(codigo, descripcion)
+
+
+@lru_cache(maxsize=4096, typed=True)
+def _campos_ciiu(codigo: Optional[str], descripcion: Optional[str]) -> Dict[str, Optional[str]]:
+    if not codigo and not descripcion:
+        return {}
+    jerarquia = jerarquia_ciiu(codigo)
+    if jerarquia is None:
+        return {"codigo": codigo, "descripcion": descripcion}
+    return {
+        "codigo": codigo,
+        "descripcion": descripcion or describir_ciiu(jerarquia.clase),
+        "seccion": jerarquia.seccion,
+        "division": jerarquia.division,
+        "grupo": jerarquia.grupo,
+    }
@@ -0,0 +1,96 @@
+import threading
+import time
+from typing import Callable, Dict, Union
+
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+
+class Interruptor:
+    """
+    Circuit breaker de una fuente de datos.
+
+    Cerrado: las llamadas pasan y se cuentan las fallas consecutivas; al llegar a `umbral_fallos` se abre.
+    Abierto: las llamadas se rechazan sin consultar la fuente durante `tiempo_recuperacion` segundos.
+    Semiabierto: se dejan pasar hasta `max_pruebas` llamadas de prueba; un éxito lo cierra y una falla lo reabre.
+    """
+    def __init__(self, umbral_fallos: int = 5, tiempo_recuperacion: float = 30, max_pruebas: int = 1, reloj: Callable[[], float] = time.monotonic):
+        self.umbral_fallos = umbral_fallos
+        self.tiempo_recuperacion = tiempo_recuperacion
+        self.max_pruebas = max_pruebas
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._estado = CERRADO
+        self._abierto_en = 0.0
+        self._pruebas_en_vuelo = 0
+        self.fallos_consecutivos = 0
+        self.exitos = 0
+        self.fallos = 0
+        self.rechazos = 0
+        self.aperturas = 0
+
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            return self._estado_actual()
+
+    def _estado_actual(self) -> str:
+        if self._estado == ABIERTO and self._reloj() - self._abierto_en >= self.tiempo_recuperacion:
+            self._estado = SEMIABIERTO
+            self._pruebas_en_vuelo = 0
+        return self._estado
+
+    def permitir(self) -> bool:
+        """
+        Indica si la llamada puede hacerse. En estado semiabierto, reserva uno de los cupos de prueba;
+        toda llamada permitida debe cerrarse con registrar_exito, registrar_fallo o liberar.
+        """
+        with self._lock:
+            estado = self._estado_actual()
+            if estado == CERRADO:
+                return True
+            if estado == SEMIABIERTO and self._pruebas_en_vuelo < self.max_pruebas:
+                self._pruebas_en_vuelo += 1
+                return True
+            self.rechazos += 1
+            return False
+
+    def registrar_exito(self) -> None:
+        with self._lock:
+            self.exitos += 1
+            self.fallos_consecutivos = 0
+            if self._estado == SEMIABIERTO:
+                self._estado = CERRADO
+                self._pruebas_en_vuelo = 0
+
+    def registrar_fallo(self) -> None:
+        with self._lock:
+            self.fallos += 1
+            self.fallos_consecutivos += 1
+            if self._estado == SEMIABIERTO or self.fallos_consecutivos >= self.umbral_fallos:
+                if self._estado != ABIERTO:
+                    self.aperturas += 1
+                self._estado = ABIERTO
+                self._abierto_en = self._reloj()
+                self._pruebas_en_vuelo = 0
+
+    def liberar(self) -> None:
+        """
+        Cierra una llamada permitida sin contarla como éxito ni como falla (p. ej. si se agotó el plazo de la solicitud).
+        """
+        with self._lock:
+            if self._estado == SEMIABIERTO and self._pruebas_en_vuelo > 0:
+                self._pruebas_en_vuelo -= 1
+
+    def estadisticas(self) -> Dict[str, Union[str, int]]:
+        with self._lock:
+            return {
+                "estado": self._estado_actual(),
+                "fallos_consecutivos": self.fallos_consecutivos,
+                "exitos": self.exitos,
+                "fallos": self.fallos,
+                "rechazos": self.rechazos,
+                "aperturas": self.aperturas,
+            }
@@ -0,0 +1,106 @@
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional, Union
+
+
+class PoliticaCobertura:
+    """
+    Decide cuándo enviar una solicitud de cobertura (hedged request): si la primera no ha respondido tras el
+    percentil `percentil` de las latencias recientes de la fuente, se envía una segunda idéntica y se usa la
+    que responda primero.
+
+    Cada solicitud aporta `fraccion_maxima` de una cobertura a un saldo acotado (token bucket), y cada cobertura
+    consume una, de modo que las coberturas no superen en régimen esa fracción de las solicitudes. Mientras no haya
+    `muestras_minimas` latencias registradas no se cubre ninguna solicitud.
+
+    El percentil se recalcula cada `recalcular_cada` latencias nuevas, no en cada solicitud: ordenar la ventana es
+    lo más costoso de decidir y el percentil apenas cambia de una muestra a la siguiente.
+    """
+    def __init__(
+        self,
+        percentil: float = 95,
+        retardo_minimo: float = 0.05,
+        fraccion_maxima: float = 0.05,
+        saldo_maximo: float = 10.0,
+        muestras_minimas: int = 20,
+        ventana: int = 1000,
+        recalcular_cada: int = 50,
+    ):
+        self.percentil = percentil
+        self.retardo_minimo = retardo_minimo
+        self.fraccion_maxima = fraccion_maxima
+        self.saldo_maximo = saldo_maximo
+        self.muestras_minimas = muestras_minimas
+        self.recalcular_cada = max(1, recalcular_cada)
+        self._latencias: Deque[float] = deque(maxlen=ventana)
+        self._retardo: Optional[float] = None
+        self._muestras_nuevas = 0
+        self._saldo = saldo_maximo
+        self._lock = threading.Lock()
+        self.solicitudes = 0
+        self.coberturas = 0
+        self.coberturas_ganadoras = 0
+        self.coberturas_denegadas = 0
+
+    def registrar_latencia(self, segundos: float) -> None:
+        with self._lock:
+            self._latencias.append(segundos)
+            self._muestras_nuevas += 1
+
+    def retardo(self) -> Optional[float]:
+        """
+        Tiempo que se espera a la primera solicitud antes de cubrirla, o None si aún no hay muestras suficientes.
+        """
+        with self._lock:
+            if len(self._latencias) < self.muestras_minimas:
+                return None
+            if self._retardo is not None and self._muestras_nuevas < self.recalcular_cada:
+                return self._retardo
+            muestras = list(self._latencias)
+            self._muestras_nuevas = 0
+        # Se ordena fuera del lock para no detener a las solicitudes que registran latencias
+        ordenadas = sorted(muestras)
+        indice = min(len(ordenadas) - 1, max(0, math.ceil(self.percentil / 100 * len(ordenadas)) - 1))
+        self._retardo = max(self.retardo_minimo, ordenadas[indice])
+        return self._retardo
+
+    def iniciar_solicitud(self) -> Optional[float]:
+        """
+        Registra una solicitud y devuelve el retardo tras el cual cubrirla, o None si no se cubrirá.
+        """
+        retardo = self.retardo()
+        with self._lock:
+            self.solicitudes += 1
+            self._saldo = min(self.saldo_maximo, self._saldo + self.fraccion_maxima)
+        return retardo
+
+    def permitir_cobertura(self) -> bool:
+        """
+        Consume una cobertura del saldo. Devuelve False si ya se cubrió la fracción máxima de solicitudes.
+        """
+        with self._lock:
+            if self._saldo < 1:
+                self.coberturas_denegadas += 1
+                return False
+            self._saldo -= 1
+            self.coberturas += 1
+            return True
+
+    def registrar_ganadora(self) -> None:
+        """
+        Registra que la solicitud de cobertura respondió antes que la original.
+        """
+        with self._lock:
+            self.coberturas_ganadoras += 1
+
+    def estadisticas(self) -> Dict[str, Union[int, float, None]]:
+        retardo = self.retardo()
+        with self._lock:
+            return {
+                "solicitudes": self.solicitudes,
+                "coberturas": self.coberturas,
+                "coberturas_ganadoras": self.coberturas_ganadoras,
+                "coberturas_denegadas": self.coberturas_denegadas,
+                "retardo_cobertura": retardo,
+            }
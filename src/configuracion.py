@@ -0,0 +1,294 @@
+import logging
+import os
+from typing import Mapping, Optional, TYPE_CHECKING
+
+from src.cache import CacheLRU, CacheRespuestas, CacheResultados, crear_cache_desde_entorno
+from src.circuito import Interruptor
+from src.cobertura import PoliticaCobertura
+from src.indice_rues import crear_indice_rues_desde_entorno
+from src.manejador import ManejadorConsultas
+from src.perfilado import Perfilador
+from src.metricas import (
+    ETAPA_DATOS_GOV_CO,
+    ETAPA_RUES,
+    ObservadorReintentos,
+    SumideroEnMemoria,
+    SumideroMetricas,
+    SumideroNulo,
+    SumideroOpenTelemetry,
+)
+from src.plazo import Plazo
+from src.reintentos import PoliticaReintentos, PresupuestoReintentos
+from src.services import (
+    ConsultaNitService,
+    DataSource,
+    DatosGovCoService,
+    FuenteConCobertura,
+    FuenteConInterruptor,
+    FuenteConRespaldo,
+    FuenteMedida,
+    RuesService,
+    crear_sesion_http,
+)
+
+if TYPE_CHECKING:
+    from src.async_services import AsyncConsultaNitService
+
+
+DATOS_GOV_CO_URL = "https://www.datos.gov.co/resource/c82u-588k.json"
+RUES_URL = "https://ruesapi.rues.org.co/WEB2/api/Expediente/DetalleRM"
+
+
+def motor_async_habilitado(entorno: Mapping[str, str] = os.environ) -> bool:
+    """
+    Indica si los adaptadores deben usar el motor asíncrono (CONSULTA_NIT_MOTOR=async).
+    """
+    return entorno.get("CONSULTA_NIT_MOTOR", "sync") == "async"
+
+
+def crear_interruptor(entorno: Mapping[str, str] = os.environ) -> Optional[Interruptor]:
+    """
+    Crea el circuit breaker de una fuente según CIRCUITO_*, o None si está deshabilitado (CIRCUITO_UMBRAL_FALLOS=0).
+    """
+    umbral_fallos = int(entorno.get("CIRCUITO_UMBRAL_FALLOS", "5"))
+    if umbral_fallos <= 0:
+        return None
+    return Interruptor(
+        umbral_fallos=umbral_fallos,
+        tiempo_recuperacion=float(entorno.get("CIRCUITO_RECUPERACION_SEGUNDOS", "30")),
+        max_pruebas=int(entorno.get("CIRCUITO_PRUEBAS_SEMIABIERTO", "1"))
+    )
+
+
+def crear_politica_reintentos(entorno: Mapping[str, str] = os.environ,
+                              metricas: Optional[SumideroMetricas] = None) -> Optional[PoliticaReintentos]:
+    """
+    Crea la política de reintentos de las APIs en vivo según REINTENTOS_*, o None si está deshabilitada
+    (REINTENTOS_MAX_INTENTOS=1). Ambas fuentes comparten la política y, con ella, el presupuesto del proceso.
+    Con un sumidero de métricas activo, cada intento se registra en él (ver ObservadorReintentos).
+    """
+    max_intentos = int(entorno.get("REINTENTOS_MAX_INTENTOS", "3"))
+    if max_intentos <= 1:
+        return None
+    return PoliticaReintentos(
+        max_intentos=max_intentos,
+        espera_base=float(entorno.get("REINTENTOS_ESPERA_BASE_MS", "100")) / 1000,
+        espera_maxima=float(entorno.get("REINTENTOS_ESPERA_MAXIMA_MS", "2000")) / 1000,
+        presupuesto=PresupuestoReintentos(
+            proporcion=float(entorno.get("REINTENTOS_PRESUPUESTO_PROPORCION", "0.1")),
+            saldo_maximo=float(entorno.get("REINTENTOS_PRESUPUESTO_MAXIMO", "10"))
+        ),
+        observador=ObservadorReintentos(metricas) if metricas is not None and metricas.activo else None
+    )
+
+
+def crear_politica_cobertura(entorno: Mapping[str, str] = os.environ) -> Optional[PoliticaCobertura]:
+    """
+    Crea la política de solicitudes de cobertura de datos.gov.co según COBERTURA_*, o None si está deshabilitada
+    (COBERTURA_PERCENTIL=0, el valor por defecto).
+    """
+    percentil = float(entorno.get("COBERTURA_PERCENTIL", "0"))
+    if percentil <= 0:
+        return None
+    return PoliticaCobertura(
+        percentil=percentil,
+        retardo_minimo=float(entorno.get("COBERTURA_RETARDO_MINIMO_MS", "50")) / 1000,
+        fraccion_maxima=float(entorno.get("COBERTURA_FRACCION_MAXIMA", "0.05"))
+    )
+
+
+def crear_sumidero_metricas(entorno: Mapping[str, str] = os.environ) -> SumideroMetricas:
+    """
+    Crea el sumidero de métricas por etapa según METRICAS_SUMIDERO: "nulo" (por defecto), "memoria" u "otel"
+    (OpenTelemetry, con el proveedor de métricas global del proceso). Si `opentelemetry-api` no está instalado,
+    "otel" se degrada al sumidero nulo con una advertencia en lugar de impedir que arranque el servicio.
+    """
+    tipo = entorno.get("METRICAS_SUMIDERO", "nulo")
+    if tipo == "nulo":
+        return SumideroNulo()
+    if tipo == "memoria":
+        return SumideroEnMemoria()
+    if tipo == "otel":
+        try:
+            return SumideroOpenTelemetry()
+        except ImportError:
+            logging.warning("METRICAS_SUMIDERO=otel requiere opentelemetry-api, que no está instalado; no se registrarán métricas")
+            return SumideroNulo()
+    raise ValueError(f"METRICAS_SUMIDERO desconocido: {tipo}")
+
+
+def server_timing_habilitado(entorno: Mapping[str, str] = os.environ) -> bool:
+    """
+    Indica si las respuestas llevan la cabecera Server-Timing con la duración de cada etapa (METRICAS_SERVER_TIMING=0 la apaga).
+    """
+    return entorno.get("METRICAS_SERVER_TIMING", "1") != "0"
+
+
+def crear_perfilador(entorno: Mapping[str, str] = os.environ) -> Optional[Perfilador]:
+    """
+    Crea el perfilador de solicitudes según PERFILADO_*, o None si está deshabilitado (sin PERFILADO_TASA ni
+    PERFILADO_SECRETO, el valor por defecto).
+    """
+    tasa_muestreo = float(entorno.get("PERFILADO_TASA", "0"))
+    secreto = entorno.get("PERFILADO_SECRETO") or None
+    if tasa_muestreo <= 0 and secreto is None:
+        return None
+    return Perfilador(
+        tasa_muestreo=tasa_muestreo,
+        secreto=secreto,
+        directorio=entorno.get("PERFILADO_DIRECTORIO") or None,
+        max_funciones=int(entorno.get("PERFILADO_MAX_FUNCIONES", "25"))
+    )
+
+
+def crear_cache_control(entorno: Mapping[str, str] = os.environ) -> str:
+    """
+    Cabecera Cache-Control de las respuestas de una Empresa según HTTP_CACHE_MAX_AGE_SEGUNDOS (por defecto 300): el
+    cliente puede reutilizar la respuesta ese tiempo y después revalidarla con su ETag. Con 0, siempre debe revalidarla.
+
+    Es `private` por defecto, para que un CDN o proxy compartido no entregue a un cliente la respuesta obtenida con
+    las credenciales de otro; HTTP_CACHE_PUBLICO=1 la hace `public` cuando el endpoint no depende de quién consulta.
+    """
+    max_age = int(entorno.get("HTTP_CACHE_MAX_AGE_SEGUNDOS", "300"))
+    if max_age <= 0:
+        return "no-cache"
+    alcance = "public" if entorno.get("HTTP_CACHE_PUBLICO", "0") == "1" else "private"
+    return f"{alcance}, max-age={max_age}"
+
+
+def crear_cache_respuestas(cache: Optional[CacheResultados]) -> Optional[CacheRespuestas]:
+    """
+    Crea la caché de respuestas serializadas, del mismo tamaño que la caché de resultados. Solo se usa sobre el backend
+    en memoria: el SQLite entrega una Empresa nueva en cada lectura, así que sus cuerpos nunca se reutilizarían.
+    """
+    if cache is None or not isinstance(cache.backend, CacheLRU):
+        return None
+    return CacheRespuestas(max_entradas=cache.backend.max_entradas)
+
+
+def _medir_fuentes(entorno: Mapping[str, str], metricas: Optional[SumideroMetricas]) -> bool:
+    return server_timing_habilitado(entorno) or (metricas is not None and metricas.activo)
+
+
+def crear_plazo(restante_plataforma_ms: Optional[float] = None, entorno: Mapping[str, str] = os.environ) -> Plazo:
+    """
+    Crea el plazo de una solicitud al inicio del handler.
+
+    Se usa el menor entre el tiempo que informa la plataforma (p. ej. `context.get_remaining_time_in_millis()` en Lambda)
+    y PLAZO_MAXIMO_MS (el límite del gateway HTTP), menos PLAZO_MARGEN_MS reservado para armar la respuesta.
+    """
+    maximo_ms = float(entorno.get("PLAZO_MAXIMO_MS", "25000"))
+    if restante_plataforma_ms is not None:
+        maximo_ms = min(maximo_ms, restante_plataforma_ms)
+    return Plazo.desde_milisegundos(maximo_ms, margen_milisegundos=float(entorno.get("PLAZO_MARGEN_MS", "250")))
+
+
+def crear_consulta_nit_service(entorno: Mapping[str, str] = os.environ, cache: Optional[CacheResultados] = None,
+                               metricas: Optional[SumideroMetricas] = None) -> ConsultaNitService:
+    """
+    Construye el orquestador síncrono con las fuentes configuradas en las variables de entorno.
+    """
+    http_session = crear_sesion_http(
+        pool_connections=int(entorno.get("HTTP_POOL_CONNECTIONS", "10")),
+        pool_maxsize=int(entorno.get("HTTP_POOL_MAXSIZE", "10"))
+    )
+    reintentos = crear_politica_reintentos(entorno, metricas)
+    datos_gov_co_service: DataSource = DatosGovCoService(base_url=entorno.get("DATOS_GOV_CO_URL") or DATOS_GOV_CO_URL, session=http_session, reintentos=reintentos)
+    rues_service: DataSource = RuesService(base_url=entorno.get("RUES_URL") or RUES_URL, session=http_session, reintentos=reintentos)
+
+    cobertura = crear_politica_cobertura(entorno)
+    if cobertura is not None:
+        datos_gov_co_service = FuenteConCobertura(datos_gov_co_service, cobertura)
+
+    # Cada API en vivo tiene su propio circuit breaker; el snapshot local no lo necesita
+    interruptor_gov, interruptor_rues = crear_interruptor(entorno), crear_interruptor(entorno)
+    if interruptor_gov is not None:
+        datos_gov_co_service = FuenteConInterruptor(datos_gov_co_service, "datos.gov.co", interruptor_gov)
+        rues_service = FuenteConInterruptor(rues_service, "rues.org.co", interruptor_rues)
+
+    snapshot_ruta = entorno.get("SNAPSHOT_DATOS_GOV_CO_RUTA")
+    if snapshot_ruta:
+        from src.snapshot import SnapshotDatosGovCo
+        datos_gov_co_service = FuenteConRespaldo(SnapshotDatosGovCo(snapshot_ruta), datos_gov_co_service)
+
+    # La medición envuelve a cada fuente ya protegida: mide lo que la consulta esperó por ella
+    if _medir_fuentes(entorno, metricas):
+        datos_gov_co_service = FuenteMedida(datos_gov_co_service, ETAPA_DATOS_GOV_CO, metricas)
+        rues_service = FuenteMedida(rues_service, ETAPA_RUES, metricas)
+
+    return ConsultaNitService(datos_gov_co_service, rues_service, cache=cache, indice_rues=crear_indice_rues_desde_entorno(entorno),
+                              metricas=metricas)
+
+
+def crear_consulta_nit_service_async(entorno: Mapping[str, str] = os.environ, cache: Optional[CacheResultados] = None,
+                                     metricas: Optional[SumideroMetricas] = None) -> "AsyncConsultaNitService":
+    """
+    Construye el orquestador asíncrono. aiohttp solo se importa si se usa este motor.
+    """
+    from src.async_services import (
+        AsyncConsultaNitService,
+        AsyncDataSource,
+        AsyncDatosGovCoService,
+        AsyncFuenteConCobertura,
+        AsyncFuenteConInterruptor,
+        AsyncFuenteConRespaldo,
+        AsyncFuenteLocal,
+        AsyncFuenteMedida,
+        AsyncRuesService,
+        SesionHttpAsync,
+    )
+
+    sesion_http_async = SesionHttpAsync(
+        limit=int(entorno.get("HTTP_ASYNC_POOL_LIMIT", "100")),
+        limit_per_host=int(entorno.get("HTTP_POOL_MAXSIZE", "10"))
+    )
+    reintentos = crear_politica_reintentos(entorno, metricas)
+    datos_gov_co_service: AsyncDataSource = AsyncDatosGovCoService(base_url=entorno.get("DATOS_GOV_CO_URL") or DATOS_GOV_CO_URL, sesion=sesion_http_async, reintentos=reintentos)
+    rues_service: AsyncDataSource = AsyncRuesService(base_url=entorno.get("RUES_URL") or RUES_URL, sesion=sesion_http_async, reintentos=reintentos)
+
+    cobertura = crear_politica_cobertura(entorno)
+    if cobertura is not None:
+        datos_gov_co_service = AsyncFuenteConCobertura(datos_gov_co_service, cobertura)
+
+    interruptor_gov, interruptor_rues = crear_interruptor(entorno), crear_interruptor(entorno)
+    if interruptor_gov is not None:
+        datos_gov_co_service = AsyncFuenteConInterruptor(datos_gov_co_service, "datos.gov.co", interruptor_gov)
+        rues_service = AsyncFuenteConInterruptor(rues_service, "rues.org.co", interruptor_rues)
+
+    snapshot_ruta = entorno.get("SNAPSHOT_DATOS_GOV_CO_RUTA")
+    if snapshot_ruta:
+        from src.snapshot import SnapshotDatosGovCo
+        datos_gov_co_service = AsyncFuenteConRespaldo(AsyncFuenteLocal(SnapshotDatosGovCo(snapshot_ruta)), datos_gov_co_service)
+
+    if _medir_fuentes(entorno, metricas):
+        datos_gov_co_service = AsyncFuenteMedida(datos_gov_co_service, ETAPA_DATOS_GOV_CO, metricas)
+        rues_service = AsyncFuenteMedida(rues_service, ETAPA_RUES, metricas)
+
+    return AsyncConsultaNitService(datos_gov_co_service, rues_service, cache=cache, indice_rues=crear_indice_rues_desde_entorno(entorno),
+                                   metricas=metricas)
+
+
+def crear_manejador_consultas(entorno: Mapping[str, str] = os.environ, usar_motor_async: Optional[bool] = None) -> ManejadorConsultas:
+    """
+    Construye el manejador HTTP común de los adaptadores: la caché de resultados y la de respuestas, el sumidero de
+    métricas, el perfilador, solo el motor que se va a usar y los límites de lote BATCH_MAX_NITS y BATCH_MAX_CONCURRENCIA.
+
+    Args:
+        usar_motor_async: Fuerza el motor; por defecto se usa el asíncrono si CONSULTA_NIT_MOTOR=async.
+    """
+    if usar_motor_async is None:
+        usar_motor_async = motor_async_habilitado(entorno)
+    cache = crear_cache_desde_entorno(entorno)
+    metricas = crear_sumidero_metricas(entorno)
+    opciones = {
+        "max_nits": int(entorno.get("BATCH_MAX_NITS", "1000")),
+        "max_concurrencia": int(entorno.get("BATCH_MAX_CONCURRENCIA", "10")),
+        "metricas": metricas,
+        "server_timing": server_timing_habilitado(entorno),
+        "perfilador": crear_perfilador(entorno),
+        "cache_respuestas": crear_cache_respuestas(cache),
+        "cache_control": crear_cache_control(entorno),
+    }
+    if usar_motor_async:
+        return ManejadorConsultas(servicio_async=crear_consulta_nit_service_async(entorno, cache=cache, metricas=metricas), **opciones)
+    return ManejadorConsultas(servicio=crear_consulta_nit_service(entorno, cache=cache, metricas=metricas), **opciones)
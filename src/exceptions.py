@@ -14,4 +14,21 @@ class DataSourceError(Exception):
     def __init__(self, source_name: str, original_exception: Exception):
         self.source_name = source_name
         self.original_exception = original_exception
-        super().__init__(f"Error en la fuente de datos '{source_name}': {original_exception}")
\ No newline at end of file
+        super().__init__(f"Error en la fuente de datos '{source_name}': {original_exception}")
+
+class NitInvalidoError(Exception):
+    """
+    Se lanza cuando un NIT está vacío o no tiene un formato válido.
+    """
+    def __init__(self, nit: str, mensaje: str):
+        self.nit = nit
+        self.mensaje = mensaje
+        super().__init__(mensaje)
+
+
+class CircuitoAbiertoError(DataSourceError):
+    """
+    Se lanza sin consultar la fuente cuando su circuito está abierto por fallas recientes.
+    """
+    def __init__(self, source_name: str):
+        super().__init__(source_name, RuntimeError("circuito abierto"))
@@ -0,0 +1,104 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+
+DATOS_GOV_CO = "datos.gov.co"
+RUES = "rues.org.co"
+
+
+@dataclass(frozen=True)
+class ReglaCampo:
+    """
+    Regla de fusión de un campo: la clave que lo trae en cada fuente y el valor por defecto si ninguna lo trae.
+
+    El campo toma el primer valor no vacío según el orden de prioridad de las fuentes del plan; si todos son vacíos,
+    queda el de la última fuente que lo define (igual que una cadena `a or b`) o, si se indica, `por_defecto`.
+    """
+    campo: str
+    claves: Mapping[str, str] = field(default_factory=dict)
+    por_defecto: Optional[Any] = None
+
+
+class PlanFusion:
+    """
+    Plan de fusión compilado: para cada campo, la lista ya ordenada de (posición de la fuente, clave) a consultar.
+
+    Se compila una sola vez a partir de reglas declarativas, así que agregar una fuente o cambiar prioridades es
+    un cambio de configuración, y fusionar solo recorre la lista precalculada, sin buscar fuentes ni reglas.
+    """
+    def __init__(self, fuentes: Sequence[str], reglas: Sequence[ReglaCampo]):
+        """
+        Args:
+            fuentes: Nombres de las fuentes, de mayor a menor prioridad.
+            reglas: Una regla por campo del resultado.
+        """
+        desconocidas = {fuente for regla in reglas for fuente in regla.claves} - set(fuentes)
+        if desconocidas:
+            raise ValueError(f"Reglas de fusión con fuentes no declaradas: {sorted(desconocidas)}")
+        self.fuentes: Tuple[str, ...] = tuple(fuentes)
+        self.operaciones: Tuple[Tuple[str, Tuple[Tuple[int, str], ...], Optional[Any]], ...] = tuple(
+            (
+                regla.campo,
+                tuple((posicion, regla.claves[fuente]) for posicion, fuente in enumerate(self.fuentes) if fuente in regla.claves),
+                regla.por_defecto,
+            )
+            for regla in reglas
+        )
+
+    def aplicar(self, datos: Sequence[Mapping[str, Any]]) -> Dict[str, Any]:
+        """
+        Fusiona los datos de las fuentes, dados en el mismo orden que `fuentes` (un diccionario vacío si una fuente
+        no trajo nada).
+        """
+        resultado: Dict[str, Any] = {}
+        for campo, accesos, por_defecto in self.operaciones:
+            valor = None
+            for posicion, clave in accesos:
+                valor = datos[posicion].get(clave)
+                if valor:
+                    break
+            if not valor and por_defecto is not None:
+                valor = por_defecto
+            resultado[campo] = valor
+        return resultado
+
+    def fuentes_con_datos(self, datos: Sequence[Mapping[str, Any]]) -> list:
+        """
+        Nombres de las fuentes que aportaron datos, en orden de prioridad.
+        """
+        return [fuente for fuente, datos_fuente in zip(self.fuentes, datos) if datos_fuente]
+
+
+# Campos de Empresa y de sus CIIU: (campo, clave por fuente). Los campos ciiuN_codigo / ciiuN_descripcion
+# alimentan los objetos Ciiu secundarios y no son campos de Empresa.
+PLAN_FUSION = PlanFusion(
+    fuentes=(DATOS_GOV_CO, RUES),
+    reglas=(
+        ReglaCampo("razon_social", {DATOS_GOV_CO: "razon_social", RUES: "razon_social"}),
+        ReglaCampo("dv", {DATOS_GOV_CO: "digito_verificacion", RUES: "dv"}),
+        ReglaCampo("camara_comercio", {DATOS_GOV_CO: "camara_comercio", RUES: "camara"}),
+        ReglaCampo("matricula", {DATOS_GOV_CO: "matricula", RUES: "matricula"}),
+        ReglaCampo("estado", {DATOS_GOV_CO: "estado_matricula", RUES: "estado"}),
+        ReglaCampo("fecha_matricula", {DATOS_GOV_CO: "fecha_matricula", RUES: "fecha_matricula"}),
+        ReglaCampo("fecha_renovacion", {DATOS_GOV_CO: "fecha_renovacion", RUES: "fecha_renovacion"}),
+        ReglaCampo("ultimo_ano_renovado", {DATOS_GOV_CO: "ultimo_ano_renovado", RUES: "ultimo_ano_renovado"}),
+        ReglaCampo("tipo_sociedad", {DATOS_GOV_CO: "tipo_sociedad", RUES: "tipo_sociedad"}),
+        ReglaCampo("organizacion_juridica", {DATOS_GOV_CO: "organizacion_juridica", RUES: "organizacion_juridica"}),
+        ReglaCampo("cod_ciiu_act_econ_pri", {DATOS_GOV_CO: "cod_ciiu_act_econ_pri", RUES: "cod_ciiu_act_econ_pri"}, por_defecto="9999"),
+        # Sin descripción de las fuentes se usa la del catálogo CIIU (ver _unificar_datos)
+        ReglaCampo("desc_ciiu_act_econ_pri", {DATOS_GOV_CO: "desc_ciiu_act_econ_pri", RUES: "desc_ciiu_act_econ_pri"}),
+        ReglaCampo("ciiu2_codigo", {RUES: "cod_ciiu_act_econ_sec"}),
+        ReglaCampo("ciiu2_descripcion", {RUES: "desc_ciiu_act_econ_sec"}),
+        ReglaCampo("ciiu3_codigo", {RUES: "ciiu3"}),
+        ReglaCampo("ciiu3_descripcion", {RUES: "desc_ciiu3"}),
+        ReglaCampo("ciiu4_codigo", {RUES: "ciiu4"}),
+        ReglaCampo("ciiu4_descripcion", {RUES: "desc_ciiu4"}),
+    ),
+)
+
+# Objetos Ciiu secundarios de Empresa y los campos del plan que los alimentan
+CIIU_SECUNDARIOS: Tuple[Tuple[str, str, str], ...] = (
+    ("ciiu2", "ciiu2_codigo", "ciiu2_descripcion"),
+    ("ciiu3", "ciiu3_codigo", "ciiu3_descripcion"),
+    ("ciiu4", "ciiu4_codigo", "ciiu4_descripcion"),
+)
@@ -0,0 +1,94 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Mapping, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import sqlite3
+
+
+class IndiceCodigosRues:
+    """
+    Índice aprendido NIT -> código RUES de 12 caracteres.
+
+    El código RUES se construye con la cámara y la matrícula que informa datos.gov.co, por lo que la primera
+    consulta de un NIT es secuencial. Una vez resuelto, el índice permite consultar ambas fuentes en paralelo.
+    Se mantiene en memoria con expulsión LRU y, si se indica `ruta`, se persiste en SQLite para sobrevivir
+    a los arranques en frío. Es seguro para uso concurrente desde varios hilos.
+    """
+    def __init__(self, max_entradas: int = 100000, ruta: Optional[str] = None):
+        self.max_entradas = max_entradas
+        self.ruta = ruta
+        self.aciertos = 0
+        self.fallos = 0
+        self._codigos: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conexion: Optional["sqlite3.Connection"] = None
+        if ruta:
+            import sqlite3
+            self._conexion = sqlite3.connect(ruta, check_same_thread=False, timeout=5)
+            with self._lock, self._conexion:
+                self._conexion.execute("PRAGMA journal_mode=WAL")
+                self._conexion.execute("CREATE TABLE IF NOT EXISTS indice_rues (nit TEXT PRIMARY KEY, codigo_rues TEXT NOT NULL)")
+
+    def obtener(self, nit: str) -> Optional[str]:
+        """
+        Devuelve el código RUES aprendido para el NIT, o None si aún no se conoce.
+        """
+        with self._lock:
+            codigo = self._codigos.get(nit)
+            if codigo is None and self._conexion is not None:
+                fila = self._conexion.execute("SELECT codigo_rues FROM indice_rues WHERE nit = ?", (nit,)).fetchone()
+                if fila is not None:
+                    codigo = fila[0]
+                    self._recordar(nit, codigo)
+            if codigo is None:
+                self.fallos += 1
+                return None
+            self._codigos.move_to_end(nit)
+            self.aciertos += 1
+            return codigo
+
+    def guardar(self, nit: str, codigo_rues: str) -> None:
+        with self._lock:
+            if self._codigos.get(nit) == codigo_rues:
+                self._codigos.move_to_end(nit)
+                return
+            self._recordar(nit, codigo_rues)
+            if self._conexion is not None:
+                with self._conexion:
+                    self._conexion.execute(
+                        "INSERT OR REPLACE INTO indice_rues (nit, codigo_rues) VALUES (?, ?)", (nit, codigo_rues)
+                    )
+
+    def invalidar(self, nit: str) -> None:
+        with self._lock:
+            self._codigos.pop(nit, None)
+            if self._conexion is not None:
+                with self._conexion:
+                    self._conexion.execute("DELETE FROM indice_rues WHERE nit = ?", (nit,))
+
+    def _recordar(self, nit: str, codigo_rues: str) -> None:
+        self._codigos[nit] = codigo_rues
+        self._codigos.move_to_end(nit)
+        while len(self._codigos) > self.max_entradas:
+            self._codigos.popitem(last=False)
+
+    def cerrar(self) -> None:
+        if self._conexion is not None:
+            with self._lock:
+                self._conexion.close()
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {"aciertos": self.aciertos, "fallos": self.fallos, "entradas": len(self._codigos)}
+
+
+def crear_indice_rues_desde_entorno(entorno: Mapping[str, str] = os.environ) -> Optional[IndiceCodigosRues]:
+    """
+    Crea el índice a partir de INDICE_RUES_MAX_ENTRADAS (0 lo deshabilita) e INDICE_RUES_SQLITE_RUTA (opcional).
+    """
+    max_entradas = int(entorno.get("INDICE_RUES_MAX_ENTRADAS", "100000"))
+    if max_entradas <= 0:
+        return None
+    return IndiceCodigosRues(max_entradas=max_entradas, ruta=entorno.get("INDICE_RUES_SQLITE_RUTA") or None)
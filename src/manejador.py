@@ -0,0 +1,374 @@
+"""
+Núcleo HTTP común a los adaptadores serverless.
+
+Cada adaptador traduce la solicitud de su plataforma a una SolicitudHttp (parámetros de la query y cuerpo crudo),
+la entrega a ManejadorConsultas y traduce la RespuestaHttp resultante (estado, cabeceras y cuerpo ya codificado)
+a la respuesta de su plataforma. La extracción y validación del NIT, el mapeo de excepciones a códigos de estado,
+la serialización y la cabecera Server-Timing viven aquí, de modo que un cambio llega a las tres nubes a la vez.
+"""
+import hashlib
+import json
+import logging
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, ContextManager, Dict, List, Mapping, Optional, Union
+
+from pydantic import BaseModel
+
+from src.cache import CacheRespuestas, RespuestaSerializada
+from src.exceptions import DataSourceError, NitInvalidoError, NitNotFoundError
+from src.metricas import ETAPA_SERIALIZACION, SumideroMetricas, TrazaSolicitud, registrar_medicion, trazar_solicitud
+from src.models import Empresa, RespuestaLote, ResultadoConsulta
+from src.perfilado import Perfilador, perfilar_en_hilo
+from src.plazo import Plazo
+from src.services import ConsultaNitService
+from src.validators import MENSAJE_DV_INVALIDO, MENSAJE_FORMATO_NIT_INVALIDO, MENSAJE_NIT_REQUERIDO, normalizar_nit
+
+if TYPE_CHECKING:
+    from src.async_services import AsyncConsultaNitService, EjecutorAsync
+
+
+TIPO_CONTENIDO_JSON = "application/json"
+
+# Variante de la respuesta de una Empresa en la caché de respuestas: el JSON sin comprimir
+VARIANTE_JSON = "json"
+
+MENSAJE_CUERPO_MALFORMADO = "Cuerpo JSON malformado."
+MENSAJE_LOTE_VACIO = "Debe proporcionar una lista 'nits' con al menos un NIT."
+MENSAJE_FUENTE_NO_DISPONIBLE = "Una fuente de datos externa no está disponible. Por favor, intente de nuevo más tarde."
+MENSAJE_ERROR_INTERNO = "Ocurrió un error interno en el servidor."
+
+
+def codificar_error(mensaje: str) -> bytes:
+    """
+    Cuerpo JSON `{"error": mensaje}` de una respuesta de error.
+    """
+    return json.dumps({"error": mensaje}).encode("utf-8")
+
+
+# Cuerpos de los errores de mensaje fijo, codificados una sola vez al importar el módulo
+CUERPOS_ERROR: Dict[str, bytes] = {
+    mensaje: codificar_error(mensaje)
+    for mensaje in (
+        MENSAJE_NIT_REQUERIDO,
+        MENSAJE_FORMATO_NIT_INVALIDO,
+        MENSAJE_DV_INVALIDO,
+        MENSAJE_CUERPO_MALFORMADO,
+        MENSAJE_LOTE_VACIO,
+        MENSAJE_FUENTE_NO_DISPONIBLE,
+        MENSAJE_ERROR_INTERNO,
+    )
+}
+
+
+@dataclass(frozen=True)
+class SolicitudHttp:
+    """
+    Solicitud normalizada: parámetros de la query string, cuerpo sin decodificar (o None si no hay cuerpo),
+    cabeceras, con los nombres en minúscula o en un mapeo que no distingue mayúsculas, y método HTTP.
+    """
+    parametros: Mapping[str, str] = field(default_factory=dict)
+    cuerpo: Union[str, bytes, None] = None
+    cabeceras: Mapping[str, str] = field(default_factory=dict)
+    metodo: str = "GET"
+
+    def json(self) -> Any:
+        """
+        Cuerpo decodificado como JSON, o None si la solicitud no trae cuerpo.
+
+        Raises:
+            ValueError: Si el cuerpo no es JSON válido.
+        """
+        if not self.cuerpo:
+            return None
+        return json.loads(self.cuerpo)
+
+
+@dataclass
+class RespuestaHttp:
+    """
+    Respuesta lista para enviar: código de estado, cabeceras y cuerpo JSON ya codificado en UTF-8.
+    """
+    estado: int
+    cuerpo: bytes
+    cabeceras: Dict[str, str] = field(default_factory=lambda: {"Content-Type": TIPO_CONTENIDO_JSON})
+
+
+def calcular_etag(cuerpo: bytes) -> str:
+    """
+    ETag fuerte de un cuerpo de respuesta: un hash de su contenido, igual para cuerpos idénticos en cualquier instancia.
+    """
+    return '"' + hashlib.sha256(cuerpo).hexdigest()[:32] + '"'
+
+
+def etag_coincide(if_none_match: str, etag: str) -> bool:
+    """
+    Indica si la cabecera If-None-Match del cliente incluye el ETag: `*` o una lista de ETags, comparados sin el
+    prefijo débil `W/`, como pide la comparación débil de If-None-Match.
+    """
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag[2:] if etag.startswith("W/") else etag
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if (candidato[2:] if candidato.startswith("W/") else candidato) == etag:
+            return True
+    return False
+
+
+def respuesta_error(estado: int, mensaje: str) -> RespuestaHttp:
+    """
+    Respuesta de error; los mensajes fijos usan su cuerpo precodificado.
+    """
+    cuerpo = CUERPOS_ERROR.get(mensaje)
+    return RespuestaHttp(estado, cuerpo if cuerpo is not None else codificar_error(mensaje))
+
+
+def respuesta_de_excepcion(error: Exception) -> RespuestaHttp:
+    """
+    Convierte la excepción de una consulta en la respuesta HTTP correspondiente (400, 404, 502 o 500).
+    """
+    if isinstance(error, NitInvalidoError):
+        return respuesta_error(400, error.mensaje)
+    if isinstance(error, NitNotFoundError):
+        logging.warning(str(error))
+        return respuesta_error(404, str(error))
+    if isinstance(error, DataSourceError):
+        logging.error(f"Falló una fuente de datos: {str(error)}")
+        return respuesta_error(502, MENSAJE_FUENTE_NO_DISPONIBLE)
+    logging.error(f"Ocurrió un error inesperado: {str(error)}")
+    return respuesta_error(500, MENSAJE_ERROR_INTERNO)
+
+
+class ManejadorConsultas:
+    """
+    Atiende las consultas individuales y por lote con el motor síncrono o el asíncrono.
+
+    Los métodos síncronos sirven a adaptadores síncronos (Lambda, Flask) y los `_async` a los que corren en un bucle
+    de eventos (Azure Functions). Si solo hay motor asíncrono, los métodos síncronos lo ejecutan en un bucle propio
+    en segundo plano; si solo hay motor síncrono, los asíncronos lo ejecutan en un hilo. Nunca lanzan excepciones:
+    todo error termina en una RespuestaHttp.
+
+    Con `server_timing`, cada respuesta lleva la cabecera Server-Timing con la duración de las fuentes, la fusión,
+    la serialización y el total de la solicitud.
+
+    La respuesta de una Empresa lleva su ETag y, si se configuró, Cache-Control; un GET cuyo If-None-Match incluye
+    el ETag vigente se responde con 304 sin cuerpo.
+    """
+    def __init__(
+        self,
+        servicio: Optional[ConsultaNitService] = None,
+        servicio_async: Optional["AsyncConsultaNitService"] = None,
+        max_nits: int = 1000,
+        max_concurrencia: int = 10,
+        metricas: Optional[SumideroMetricas] = None,
+        server_timing: bool = False,
+        perfilador: Optional[Perfilador] = None,
+        cache_respuestas: Optional[CacheRespuestas] = None,
+        cache_control: Optional[str] = None,
+    ):
+        """
+        Args:
+            servicio: Orquestador síncrono.
+            servicio_async: Orquestador asíncrono; los métodos `_async` lo prefieren sobre el síncrono.
+            max_nits: Máximo de NITs aceptados por solicitud de lote.
+            max_concurrencia: Máximo de consultas simultáneas dentro de un lote.
+            metricas: Sumidero de las mediciones de la serialización.
+            server_timing: Si las respuestas llevan la cabecera Server-Timing.
+            perfilador: Perfila con cProfile las solicitudes que elija; sin él no se perfila ninguna.
+            cache_respuestas: Cuerpos ya serializados de las empresas en caché; un acierto se responde sin serializar.
+            cache_control: Valor de la cabecera Cache-Control de las respuestas de una Empresa (p. ej. "private, max-age=300").
+        """
+        if servicio is None and servicio_async is None:
+            raise ValueError("Se requiere un servicio de consulta síncrono o asíncrono")
+        self.servicio = servicio
+        self.servicio_async = servicio_async
+        self.max_nits = max_nits
+        self.max_concurrencia = max_concurrencia
+        self.metricas = metricas
+        self.server_timing = server_timing
+        self.perfilador = perfilador
+        self.cache_respuestas = cache_respuestas
+        self.cache_control = cache_control
+        self._cuerpo_lote_excedido = codificar_error(f"El lote excede el máximo de {max_nits} NITs.")
+        self._ejecutor_async: Optional["EjecutorAsync"] = None
+        if servicio is None:
+            from src.async_services import EjecutorAsync
+
+            self._ejecutor_async = EjecutorAsync()
+
+    # --- Consulta individual ---
+    def consultar_nit(self, solicitud: SolicitudHttp, plazo: Optional[Plazo] = None) -> RespuestaHttp:
+        if self.servicio is None:
+            return self._ejecutar_en_bucle(self.consultar_nit_async(solicitud, plazo))
+        with self._trazar() as traza, self._perfilar(solicitud, "consulta_nit"):
+            return self._con_server_timing(self._consultar_nit(solicitud, plazo), traza)
+
+    async def consultar_nit_async(self, solicitud: SolicitudHttp, plazo: Optional[Plazo] = None) -> RespuestaHttp:
+        with self._trazar() as traza, self._perfilar(solicitud, "consulta_nit"):
+            return self._con_server_timing(await self._consultar_nit_async(solicitud, plazo), traza)
+
+    def _consultar_nit(self, solicitud: SolicitudHttp, plazo: Optional[Plazo]) -> RespuestaHttp:
+        nit = self._extraer_nit(solicitud)
+        if isinstance(nit, RespuestaHttp):
+            return nit
+        try:
+            empresa = self.servicio.consultar_nit(nit, plazo=plazo)
+        except Exception as e:
+            return respuesta_de_excepcion(e)
+        return self._respuesta_condicional(solicitud, self._respuesta_empresa(empresa))
+
+    async def _consultar_nit_async(self, solicitud: SolicitudHttp, plazo: Optional[Plazo]) -> RespuestaHttp:
+        nit = self._extraer_nit(solicitud)
+        if isinstance(nit, RespuestaHttp):
+            return nit
+        try:
+            if self.servicio_async is not None:
+                empresa = await self.servicio_async.consultar_nit(nit, plazo=plazo)
+            else:
+                import asyncio
+
+                # El motor síncrono se ejecuta en un hilo para no bloquear el bucle de eventos; si la solicitud se
+                # perfila, también se perfila en ese hilo
+                empresa = await asyncio.to_thread(perfilar_en_hilo, self.servicio.consultar_nit, nit, plazo)
+        except Exception as e:
+            return respuesta_de_excepcion(e)
+        return self._respuesta_condicional(solicitud, self._respuesta_empresa(empresa))
+
+    # --- Consulta por lote ---
+    def consultar_nits(self, solicitud: SolicitudHttp, plazo: Optional[Plazo] = None) -> RespuestaHttp:
+        if self.servicio is None:
+            return self._ejecutar_en_bucle(self.consultar_nits_async(solicitud, plazo))
+        with self._trazar() as traza, self._perfilar(solicitud, "consulta_nits"):
+            return self._con_server_timing(self._consultar_nits(solicitud, plazo), traza)
+
+    async def consultar_nits_async(self, solicitud: SolicitudHttp, plazo: Optional[Plazo] = None) -> RespuestaHttp:
+        with self._trazar() as traza, self._perfilar(solicitud, "consulta_nits"):
+            return self._con_server_timing(await self._consultar_nits_async(solicitud, plazo), traza)
+
+    def _consultar_nits(self, solicitud: SolicitudHttp, plazo: Optional[Plazo]) -> RespuestaHttp:
+        nits = self._extraer_nits(solicitud)
+        if isinstance(nits, RespuestaHttp):
+            return nits
+        try:
+            resultados = self.servicio.consultar_nits(nits, max_concurrencia=self.max_concurrencia, plazo=plazo)
+        except Exception as e:
+            return respuesta_de_excepcion(e)
+        return self._respuesta_lote(resultados)
+
+    async def _consultar_nits_async(self, solicitud: SolicitudHttp, plazo: Optional[Plazo]) -> RespuestaHttp:
+        nits = self._extraer_nits(solicitud)
+        if isinstance(nits, RespuestaHttp):
+            return nits
+        try:
+            if self.servicio_async is not None:
+                resultados = await self.servicio_async.consultar_nits(nits, max_concurrencia=self.max_concurrencia, plazo=plazo)
+            else:
+                import asyncio
+
+                resultados = await asyncio.to_thread(perfilar_en_hilo, self.servicio.consultar_nits, nits, self.max_concurrencia, plazo)
+        except Exception as e:
+            return respuesta_de_excepcion(e)
+        return self._respuesta_lote(resultados)
+
+    # --- Extracción y validación ---
+    def _extraer_nit(self, solicitud: SolicitudHttp) -> Union[str, RespuestaHttp]:
+        """
+        NIT normalizado de la query string o, si no viene ahí, del cuerpo JSON; o la respuesta 400 correspondiente.
+        """
+        nit = solicitud.parametros.get("nit")
+        if not nit:
+            try:
+                cuerpo = solicitud.json()
+            except ValueError:
+                return respuesta_error(400, MENSAJE_CUERPO_MALFORMADO)
+            if cuerpo is not None and not isinstance(cuerpo, dict):
+                return respuesta_error(400, MENSAJE_CUERPO_MALFORMADO)
+            nit = cuerpo.get("nit") if cuerpo else None
+        try:
+            return normalizar_nit(nit)
+        except NitInvalidoError as e:
+            return respuesta_de_excepcion(e)
+
+    def _extraer_nits(self, solicitud: SolicitudHttp) -> Union[List[Any], RespuestaHttp]:
+        """
+        Lista de NITs del cuerpo `{"nits": [...]}`; cada NIT se valida individualmente en el servicio.
+        """
+        try:
+            cuerpo = solicitud.json()
+        except ValueError:
+            return respuesta_error(400, MENSAJE_CUERPO_MALFORMADO)
+        if cuerpo is not None and not isinstance(cuerpo, dict):
+            return respuesta_error(400, MENSAJE_CUERPO_MALFORMADO)
+        nits = cuerpo.get("nits") if cuerpo else None
+        if not isinstance(nits, list) or not nits:
+            return respuesta_error(400, MENSAJE_LOTE_VACIO)
+        if len(nits) > self.max_nits:
+            return RespuestaHttp(400, self._cuerpo_lote_excedido)
+        return nits
+
+    # --- Serialización ---
+    def _respuesta_empresa(self, empresa: Empresa) -> RespuestaHttp:
+        """
+        Respuesta 200 de una Empresa con su ETag. Si la caché de respuestas tiene el cuerpo de esta misma instancia,
+        se devuelve tal cual, sin ningún trabajo del modelo; el cuerpo solo se guarda si la Empresa está en la caché de
+        resultados del servicio.
+        """
+        if self.cache_respuestas is not None:
+            guardada = self.cache_respuestas.obtener(empresa.nit, VARIANTE_JSON, empresa)
+            if guardada is not None:
+                return RespuestaHttp(200, guardada.cuerpo, {"Content-Type": TIPO_CONTENIDO_JSON, "ETag": guardada.etag})
+        respuesta = self._serializar(empresa)
+        respuesta.cabeceras["ETag"] = etag = calcular_etag(respuesta.cuerpo)
+        if self.cache_respuestas is not None and self._en_cache(empresa):
+            self.cache_respuestas.guardar(empresa.nit, VARIANTE_JSON, RespuestaSerializada(empresa, respuesta.cuerpo, etag))
+        return respuesta
+
+    def _en_cache(self, empresa: Empresa) -> bool:
+        # Solo vale la pena guardar el cuerpo si el servicio volverá a entregar esta misma instancia
+        return any(servicio is not None and servicio.en_cache(empresa) for servicio in (self.servicio, self.servicio_async))
+
+    def _respuesta_condicional(self, solicitud: SolicitudHttp, respuesta: RespuestaHttp) -> RespuestaHttp:
+        """
+        Agrega Cache-Control a la respuesta de una Empresa y, si es un GET (o HEAD) cuyo If-None-Match incluye su ETag,
+        la reemplaza por un 304 sin cuerpo: el cliente ya tiene esa versión.
+        """
+        if self.cache_control is not None:
+            respuesta.cabeceras["Cache-Control"] = self.cache_control
+        if solicitud.metodo.upper() not in ("GET", "HEAD"):
+            return respuesta
+        if_none_match = solicitud.cabeceras.get("if-none-match")
+        if not if_none_match or not etag_coincide(if_none_match, respuesta.cabeceras["ETag"]):
+            return respuesta
+        cabeceras = {"ETag": respuesta.cabeceras["ETag"]}
+        if self.cache_control is not None:
+            cabeceras["Cache-Control"] = self.cache_control
+        return RespuestaHttp(304, b"", cabeceras)
+
+    def _respuesta_lote(self, resultados: List[ResultadoConsulta]) -> RespuestaHttp:
+        return self._serializar(RespuestaLote(resultados=resultados))
+
+    def _serializar(self, modelo: BaseModel) -> RespuestaHttp:
+        inicio = time.perf_counter()
+        cuerpo = modelo.model_dump_json().encode("utf-8")
+        registrar_medicion(self.metricas, ETAPA_SERIALIZACION, inicio, tamano=len(cuerpo))
+        return RespuestaHttp(200, cuerpo)
+
+    # --- Server-Timing y perfilado ---
+    def _trazar(self) -> ContextManager[Optional[TrazaSolicitud]]:
+        return trazar_solicitud() if self.server_timing else nullcontext()
+
+    def _perfilar(self, solicitud: SolicitudHttp, etiqueta: str) -> ContextManager[None]:
+        return self.perfilador.perfilar(solicitud.cabeceras, etiqueta) if self.perfilador is not None else nullcontext()
+
+    def _con_server_timing(self, respuesta: RespuestaHttp, traza: Optional[TrazaSolicitud]) -> RespuestaHttp:
+        if traza is not None:
+            respuesta.cabeceras["Server-Timing"] = traza.server_timing()
+        return respuesta
+
+    def _ejecutar_en_bucle(self, corrutina: Any) -> RespuestaHttp:
+        """
+        Ejecuta una corrutina del motor asíncrono desde un adaptador síncrono, en un bucle compartido entre invocaciones.
+        """
+        return self._ejecutor_async.ejecutar(corrutina)
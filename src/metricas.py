@@ -0,0 +1,198 @@
+"""
+Métricas de tiempo por etapa de una consulta: cada fuente de datos, la fusión y la serialización de la respuesta.
+
+Cada etapa medida produce una Medicion (duración, estado y, si aplica, tamaño de la carga) que se entrega al sumidero
+configurado (nulo, en memoria u OpenTelemetry) y a la traza de la solicitud en curso, con la que el manejador arma la
+cabecera Server-Timing. La traza viaja en una ContextVar: la comparten las tareas de asyncio de la solicitud y los
+hilos a los que se les copia el contexto (`contextvars.copy_context().run`).
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    from src.reintentos import Intento
+
+
+ETAPA_DATOS_GOV_CO = "datos_gov_co"
+ETAPA_RUES = "rues"
+ETAPA_FUSION = "fusion"
+ETAPA_SERIALIZACION = "serializacion"
+ETAPA_INTENTO = "intento"
+
+ESTADO_OK = "ok"
+ESTADO_VACIO = "vacio"
+ESTADO_ERROR = "error"
+ESTADO_REINTENTO = "reintento"
+
+
+@dataclass(frozen=True)
+class Medicion:
+    """
+    Resultado de medir una etapa: duración en segundos, estado ("ok", "vacio" o "error") y tamaño de la carga, si
+    aplica: registros devueltos en las fuentes y bytes en la serialización.
+    """
+    etapa: str
+    duracion: float
+    estado: str = ESTADO_OK
+    tamano: Optional[int] = None
+
+
+class SumideroMetricas:
+    """
+    Destino de las mediciones. `activo` indica si vale la pena medir para este sumidero; el nulo no lo está.
+    """
+    activo = True
+
+    def registrar(self, medicion: Medicion) -> None:
+        raise NotImplementedError
+
+
+class SumideroNulo(SumideroMetricas):
+    """
+    Descarta las mediciones. Es el sumidero por defecto.
+    """
+    activo = False
+
+    def registrar(self, medicion: Medicion) -> None:
+        pass
+
+
+class SumideroEnMemoria(SumideroMetricas):
+    """
+    Conserva las últimas `max_mediciones` mediciones del proceso, para pruebas y diagnóstico local.
+    """
+    def __init__(self, max_mediciones: int = 10000):
+        self._mediciones: Deque[Medicion] = deque(maxlen=max_mediciones)
+        self._lock = threading.Lock()
+
+    def registrar(self, medicion: Medicion) -> None:
+        with self._lock:
+            self._mediciones.append(medicion)
+
+    def mediciones(self, etapa: Optional[str] = None) -> List[Medicion]:
+        with self._lock:
+            return [m for m in self._mediciones if etapa is None or m.etapa == etapa]
+
+    def resumen(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Conteo, errores y duración media y máxima (en milisegundos) de cada etapa.
+        """
+        resumen: Dict[str, Dict[str, Any]] = {}
+        for medicion in self.mediciones():
+            etapa = resumen.setdefault(medicion.etapa, {"conteo": 0, "errores": 0, "duracion_total_ms": 0.0, "duracion_maxima_ms": 0.0})
+            duracion_ms = medicion.duracion * 1000
+            etapa["conteo"] += 1
+            etapa["errores"] += medicion.estado == ESTADO_ERROR
+            etapa["duracion_total_ms"] += duracion_ms
+            etapa["duracion_maxima_ms"] = max(etapa["duracion_maxima_ms"], duracion_ms)
+        for etapa in resumen.values():
+            etapa["duracion_media_ms"] = etapa.pop("duracion_total_ms") / etapa["conteo"]
+        return resumen
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._mediciones.clear()
+
+
+class SumideroOpenTelemetry(SumideroMetricas):
+    """
+    Registra las mediciones en histogramas de OpenTelemetry, con la etapa y el estado como atributos.
+
+    Recibe cualquier Meter de OpenTelemetry; sin él, usa el del proveedor global (requiere `opentelemetry-api`,
+    que solo se importa aquí).
+    """
+    def __init__(self, medidor: Any = None, prefijo: str = "consulta_nit"):
+        if medidor is None:
+            from opentelemetry import metrics
+
+            medidor = metrics.get_meter(prefijo)
+        self._duracion = medidor.create_histogram(f"{prefijo}.etapa.duracion", unit="ms", description="Duración de cada etapa de la consulta")
+        self._tamano = medidor.create_histogram(f"{prefijo}.etapa.tamano", unit="1", description="Tamaño de la carga de cada etapa de la consulta (registros en las fuentes, bytes en la serialización)")
+
+    def registrar(self, medicion: Medicion) -> None:
+        atributos = {"etapa": medicion.etapa, "estado": medicion.estado}
+        self._duracion.record(medicion.duracion * 1000, attributes=atributos)
+        if medicion.tamano is not None:
+            self._tamano.record(medicion.tamano, attributes=atributos)
+
+
+class ObservadorReintentos:
+    """
+    Observador de PoliticaReintentos que registra cada intento en el sumidero como la etapa "intento.<fuente>", con
+    estado "ok", "reintento" (falló y se reintentará) o el motivo por el que se desistió (p. ej. "presupuesto_agotado").
+    Los conteos por estado dan los intentos, los reintentos, los desistimientos y el agotamiento del presupuesto.
+    """
+    def __init__(self, sumidero: SumideroMetricas):
+        self.sumidero = sumidero
+
+    def __call__(self, intento: "Intento") -> None:
+        estado = ESTADO_OK if intento.resultado == ESTADO_OK else intento.desistimiento or ESTADO_REINTENTO
+        self.sumidero.registrar(Medicion(f"{ETAPA_INTENTO}.{intento.fuente}", intento.duracion, estado))
+
+
+class TrazaSolicitud:
+    """
+    Mediciones de una solicitud, para la cabecera Server-Timing.
+    """
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.mediciones: List[Medicion] = []
+
+    def agregar(self, medicion: Medicion) -> None:
+        # list.append es atómico, así que los hilos de un lote pueden agregar sin lock
+        self.mediciones.append(medicion)
+
+    def server_timing(self) -> str:
+        """
+        Valor de la cabecera Server-Timing: la duración de cada etapa en milisegundos, en el orden en que se midieron,
+        y el total de la solicitud. Las etapas que se repiten (p. ej. en un lote) suman sus duraciones, y las que
+        fallaron alguna vez se marcan con `desc="error"`.
+        """
+        duraciones: Dict[str, float] = {}
+        con_error = set()
+        for medicion in list(self.mediciones):
+            duraciones[medicion.etapa] = duraciones.get(medicion.etapa, 0.0) + medicion.duracion
+            if medicion.estado == ESTADO_ERROR:
+                con_error.add(medicion.etapa)
+        partes = [
+            f'{etapa};dur={duracion * 1000:.1f}' + (';desc="error"' if etapa in con_error else "")
+            for etapa, duracion in duraciones.items()
+        ]
+        partes.append(f"total;dur={(time.perf_counter() - self.inicio) * 1000:.1f}")
+        return ", ".join(partes)
+
+
+_traza_actual: ContextVar[Optional[TrazaSolicitud]] = ContextVar("traza_solicitud", default=None)
+
+
+@contextmanager
+def trazar_solicitud() -> Iterator[TrazaSolicitud]:
+    """
+    Abre la traza de una solicitud; las mediciones hechas dentro del bloque (y en su contexto copiado) se agregan a ella.
+    """
+    traza = TrazaSolicitud()
+    token = _traza_actual.set(traza)
+    try:
+        yield traza
+    finally:
+        _traza_actual.reset(token)
+
+
+def registrar_medicion(sumidero: Optional[SumideroMetricas], etapa: str, inicio: float, estado: str = ESTADO_OK,
+                       tamano: Optional[int] = None) -> None:
+    """
+    Registra una etapa que empezó en `inicio` (de time.perf_counter) en el sumidero y en la traza en curso.
+    """
+    traza = _traza_actual.get()
+    if traza is None and (sumidero is None or not sumidero.activo):
+        return
+    medicion = Medicion(etapa, time.perf_counter() - inicio, estado, tamano)
+    if sumidero is not None:
+        sumidero.registrar(medicion)
+    if traza is not None:
+        traza.agregar(medicion)
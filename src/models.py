@@ -8,6 +8,9 @@ class Ciiu(BaseModel):
     """
     codigo: Optional[str] = Field(None, description="Código CIIU.")
     descripcion: Optional[str] = Field(None, description="Descripción del CIIU.")
+    seccion: Optional[str] = Field(None, description="Letra de la sección CIIU Rev. 4 A.C. a la que pertenece la clase.")
+    division: Optional[str] = Field(None, description="Código de la división CIIU (2 dígitos).")
+    grupo: Optional[str] = Field(None, description="Código del grupo CIIU (3 dígitos).")
 
 
 class Empresa(BaseModel):
@@ -34,4 +37,37 @@ class Empresa(BaseModel):
         
     fuentes: List[str] = Field(default_factory=list, description="Lista de fuentes de datos donde se encontró la información.")
 
-    model_config = ConfigDict(str_strip_whitespace=True, validate_assignment=True) # Actualizado a la configuración de Pydantic V2
\ No newline at end of file
+    model_config = ConfigDict(str_strip_whitespace=True, validate_assignment=True) # Actualizado a la configuración de Pydantic V2
+
+
+# Los modelos de lote construyen su esquema en el primer uso (defer_build) para no cargar ese costo en el arranque
+# en frío de las consultas individuales.
+class ErrorConsulta(BaseModel):
+    """
+    Describe el error de la consulta de un NIT dentro de un lote.
+    """
+    model_config = ConfigDict(defer_build=True)
+
+    tipo: str = Field(..., description="Tipo de error (nit_invalido, nit_no_encontrado, fuente_no_disponible, error_interno).")
+    mensaje: str = Field(..., description="Mensaje legible del error.")
+
+
+class ResultadoConsulta(BaseModel):
+    """
+    Resultado de la consulta de un NIT dentro de un lote: la empresa encontrada o el error.
+    """
+    model_config = ConfigDict(defer_build=True)
+
+    nit: str = Field(..., description="NIT consultado, normalizado (solo dígitos, sin dígito de verificación); si no es válido, tal como se recibió.")
+    estado: int = Field(..., description="Código de estado HTTP equivalente a la consulta individual.")
+    empresa: Optional[Empresa] = Field(None, description="Información de la empresa si la consulta fue exitosa.")
+    error: Optional[ErrorConsulta] = Field(None, description="Detalle del error si la consulta falló.")
+
+
+class RespuestaLote(BaseModel):
+    """
+    Respuesta de una consulta por lote, con un resultado por cada NIT en el orden recibido.
+    """
+    model_config = ConfigDict(defer_build=True)
+
+    resultados: List[ResultadoConsulta] = Field(default_factory=list, description="Resultados por NIT.")
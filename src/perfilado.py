@@ -0,0 +1,188 @@
+"""
+Perfilado con cProfile de una muestra de las solicitudes en producción, sin redesplegar.
+
+Una solicitud se perfila si sale elegida por la tasa de muestreo (PERFILADO_TASA) o si trae en la cabecera
+X-Perfilar un token firmado con PERFILADO_SECRETO (ver `firmar_token`), que vence para que no pueda reutilizarse
+indefinidamente. El perfil se guarda en un archivo .prof (para snakeviz o pstats) o se escribe en el log como un
+resumen compacto de las funciones más costosas.
+
+Sin perfilador configurado el manejador no hace nada; con él, decidir cuesta un número aleatorio o la lectura de una
+cabecera. Solo se perfila una solicitud a la vez por proceso. cProfile solo ve el hilo que lo activa, así que el
+trabajo que la solicitud delega a otros hilos (el motor síncrono bajo asyncio.to_thread, los hilos de un lote) se
+ejecuta con `perfilar_en_hilo`, que lo perfila en ese hilo y lo suma al perfil de la solicitud. En el motor asíncrono
+el perfil incluye además lo que el bucle de eventos hizo mientras tanto por otras solicitudes.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Callable, ContextManager, Iterator, List, Mapping, Optional, TypeVar
+
+
+CABECERA_PERFILAR = "x-perfilar"
+
+T = TypeVar("T")
+
+
+class _PerfilEnCurso:
+    """
+    Perfil de la solicitud en curso: el hilo que lo activó y los perfiles tomados en los hilos a los que delegó trabajo.
+    """
+    def __init__(self):
+        self.hilo = threading.get_ident()
+        self.perfiles_hilos: List[Any] = []
+
+
+# Viaja con el contexto, como la traza de métricas: lo ven asyncio.to_thread y los hilos con el contexto copiado
+_perfil_en_curso: ContextVar[Optional[_PerfilEnCurso]] = ContextVar("perfil_en_curso", default=None)
+
+
+def perfilar_en_hilo(funcion: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Ejecuta `funcion(*args, **kwargs)` y, si la solicitud en curso se está perfilando desde otro hilo, la perfila
+    también en este y suma el resultado al perfil de la solicitud. Sin perfil en curso solo llama a la función.
+    """
+    en_curso = _perfil_en_curso.get()
+    if en_curso is None or en_curso.hilo == threading.get_ident():
+        return funcion(*args, **kwargs)
+
+    import cProfile
+
+    perfil = cProfile.Profile()
+    try:
+        perfil.enable()
+    except ValueError:
+        # Otra herramienta de perfilado ya está activa en el proceso
+        return funcion(*args, **kwargs)
+    try:
+        return funcion(*args, **kwargs)
+    finally:
+        perfil.disable()
+        en_curso.perfiles_hilos.append(perfil)
+
+
+def _firma(secreto: str, expira: int) -> str:
+    import hashlib
+    import hmac
+
+    return hmac.new(secreto.encode("utf-8"), str(expira).encode("ascii"), hashlib.sha256).hexdigest()
+
+
+def firmar_token(secreto: str, vigencia_segundos: int = 300, ahora: Optional[float] = None) -> str:
+    """
+    Token para la cabecera X-Perfilar: `<expiración en segundos epoch>.<HMAC-SHA256 de la expiración>`.
+    """
+    expira = int((time.time() if ahora is None else ahora) + vigencia_segundos)
+    return f"{expira}.{_firma(secreto, expira)}"
+
+
+def token_valido(token: str, secreto: str, ahora: Optional[float] = None) -> bool:
+    """
+    Indica si el token está firmado con el secreto y aún no vence.
+    """
+    import hmac
+
+    expira, _, firma = token.partition(".")
+    if not expira.isdecimal() or int(expira) < (time.time() if ahora is None else ahora):
+        return False
+    return hmac.compare_digest(firma, _firma(secreto, int(expira)))
+
+
+class Perfilador:
+    """
+    Decide qué solicitudes perfilar y entrega sus perfiles al directorio o al log.
+    """
+    def __init__(self, tasa_muestreo: float = 0.0, secreto: Optional[str] = None, directorio: Optional[str] = None,
+                 max_funciones: int = 25):
+        """
+        Args:
+            tasa_muestreo: Fracción de las solicitudes que se perfila (de 0 a 1).
+            secreto: Secreto de los tokens de la cabecera X-Perfilar; sin él la cabecera se ignora.
+            directorio: Directorio donde guardar los perfiles .prof; sin él se escriben en el log.
+            max_funciones: Funciones incluidas en el resumen del log, por tiempo acumulado.
+        """
+        self.tasa_muestreo = tasa_muestreo
+        self.secreto = secreto
+        self.directorio = directorio
+        self.max_funciones = max_funciones
+        self._lock = threading.Lock()
+        self._contador = 0
+
+    def debe_perfilar(self, cabeceras: Mapping[str, str]) -> bool:
+        if self.tasa_muestreo > 0 and random.random() < self.tasa_muestreo:
+            return True
+        if self.secreto:
+            token = cabeceras.get(CABECERA_PERFILAR)
+            if token:
+                if token_valido(token, self.secreto):
+                    return True
+                logging.warning("Se ignoró un token de perfilado inválido o vencido")
+        return False
+
+    def perfilar(self, cabeceras: Mapping[str, str], etiqueta: str) -> ContextManager[None]:
+        """
+        Perfila el bloque si la solicitud fue elegida y no hay otro perfil en curso en el proceso.
+        """
+        if not self.debe_perfilar(cabeceras) or not self._lock.acquire(blocking=False):
+            return nullcontext()
+        return self._perfilar(etiqueta)
+
+    @contextmanager
+    def _perfilar(self, etiqueta: str) -> Iterator[None]:
+        import cProfile
+
+        perfil = cProfile.Profile()
+        en_curso = _PerfilEnCurso()
+        token = _perfil_en_curso.set(en_curso)
+        try:
+            perfil.enable()
+            yield
+        finally:
+            perfil.disable()
+            _perfil_en_curso.reset(token)
+            self._contador += 1
+            numero = self._contador
+            self._lock.release()
+            try:
+                self._entregar(_combinar(perfil, en_curso.perfiles_hilos), etiqueta, numero)
+            except Exception as e:
+                logging.warning(f"No se pudo entregar el perfil de {etiqueta}: {e}")
+
+    def _entregar(self, estadisticas, etiqueta: str, numero: int) -> None:
+        if self.directorio:
+            ruta = os.path.join(self.directorio, f"{etiqueta}-{int(time.time())}-{os.getpid()}-{numero}.prof")
+            estadisticas.dump_stats(ruta)
+            logging.info(f"Perfil de {etiqueta} guardado en {ruta}")
+        else:
+            logging.info(f"Perfil de {etiqueta}:\n{resumir_perfil(estadisticas, self.max_funciones)}")
+
+
+def _combinar(perfil, perfiles_hilos: List[Any]):
+    """
+    Estadísticas del perfil de la solicitud sumadas con las de los hilos a los que delegó trabajo.
+    """
+    import pstats
+
+    estadisticas = pstats.Stats(perfil)
+    for perfil_hilo in perfiles_hilos:
+        estadisticas.add(perfil_hilo)
+    return estadisticas
+
+
+def resumir_perfil(perfil, max_funciones: int = 25) -> str:
+    """
+    Resumen compacto de un perfil (cProfile.Profile o pstats.Stats): una línea por función con el tiempo acumulado y
+    propio en milisegundos, las llamadas y la ubicación, ordenadas por tiempo acumulado.
+    """
+    import pstats
+
+    estadisticas = (perfil if isinstance(perfil, pstats.Stats) else pstats.Stats(perfil)).stats
+    filas = sorted(estadisticas.items(), key=lambda item: item[1][3], reverse=True)[:max_funciones]
+    lineas = ["acum_ms  propio_ms  llamadas  funcion"]
+    for (archivo, linea, funcion), (_, llamadas, propio, acumulado, _) in filas:
+        ubicacion = funcion if archivo == "~" else f"{os.path.basename(archivo)}:{linea}({funcion})"
+        lineas.append(f"{acumulado * 1000:8.2f}  {propio * 1000:9.2f}  {llamadas:8d}  {ubicacion}")
+    return "\n".join(lineas)
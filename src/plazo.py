@@ -0,0 +1,57 @@
+import time
+from typing import Callable, Optional
+
+
+class Plazo:
+    """
+    Presupuesto de tiempo de una solicitud, creado por el adaptador y propagado hasta cada llamada a las fuentes.
+
+    Cada consulta usa como timeout el tiempo que le queda a la solicitud (acotado por el timeout propio de la fuente),
+    de modo que la suma de las llamadas nunca exceda el límite de la plataforma.
+    """
+    def __init__(self, segundos: float, minimo_util: float = 0.1, reloj: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            segundos: Tiempo disponible a partir de ahora.
+            minimo_util: Por debajo de este tiempo restante no vale la pena iniciar otra llamada a una fuente.
+            reloj: Función que devuelve el tiempo monotónico actual en segundos.
+        """
+        self._reloj = reloj
+        self.vence_en = reloj() + segundos
+        self.minimo_util = minimo_util
+
+    @classmethod
+    def desde_milisegundos(cls, milisegundos: float, margen_milisegundos: float = 0, **kwargs) -> "Plazo":
+        """
+        Crea el plazo a partir del tiempo restante que informa la plataforma, reservando un margen para armar la respuesta.
+        """
+        return cls(max(0.0, (milisegundos - margen_milisegundos) / 1000), **kwargs)
+
+    def restante(self) -> float:
+        """
+        Segundos que le quedan a la solicitud (nunca negativo).
+        """
+        return max(0.0, self.vence_en - self._reloj())
+
+    def agotado(self) -> bool:
+        """
+        Indica si ya no queda tiempo suficiente para una llamada más.
+        """
+        return self.restante() < self.minimo_util
+
+    def timeout(self, maximo: float) -> float:
+        """
+        Timeout para la siguiente llamada: el tiempo restante, sin superar `maximo`.
+        """
+        return min(maximo, self.restante())
+
+
+def timeout_para(plazo: Optional[Plazo], maximo: float) -> Optional[float]:
+    """
+    Timeout para una llamada con plazo opcional; None si el plazo ya está agotado.
+    """
+    if plazo is None:
+        return maximo
+    if plazo.agotado():
+        return None
+    return plazo.timeout(maximo)
@@ -0,0 +1,220 @@
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar, Union
+
+from src.plazo import Plazo
+
+
+T = TypeVar("T")
+
+# Estados HTTP transitorios que justifican reintentar un GET
+ESTADOS_REINTENTABLES = frozenset({429, 500, 502, 503, 504})
+
+# Clasifica un error: devuelve (etiqueta, Retry-After) si es reintentable, o None si no lo es
+Clasificador = Callable[[BaseException], Optional[Tuple[str, Optional[str]]]]
+
+
+@dataclass
+class Intento:
+    """
+    Registro de un intento individual de una solicitud a una fuente.
+
+    Si el intento falló y no se reintenta, `desistimiento` indica por qué: "no_reintentable", "intentos_agotados",
+    "retry_after_excedido", "sin_plazo" o "presupuesto_agotado".
+    """
+    fuente: str
+    numero: int
+    resultado: str
+    duracion: float
+    espera: float = 0.0
+    desistimiento: Optional[str] = None
+
+
+class PresupuestoReintentos:
+    """
+    Presupuesto de reintentos por proceso (token bucket): cada solicitud deposita `proporcion` fichas
+    y cada reintento consume una. Así los reintentos no superan, en régimen, esa fracción del tráfico
+    y una fuente caída no provoca una tormenta de reintentos.
+    """
+    def __init__(self, proporcion: float = 0.1, saldo_maximo: float = 10.0):
+        self.proporcion = proporcion
+        self.saldo_maximo = saldo_maximo
+        self._saldo = saldo_maximo
+        self._lock = threading.Lock()
+
+    def depositar(self) -> None:
+        with self._lock:
+            self._saldo = min(self.saldo_maximo, self._saldo + self.proporcion)
+
+    def retirar(self) -> bool:
+        """
+        Consume una ficha para un reintento. Devuelve False si el presupuesto está agotado.
+        """
+        with self._lock:
+            if self._saldo < 1:
+                return False
+            self._saldo -= 1
+            return True
+
+    @property
+    def saldo(self) -> float:
+        with self._lock:
+            return self._saldo
+
+
+def segundos_retry_after(valor: Optional[str], ahora: Optional[datetime] = None) -> Optional[float]:
+    """
+    Interpreta una cabecera Retry-After, en segundos o como fecha HTTP. Devuelve None si no es válida.
+    """
+    if not valor:
+        return None
+    valor = valor.strip()
+    if valor.isdigit():
+        return float(valor)
+    try:
+        fecha = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=timezone.utc)
+    return max(0.0, (fecha - (ahora or datetime.now(timezone.utc))).total_seconds())
+
+
+class PoliticaReintentos:
+    """
+    Reintenta las solicitudes idempotentes (GET) ante errores transitorios, con backoff exponencial
+    con jitter completo, respetando Retry-After, el plazo de la solicitud y el presupuesto del proceso.
+    """
+    def __init__(
+        self,
+        max_intentos: int = 3,
+        espera_base: float = 0.1,
+        espera_maxima: float = 2.0,
+        presupuesto: Optional[PresupuestoReintentos] = None,
+        observador: Optional[Callable[[Intento], None]] = None,
+        aleatorio: Callable[[float, float], float] = random.uniform,
+        dormir: Callable[[float], None] = time.sleep,
+        reloj: Callable[[], float] = time.monotonic,
+    ):
+        self.max_intentos = max(1, max_intentos)
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.presupuesto = presupuesto if presupuesto is not None else PresupuestoReintentos()
+        self.observador = observador
+        self._aleatorio = aleatorio
+        self._dormir = dormir
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._contadores: Dict[str, int] = {}
+
+    def espera(self, numero_intento: int, retry_after: Optional[str] = None) -> Optional[float]:
+        """
+        Espera antes del intento siguiente a `numero_intento`: la indicada por Retry-After o un valor aleatorio
+        entre 0 y `espera_base * 2^(n-1)`, acotado por `espera_maxima`. Devuelve None si Retry-After pide esperar
+        más que `espera_maxima`: reintentar antes de lo indicado solo volvería a fallar.
+        """
+        indicada = segundos_retry_after(retry_after)
+        if indicada is not None:
+            return indicada if indicada <= self.espera_maxima else None
+        return self._aleatorio(0, min(self.espera_maxima, self.espera_base * 2 ** (numero_intento - 1)))
+
+    def ejecutar(self, fuente: str, intento: Callable[[], T], clasificar: Clasificador, plazo: Optional[Plazo] = None) -> T:
+        """
+        Ejecuta `intento` hasta que tenga éxito, falle con un error no reintentable o se agoten los intentos,
+        el plazo o el presupuesto; en ese caso relanza el último error.
+        """
+        self.presupuesto.depositar()
+        numero = 1
+        while True:
+            inicio = self._reloj()
+            try:
+                resultado = intento()
+            except Exception as e:
+                espera = self._siguiente_espera(fuente, numero, e, clasificar, plazo, self._reloj() - inicio)
+                if espera is None:
+                    raise
+                self._dormir(espera)
+                numero += 1
+                continue
+            self._registrar(Intento(fuente, numero, "ok", self._reloj() - inicio))
+            return resultado
+
+    async def ejecutar_async(self, fuente: str, intento: Callable[[], Awaitable[T]], clasificar: Clasificador, plazo: Optional[Plazo] = None) -> T:
+        """
+        Versión asíncrona de ejecutar: las esperas entre intentos no bloquean el bucle de eventos.
+        """
+        import asyncio
+
+        self.presupuesto.depositar()
+        numero = 1
+        while True:
+            inicio = self._reloj()
+            try:
+                resultado = await intento()
+            except Exception as e:
+                espera = self._siguiente_espera(fuente, numero, e, clasificar, plazo, self._reloj() - inicio)
+                if espera is None:
+                    raise
+                await asyncio.sleep(espera)
+                numero += 1
+                continue
+            self._registrar(Intento(fuente, numero, "ok", self._reloj() - inicio))
+            return resultado
+
+    def _siguiente_espera(self, fuente: str, numero: int, error: BaseException, clasificar: Clasificador,
+                          plazo: Optional[Plazo], duracion: float) -> Optional[float]:
+        """
+        Registra el intento fallido y decide si se reintenta: devuelve la espera, o None para desistir.
+        """
+        clasificacion = clasificar(error)
+        etiqueta = clasificacion[0] if clasificacion else "no_reintentable"
+        if clasificacion is None or numero >= self.max_intentos:
+            motivo = "no_reintentable" if clasificacion is None else "intentos_agotados"
+            self._registrar(Intento(fuente, numero, etiqueta, duracion, desistimiento=motivo))
+            return None
+
+        espera = self.espera(numero, clasificacion[1])
+        if espera is None:
+            self._registrar(Intento(fuente, numero, etiqueta, duracion, desistimiento="retry_after_excedido"))
+            self._contar("reintentos_retry_after_excedido")
+            logging.warning(f"{fuente} pidió esperar más que la espera máxima ({clasificacion[1]}); no se reintenta")
+            return None
+        if plazo is not None and (plazo.agotado() or espera >= plazo.restante() - plazo.minimo_util):
+            self._registrar(Intento(fuente, numero, etiqueta, duracion, desistimiento="sin_plazo"))
+            self._contar("reintentos_sin_plazo")
+            return None
+        if not self.presupuesto.retirar():
+            self._registrar(Intento(fuente, numero, etiqueta, duracion, desistimiento="presupuesto_agotado"))
+            self._contar("reintentos_denegados")
+            logging.warning(f"Presupuesto de reintentos agotado; no se reintenta la consulta a {fuente}")
+            return None
+
+        self._registrar(Intento(fuente, numero, etiqueta, duracion, espera))
+        self._contar("reintentos")
+        logging.info(f"Reintentando la consulta a {fuente} ({etiqueta}) en {espera:.3f} s (intento {numero + 1} de {self.max_intentos})")
+        return espera
+
+    def _registrar(self, intento: Intento) -> None:
+        self._contar("intentos")
+        self._contar(f"{intento.fuente}:{intento.resultado}")
+        if self.observador is not None:
+            self.observador(intento)
+
+    def _contar(self, clave: str) -> None:
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + 1
+
+    def estadisticas(self) -> Dict[str, Union[int, float]]:
+        """
+        Contadores de intentos (totales y por fuente:resultado), reintentos realizados y denegados,
+        y el saldo actual del presupuesto.
+        """
+        with self._lock:
+            estadisticas: Dict[str, Union[int, float]] = dict(self._contadores)
+        estadisticas["saldo_presupuesto"] = self.presupuesto.saldo
+        return estadisticas
@@ -1,10 +1,155 @@
 import requests
 import logging
+import threading
+from requests.adapters import HTTPAdapter
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+import time
+from contextvars import copy_context
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Any, Callable, Iterable, List, Optional, Set, Tuple, Union
+from urllib.parse import quote
 
-from src.models import Empresa, Ciiu
-from src.exceptions import NitNotFoundError, DataSourceError
+from src.ciiu import campos_ciiu, describir_ciiu
+from src.models import Empresa, ErrorConsulta, ResultadoConsulta
+from src.exceptions import CircuitoAbiertoError, NitNotFoundError, DataSourceError, NitInvalidoError
+from src.validators import calcular_dv, normalizar_nit
+from src.cache import CacheResultados
+from src.circuito import Interruptor
+from src.fusion import CIIU_SECUNDARIOS, PLAN_FUSION
+from src.cobertura import PoliticaCobertura
+from src.indice_rues import IndiceCodigosRues
+from src.metricas import ESTADO_ERROR, ESTADO_OK, ESTADO_VACIO, ETAPA_FUSION, SumideroMetricas, registrar_medicion
+from src.perfilado import perfilar_en_hilo
+from src.plazo import Plazo, timeout_para
+from src.reintentos import ESTADOS_REINTENTABLES, PoliticaReintentos
+from src.singleflight import SingleFlight
+
+
+TIMEOUT_FUENTES = 10
+
+# Consultas a RUES lanzadas en paralelo con datos.gov.co que pueden estar en vuelo a la vez
+MAX_CONSULTAS_RUES_PARALELAS = 16
+
+
+def crear_sesion_http(pool_connections: int = 10, pool_maxsize: int = 10) -> requests.Session:
+    """
+    Crea una sesión HTTP con un pool de conexiones keep-alive reutilizables.
+
+    Args:
+        pool_connections: Número de pools (uno por host) que se mantienen en caché.
+        pool_maxsize: Número máximo de conexiones abiertas por host.
+
+    Returns:
+        Una sesión de requests lista para compartirse entre invocaciones.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def clasificar_error_http(error: BaseException) -> Optional[Tuple[str, Optional[str]]]:
+    """
+    Clasifica un error de requests para la política de reintentos: los errores de conexión, los timeouts
+    y los estados HTTP transitorios son reintentables (con su cabecera Retry-After, si la hay).
+    """
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        if status in ESTADOS_REINTENTABLES:
+            return f"http_{status}", error.response.headers.get("Retry-After")
+        return None
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return "conexion", None
+    if isinstance(error, requests.exceptions.Timeout):
+        return "timeout", None
+    return None
+
+
+def obtener_respuesta(session: requests.Session, url: str, fuente: str, plazo: Optional[Plazo] = None,
+                      reintentos: Optional[PoliticaReintentos] = None) -> requests.Response:
+    """
+    Hace un GET con el timeout que permite el plazo y lanza HTTPError si el estado es de error.
+    Con una política de reintentos, los errores transitorios se reintentan según esa política.
+    """
+    def intento() -> requests.Response:
+        timeout = timeout_para(plazo, TIMEOUT_FUENTES)
+        if timeout is None:
+            raise requests.exceptions.Timeout("Se agotó el plazo de la solicitud.")
+        response = session.get(url, timeout=timeout)
+        response.raise_for_status()  # Lanza una excepción para códigos de estado erróneos
+        return response
+
+    if reintentos is None:
+        return intento()
+    return reintentos.ejecutar(fuente, intento, clasificar_error_http, plazo)
+
+
+def construir_codigo_rues(codigo_camara: Any, matricula: Any) -> str:
+    """
+    Construye el código RUES de 12 caracteres a partir de la cámara y la matrícula.
+    """
+    union_len = len(str(codigo_camara)) + len(str(matricula))
+    relleno = '0' * (12 - union_len)
+    return f"{codigo_camara}{relleno}{matricula}"
+
+
+def codigo_rues_de(gov_data: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Código RUES de la empresa según su registro de datos.gov.co, o None si no trae cámara y matrícula.
+    """
+    if not gov_data or not gov_data.get("codigo_camara") or not gov_data.get("matricula"):
+        return None
+    return construir_codigo_rues(gov_data["codigo_camara"], gov_data["matricula"])
+
+
+def construir_consultas_socrata_por_nit(base_url: str, nits: Iterable[str], max_longitud_url: int = 2000, limite_filas: int = 50000) -> List[Tuple[str, List[str]]]:
+    """
+    Divide los NITs en grupos cuya URL `$where=nit in(...)` no supere `max_longitud_url` caracteres.
+
+    Returns:
+        Una lista de tuplas (url, nits del grupo).
+    """
+    prefijo = f"{base_url}?$limit={limite_filas}&$where=" + quote("nit in(")
+    cierre = quote(")")
+    separador = quote(",")
+
+    consultas: List[Tuple[str, List[str]]] = []
+    grupo: List[str] = []
+    url = prefijo
+    for nit in nits:
+        literal = quote(f"'{nit}'")
+        candidata = f"{url}{separador if grupo else ''}{literal}"
+        if grupo and len(candidata) + len(cierre) > max_longitud_url:
+            consultas.append((url + cierre, grupo))
+            grupo = []
+            candidata = prefijo + literal
+        grupo.append(nit)
+        url = candidata
+    if grupo:
+        consultas.append((url + cierre, grupo))
+    return consultas
+
+
+def agrupar_registros_por_nit(nits: Iterable[str], registros: Iterable[Dict[str, Any]]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Asocia a cada NIT consultado su primer registro; los NITs sin registros quedan explícitamente en None.
+    """
+    resultado: Dict[str, Optional[Dict[str, Any]]] = {nit: None for nit in nits}
+    for registro in registros:
+        nit = str(registro.get("nit", "")).strip()
+        if nit in resultado and resultado[nit] is None:
+            resultado[nit] = registro
+    return resultado
+
+
+def contar_registros(resultado: Any, lote: bool = False) -> int:
+    """
+    Registros devueltos por una consulta a una fuente: 1 o 0 para un NIT, o los NITs encontrados en un lote.
+    """
+    if lote:
+        return sum(registro is not None for registro in resultado.values())
+    return 1 if resultado else 0
 
 
 class DataSource(ABC):
@@ -21,22 +166,36 @@ class DataSource(ABC):
 
         Returns:
             Un diccionario con los datos de la empresa o None si no se encuentra.
+
+        Las fuentes remotas reciben en `plazo` el presupuesto de tiempo de la solicitud y lo usan como timeout.
         """
         pass
 
+    def consultar_lote(self, nits: Iterable[str], plazo: Optional[Plazo] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Consulta varios NITs. Por defecto hace una consulta por NIT; las fuentes que soportan
+        consultas múltiples pueden sobrescribirlo.
+
+        Returns:
+            Un diccionario NIT -> datos de la empresa, con None para los NITs no encontrados.
+        """
+        return {nit: self.consultar(nit, plazo=plazo) for nit in nits}
+
 
 class DatosGovCoService(DataSource):
     """
     Implementación de fuente de datos para datos.gov.co.
     """
-    def __init__(self, base_url: str = "https://www.datos.gov.co/resource/c82u-588k.json"):
+    def __init__(self, base_url: str = "https://www.datos.gov.co/resource/c82u-588k.json", session: Optional[requests.Session] = None,
+                 reintentos: Optional[PoliticaReintentos] = None):
         self.base_url = base_url
+        self.session = session or crear_sesion_http()
+        self.reintentos = reintentos
 
     def consultar(self, nit: str, **kwargs) -> Optional[Dict[str, Any]]:
         url = f"{self.base_url}?nit={nit}"
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()  # Lanza una excepción para códigos de estado erróneos
+            response = obtener_respuesta(self.session, url, "datos.gov.co", kwargs.get("plazo"), self.reintentos)
             data = response.json()
             if not data:
                 return None
@@ -50,34 +209,49 @@ class DatosGovCoService(DataSource):
             logging.error(f"Error al analizar la respuesta de Datos.gov.co para el NIT {nit}")
             raise DataSourceError(source_name="datos.gov.co", original_exception=e)
 
+    def consultar_lote(self, nits: Iterable[str], plazo: Optional[Plazo] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Consulta varios NITs con `$where=nit in(...)`, una solicitud por grupo de NITs.
+        """
+        nits = list(dict.fromkeys(nits))
+        registros: List[Dict[str, Any]] = []
+        for url, grupo in construir_consultas_socrata_por_nit(self.base_url, nits):
+            try:
+                response = obtener_respuesta(self.session, url, "datos.gov.co", plazo, self.reintentos)
+                registros.extend(response.json())
+            except requests.exceptions.RequestException as e:
+                logging.error(f"Error al consultar Datos.gov.co por lote: {e}")
+                raise DataSourceError(source_name="datos.gov.co", original_exception=e)
+            except ValueError as e:
+                logging.error(f"Error al analizar la respuesta por lote de Datos.gov.co ({len(grupo)} NITs)")
+                raise DataSourceError(source_name="datos.gov.co", original_exception=e)
+        return agrupar_registros_por_nit(nits, registros)
+
 
 class RuesService(DataSource):
     """
     Implementación de fuente de datos para rues.org.co.
     
-    Este servicio requiere que 'codigo_camara' y 'matricula' se pasen a través de argumentos de palabra clave.
+    Este servicio requiere que 'codigo_camara' y 'matricula' se pasen a través de argumentos de palabra clave,
+    o directamente 'codigo_rues' si ya se conoce.
     """
-    def __init__(self, base_url: str = "https://ruesapi.rues.org.co/WEB2/api/Expediente/DetalleRM"):
+    def __init__(self, base_url: str = "https://ruesapi.rues.org.co/WEB2/api/Expediente/DetalleRM", session: Optional[requests.Session] = None,
+                 reintentos: Optional[PoliticaReintentos] = None):
         self.base_url = base_url
+        self.session = session or crear_sesion_http()
+        self.reintentos = reintentos
 
     def consultar(self, nit: str, **kwargs) -> Optional[Dict[str, Any]]:
-        codigo_camara = kwargs.get('codigo_camara')
-        matricula = kwargs.get('matricula')
+        codigo_rues = kwargs.get('codigo_rues') or codigo_rues_de(kwargs)
 
-        if not codigo_camara or not matricula:
+        if not codigo_rues:
             # Esto no es un error, solo un caso en el que no tenemos suficiente información para consultar
             return None
 
-        # Lógica para crear el código RUES
-        union_len = len(str(codigo_camara)) + len(str(matricula))
-        relleno = '0' * (12 - union_len)
-        codigo_rues = f"{codigo_camara}{relleno}{matricula}"
-        
         url = f"{self.base_url}/{codigo_rues}"
-        
+
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
+            response = obtener_respuesta(self.session, url, "rues.org.co", kwargs.get("plazo"), self.reintentos)
             data = response.json()
             
             if data.get("codigo_error") == '0000':
@@ -93,103 +267,523 @@ class RuesService(DataSource):
             raise DataSourceError(source_name="rues.org.co", original_exception=e)
 
 
-class ConsultaNitService:
+class FuenteConRespaldo(DataSource):
+    """
+    Consulta primero una fuente (p. ej. el snapshot local) y recurre a la de respaldo (p. ej. la API en vivo)
+    cuando la primera no encuentra el NIT o falla.
+    """
+    def __init__(self, primaria: DataSource, respaldo: DataSource):
+        self.primaria = primaria
+        self.respaldo = respaldo
+
+    def consultar(self, nit: str, **kwargs) -> Optional[Dict[str, Any]]:
+        try:
+            data = self.primaria.consultar(nit, **kwargs)
+        except DataSourceError as e:
+            logging.warning(f"Falló la fuente primaria para el NIT {nit}, se usa la de respaldo: {e}")
+            data = None
+        if data:
+            return data
+        return self.respaldo.consultar(nit, **kwargs)
+
+    def consultar_lote(self, nits: Iterable[str], plazo: Optional[Plazo] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        nits = list(nits)
+        try:
+            resultado = self.primaria.consultar_lote(nits, plazo=plazo)
+        except DataSourceError as e:
+            logging.warning(f"Falló la fuente primaria para el lote, se usa la de respaldo: {e}")
+            resultado = {}
+        faltantes = [nit for nit in nits if not resultado.get(nit)]
+        if faltantes:
+            resultado.update(self.respaldo.consultar_lote(faltantes, plazo=plazo))
+        return resultado
+
+
+class FuenteConInterruptor(DataSource):
+    """
+    Protege una fuente con un circuit breaker: tras varias fallas seguidas, las consultas fallan de inmediato
+    con CircuitoAbiertoError en lugar de esperar el timeout, hasta que una consulta de prueba tenga éxito.
+    """
+    def __init__(self, fuente: DataSource, nombre: str, interruptor: Optional[Interruptor] = None):
+        self.fuente = fuente
+        self.nombre = nombre
+        self.interruptor = interruptor or Interruptor()
+
+    def consultar(self, nit: str, **kwargs) -> Optional[Dict[str, Any]]:
+        return self._llamar(lambda: self.fuente.consultar(nit, **kwargs), kwargs.get("plazo"))
+
+    def consultar_lote(self, nits: Iterable[str], plazo: Optional[Plazo] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        return self._llamar(lambda: self.fuente.consultar_lote(nits, plazo=plazo), plazo)
+
+    def _llamar(self, funcion: Callable[[], Any], plazo: Optional[Plazo]) -> Any:
+        if not self.interruptor.permitir():
+            raise CircuitoAbiertoError(self.nombre)
+        try:
+            resultado = funcion()
+        except DataSourceError:
+            # Un timeout causado por el plazo agotado de la solicitud no indica que la fuente esté caída
+            if plazo is not None and plazo.agotado():
+                self.interruptor.liberar()
+            else:
+                self.interruptor.registrar_fallo()
+            raise
+        except BaseException:
+            self.interruptor.liberar()
+            raise
+        self.interruptor.registrar_exito()
+        return resultado
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return self.interruptor.estadisticas()
+
+
+class FuenteConCobertura(DataSource):
+    """
+    Cubre las consultas lentas de una fuente (hedged requests): si una consulta no responde tras el retardo que indica
+    la política (un percentil de las latencias recientes), se envía una segunda idéntica y se usa la que responda primero.
+
+    Una solicitud de requests en curso no puede interrumpirse, así que la perdedora termina en segundo plano y su
+    resultado se descarta. Las consultas por lote no se cubren.
+
+    Las consultas solo se delegan al pool si tiene un hilo libre, de modo que nunca esperan en su cola: esa espera se
+    contaría como latencia de la fuente y dispararía más coberturas justo cuando el pool está saturado. Sin hilos
+    libres la consulta se hace en el hilo que la pide, sin cobertura.
+    """
+    def __init__(self, fuente: DataSource, politica: Optional[PoliticaCobertura] = None, max_hilos: int = 32):
+        self.fuente = fuente
+        self.politica = politica or PoliticaCobertura()
+        self._executor = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix="cobertura")
+        self._hilos_libres = threading.BoundedSemaphore(max_hilos)
+        self._lock = threading.Lock()
+        self.sin_hilos_libres = 0
+
+    def consultar(self, nit: str, **kwargs) -> Optional[Dict[str, Any]]:
+        retardo = self.politica.iniciar_solicitud()
+        if retardo is None or not self._reservar_hilo():
+            return self._medir(nit, kwargs)
+
+        original = self._enviar(nit, kwargs)
+        terminadas, _ = wait([original], timeout=retardo)
+        if terminadas or not self._reservar_hilo():
+            return original.result()
+        if not self.politica.permitir_cobertura():
+            self._hilos_libres.release()
+            return original.result()
+
+        cobertura = self._enviar(nit, kwargs)
+
+        pendientes: Set[Future] = {original, cobertura}
+        error: Optional[BaseException] = None
+        while pendientes:
+            terminadas, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in terminadas:
+                if futuro.exception() is None:
+                    for perdedora in pendientes:
+                        perdedora.cancel()
+                    if futuro is cobertura:
+                        self.politica.registrar_ganadora()
+                    return futuro.result()
+                error = error or futuro.exception()
+        raise error
+
+    def consultar_lote(self, nits: Iterable[str], plazo: Optional[Plazo] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        return self.fuente.consultar_lote(nits, plazo=plazo)
+
+    def _medir(self, nit: str, kwargs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Solo las respuestas exitosas alimentan la distribución de latencias
+        inicio = time.monotonic()
+        resultado = self.fuente.consultar(nit, **kwargs)
+        self.politica.registrar_latencia(time.monotonic() - inicio)
+        return resultado
+
+    def _reservar_hilo(self) -> bool:
+        if self._hilos_libres.acquire(blocking=False):
+            return True
+        with self._lock:
+            self.sin_hilos_libres += 1
+        return False
+
+    def _enviar(self, nit: str, kwargs: Dict[str, Any]) -> Future:
+        # Ocupa el hilo reservado con _reservar_hilo; se libera al terminar, también si se cancela antes de empezar
+        futuro = self._executor.submit(self._medir, nit, kwargs)
+        futuro.add_done_callback(lambda _: self._hilos_libres.release())
+        return futuro
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {**self.politica.estadisticas(), "sin_hilos_libres": self.sin_hilos_libres}
+
+
+class FuenteMedida(DataSource):
+    """
+    Mide cada consulta a una fuente (duración, estado: "ok", "vacio" o "error", y registros devueltos) y la
+    registra en el sumidero de métricas y en la traza de la solicitud en curso. Envuelve a la fuente ya protegida,
+    así que la duración incluye reintentos, coberturas y respaldos: el tiempo que la consulta esperó por esa fuente.
+    """
+    def __init__(self, fuente: DataSource, etapa: str, metricas: Optional[SumideroMetricas] = None):
+        self.fuente = fuente
+        self.etapa = etapa
+        self.metricas = metricas
+
+    def consultar(self, nit: str, **kwargs) -> Optional[Dict[str, Any]]:
+        return self._llamar(lambda: self.fuente.consultar(nit, **kwargs))
+
+    def consultar_lote(self, nits: Iterable[str], plazo: Optional[Plazo] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        return self._llamar(lambda: self.fuente.consultar_lote(nits, plazo=plazo), lote=True)
+
+    def _llamar(self, funcion: Callable[[], Any], lote: bool = False) -> Any:
+        inicio = time.perf_counter()
+        try:
+            resultado = funcion()
+        except Exception:
+            registrar_medicion(self.metricas, self.etapa, inicio, ESTADO_ERROR)
+            raise
+        registrar_medicion(self.metricas, self.etapa, inicio, ESTADO_OK if resultado else ESTADO_VACIO,
+                           tamano=contar_registros(resultado, lote))
+        return resultado
+
+
+class BaseConsultaNitService:
+    """
+    Lógica común a los orquestadores síncrono y asíncrono: la caché de resultados y la fusión
+    de los datos de las fuentes.
+    """
+    cache: Optional[CacheResultados] = None
+    indice_rues: Optional[IndiceCodigosRues] = None
+    metricas: Optional[SumideroMetricas] = None
+
+    def _leer_cache(self, nit: str) -> Optional[Empresa]:
+        """
+        Devuelve la Empresa en caché, None si no hay una entrada utilizable, o lanza NitNotFoundError
+        si el NIT está en caché como no encontrado. Las entradas obsoletas se sirven igualmente y se
+        programa su refresco en segundo plano.
+        """
+        if self.cache is None:
+            return None
+        entrada = self.cache.obtener(nit)
+        if entrada is None:
+            return None
+        if self.cache.es_obsoleta(entrada):
+            self._programar_refresco(nit)
+        if entrada.empresa is None:
+            raise NitNotFoundError(nit)
+        return entrada.empresa
+
+    def en_cache(self, empresa: Empresa) -> bool:
+        """
+        Indica si la Empresa es la instancia guardada en la caché de resultados en memoria, es decir, si las próximas
+        consultas del NIT la devolverán tal cual. Los resultados incompletos (RUES omitido) no se guardan en caché.
+        """
+        return self.cache is not None and self.cache.contiene(empresa.nit, empresa)
+
+    def _programar_refresco(self, nit: str) -> None:
+        """
+        Refresca en segundo plano la entrada obsoleta del NIT. Cada orquestador lo implementa con su modelo de concurrencia.
+        """
+        raise NotImplementedError
+
+    def _respaldo_ultimo_valido(self, nit: str, error: DataSourceError) -> Empresa:
+        """
+        Devuelve la última Empresa conocida del NIT cuando una fuente falla, o relanza el error si no hay ninguna.
+        """
+        empresa = self.cache.ultimo_valido(nit) if self.cache is not None else None
+        if empresa is None:
+            raise error
+        logging.warning(f"Se sirve el último dato válido en caché para el NIT {nit} por falla de la fuente: {error}")
+        return empresa
+
+    def _resolver_lote_desde_cache(self, nits: List[str]) -> Tuple[Dict[str, ResultadoConsulta], List[str]]:
+        """
+        Resuelve desde la caché los NITs del lote que se puedan. Devuelve esos resultados y los NITs pendientes.
+        """
+        resultados: Dict[str, ResultadoConsulta] = {}
+        pendientes: List[str] = []
+        for nit in nits:
+            try:
+                empresa = self._leer_cache(nit)
+            except NitNotFoundError as e:
+                resultados[nit] = self._resultado_error(nit, e)
+                continue
+            if empresa is None:
+                pendientes.append(nit)
+            else:
+                resultados[nit] = self._resultado_exitoso(nit, empresa)
+        return resultados, pendientes
+
+    def _construir_empresa(self, nit: str, gov_data: Optional[Dict], rues_data: Optional[Dict], completa: bool = True) -> Empresa:
+        """
+        Construye la Empresa a partir de los datos obtenidos o lanza NitNotFoundError si no hay ninguno.
+        Ambos resultados se guardan en caché; los errores de las fuentes nunca llegan aquí.
+        Una Empresa incompleta (RUES omitido por falta de plazo) se devuelve pero no se guarda.
+        """
+        if not gov_data and not rues_data:
+            if self.cache is not None:
+                self.cache.guardar(nit, None)
+            raise NitNotFoundError(nit)
+
+        inicio = time.perf_counter()
+        empresa = self._unificar_datos(nit, gov_data or {}, rues_data or {})
+        registrar_medicion(self.metricas, ETAPA_FUSION, inicio)
+        if self.cache is not None and completa:
+            self.cache.guardar(nit, empresa)
+        return empresa
+
+    def _codigo_rues_conocido(self, nit: str) -> Optional[str]:
+        """
+        Código RUES aprendido del NIT en consultas anteriores, o None si no hay índice o aún no se conoce.
+        """
+        return self.indice_rues.obtener(nit) if self.indice_rues is not None else None
+
+    def _aprender_codigo_rues(self, nit: str, gov_data: Dict[str, Any]) -> None:
+        if self.indice_rues is None:
+            return
+        codigo_rues = codigo_rues_de(gov_data)
+        if codigo_rues:
+            self.indice_rues.guardar(nit, codigo_rues)
+
+    def _codigo_anticipado_vigente(self, nit: str, codigo_rues: str, gov_data: Optional[Dict[str, Any]]) -> bool:
+        """
+        Indica si el código RUES aprendido, con el que se consultó RUES en paralelo, sigue correspondiendo al registro
+        actual de datos.gov.co. Si no (cambio de cámara o matrícula, o el NIT ya no está), la consulta anticipada se
+        descarta para que el resultado sea el mismo que el de la consulta secuencial.
+        """
+        actual = codigo_rues_de(gov_data)
+        if actual == codigo_rues:
+            return True
+        logging.info(f"El código RUES aprendido para el NIT {nit} ya no corresponde a datos.gov.co; se descarta la consulta anticipada")
+        if actual is None and self.indice_rues is not None:
+            self.indice_rues.invalidar(nit)
+        return False
+
+    def _rues_omitible(self, nit: str, plazo: Optional[Plazo], error: Optional[DataSourceError] = None) -> bool:
+        """
+        Indica si la consulta a RUES debe omitirse (o su falla ignorarse) porque se agotó el plazo de la solicitud
+        o su circuito está abierto, en cuyo caso se responde solo con los datos de datos.gov.co.
+        """
+        if isinstance(error, CircuitoAbiertoError):
+            logging.warning(f"Circuito de RUES abierto; se responde solo con datos.gov.co para el NIT {nit}")
+            return True
+        if plazo is None or not plazo.agotado():
+            return False
+        if error is None:
+            logging.warning(f"Sin plazo para consultar RUES; se responde solo con datos.gov.co para el NIT {nit}")
+        else:
+            logging.warning(f"RUES no respondió dentro del plazo; se responde solo con datos.gov.co para el NIT {nit}: {error}")
+        return True
+
+    def _preparar_lote(self, nits: List[Any]) -> List[Union[str, ResultadoConsulta]]:
+        """
+        Normaliza cada NIT del lote; los inválidos se reemplazan por su resultado de error.
+        """
+        preparados: List[Union[str, ResultadoConsulta]] = []
+        for nit in nits:
+            try:
+                preparados.append(normalizar_nit(nit))
+            except NitInvalidoError as e:
+                preparados.append(self._resultado_error(str(nit), e))
+        return preparados
+
+    def _ensamblar_lote(self, preparados: List[Union[str, ResultadoConsulta]], resultados: Dict[str, ResultadoConsulta]) -> List[ResultadoConsulta]:
+        return [item if isinstance(item, ResultadoConsulta) else resultados[item] for item in preparados]
+
+    def _resultado_exitoso(self, nit: str, empresa: Empresa) -> ResultadoConsulta:
+        return ResultadoConsulta(nit=nit, estado=200, empresa=empresa)
+
+    def _resultado_error(self, nit: str, error: Exception) -> ResultadoConsulta:
+        """
+        Convierte la excepción de la consulta de un NIT en un resultado tipado del lote.
+        """
+        if isinstance(error, NitInvalidoError):
+            return ResultadoConsulta(nit=nit, estado=400, error=ErrorConsulta(tipo="nit_invalido", mensaje=error.mensaje))
+        if isinstance(error, NitNotFoundError):
+            return ResultadoConsulta(nit=nit, estado=404, error=ErrorConsulta(tipo="nit_no_encontrado", mensaje=str(error)))
+        if isinstance(error, DataSourceError):
+            logging.error(f"Falló una fuente de datos para el NIT {nit}: {error}")
+            return ResultadoConsulta(nit=nit, estado=502, error=ErrorConsulta(
+                tipo="fuente_no_disponible",
+                mensaje="Una fuente de datos externa no está disponible. Por favor, intente de nuevo más tarde."
+            ))
+        logging.error(f"Ocurrió un error inesperado para el NIT {nit}: {error}")
+        return ResultadoConsulta(nit=nit, estado=500, error=ErrorConsulta(
+            tipo="error_interno",
+            mensaje="Ocurrió un error interno en el servidor."
+        ))
+
+    def _unificar_datos(self, nit: str, gov_data: Dict, rues_data: Dict) -> Empresa:
+        """
+        Fusiona los datos de todas las fuentes en un único modelo Empresa según PLAN_FUSION (prioridad a gov_data).
+
+        Los CIIU se arman como diccionarios (memoizados por código) y la Empresa completa se valida en una sola
+        pasada de Pydantic, sin construir antes cada Ciiu por separado; el JSON resultante es el mismo.
+        """
+        datos = (gov_data, rues_data)
+        empresa_data = PLAN_FUSION.aplicar(datos)
+        empresa_data["nit"] = nit
+        empresa_data["fuentes"] = PLAN_FUSION.fuentes_con_datos(datos)
+        # Si ninguna fuente trae el dígito de verificación, se calcula con el módulo 11 de la DIAN
+        empresa_data["dv"] = empresa_data["dv"] or calcular_dv(nit)
+
+        # Poblamos los campos CIIU primarios; la descripción que falte se toma del catálogo CIIU Rev. 4 A.C.
+        cod_ciiu_pri = empresa_data["cod_ciiu_act_econ_pri"]
+        desc_ciiu_pri = empresa_data["desc_ciiu_act_econ_pri"] or describir_ciiu(cod_ciiu_pri) or "Actividad No Homologada CIIU v4"
+        empresa_data["desc_ciiu_act_econ_pri"] = desc_ciiu_pri
+        empresa_data["ciiu_principal"] = campos_ciiu(cod_ciiu_pri, desc_ciiu_pri)
+
+        # Poblamos ciiu2 (secundario), ciiu3 y ciiu4 como objetos Ciiu
+        for campo, campo_codigo, campo_descripcion in CIIU_SECUNDARIOS:
+            empresa_data[campo] = campos_ciiu(empresa_data.pop(campo_codigo), empresa_data.pop(campo_descripcion))
+
+        return Empresa.model_validate(empresa_data)
+
+
+class ConsultaNitService(BaseConsultaNitService):
     """
     Orquesta la recuperación de datos de empresas de múltiples fuentes.
     """
-    def __init__(self, datos_gov_co_service: DataSource, rues_service: DataSource):
+    def __init__(self, datos_gov_co_service: DataSource, rues_service: DataSource, cache: Optional[CacheResultados] = None,
+                 indice_rues: Optional[IndiceCodigosRues] = None, metricas: Optional[SumideroMetricas] = None):
         self.datos_gov_co_service = datos_gov_co_service
         self.rues_service = rues_service
+        self.cache = cache
+        self.indice_rues = indice_rues
+        self.metricas = metricas
+        self._refrescos_en_curso: Set[str] = set()
+        self._lock_refrescos = threading.Lock()
+        self._executor_refrescos = ThreadPoolExecutor(max_workers=2, thread_name_prefix="refresco-cache")
+        self._executor_rues = ThreadPoolExecutor(max_workers=MAX_CONSULTAS_RUES_PARALELAS, thread_name_prefix="consulta-rues")
+        self._single_flight = SingleFlight()
 
-    def consultar_nit(self, nit: str) -> Empresa:
+    def consultar_nit(self, nit: str, plazo: Optional[Plazo] = None) -> Empresa:
         """
         Realiza una búsqueda exhaustiva de un NIT en todas las fuentes de datos disponibles.
+
+        Si hay caché configurada, los resultados (incluido "no encontrado") se sirven desde ella mientras estén vigentes,
+        y si una fuente falla se devuelve la última Empresa conocida del NIT. Con `plazo`, cada fuente usa el tiempo
+        restante como timeout y RUES se omite si ya no queda tiempo para consultarlo.
+
+        El NIT se normaliza como en la solicitud HTTP (puntos de miles, dígito de verificación) y, si no es válido,
+        se lanza NitInvalidoError sin consultar las fuentes.
         """
-        gov_data = self.datos_gov_co_service.consultar(nit)
-        
-        rues_data = None
-        if gov_data:
-            rues_data = self.rues_service.consultar(
-                nit,
-                codigo_camara=gov_data.get("codigo_camara"),
-                matricula=gov_data.get("matricula")
-            )
+        nit = normalizar_nit(nit)
+        empresa = self._leer_cache(nit)
+        if empresa is not None:
+            return empresa
+        try:
+            return self._consultar_fuentes(nit, plazo)
+        except DataSourceError as e:
+            return self._respaldo_ultimo_valido(nit, e)
 
-        if not gov_data and not rues_data:
-            raise NitNotFoundError(nit)
+    def _programar_refresco(self, nit: str) -> None:
+        with self._lock_refrescos:
+            if nit in self._refrescos_en_curso:
+                return
+            self._refrescos_en_curso.add(nit)
+        self._executor_refrescos.submit(self._refrescar, nit)
 
-        return self._unificar_datos(nit, gov_data or {}, rues_data or {})
+    def _refrescar(self, nit: str) -> None:
+        try:
+            self._consultar_fuentes(nit)
+        except NitNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning(f"No se pudo refrescar la caché para el NIT {nit}: {e}")
+        finally:
+            with self._lock_refrescos:
+                self._refrescos_en_curso.discard(nit)
 
-    def _unificar_datos(self, nit: str, gov_data: Dict, rues_data: Dict) -> Empresa:
+    def _consultar_fuentes(self, nit: str, plazo: Optional[Plazo] = None) -> Empresa:
+        """
+        Consulta las fuentes para el NIT. Los hilos que piden el mismo NIT a la vez comparten una sola consulta,
+        que se rige por el plazo de quien la inició.
         """
-        Fusiona los datos de todas las fuentes en un único modelo Empresa, dando prioridad a gov_data.
+        return self._single_flight.ejecutar(nit, lambda: self._consultar_fuentes_sin_coalescer(nit, plazo))
+
+    def _consultar_fuentes_sin_coalescer(self, nit: str, plazo: Optional[Plazo] = None) -> Empresa:
+        codigo_rues = self._codigo_rues_conocido(nit)
+        if codigo_rues is None:
+            gov_data = self.datos_gov_co_service.consultar(nit, plazo=plazo)
+            return self._completar_con_rues(nit, gov_data, plazo)
+
+        # Con el código RUES ya aprendido no hace falta esperar a datos.gov.co: ambas fuentes se consultan en paralelo.
+        # El hilo recibe una copia del contexto para que su medición llegue a la traza de la solicitud.
+        rues_futuro = self._executor_rues.submit(copy_context().run, perfilar_en_hilo, self.rues_service.consultar, nit,
+                                                  codigo_rues=codigo_rues, plazo=plazo)
+        gov_data = self.datos_gov_co_service.consultar(nit, plazo=plazo)
+        if self._codigo_anticipado_vigente(nit, codigo_rues, gov_data):
+            return self._completar_con_rues(nit, gov_data, plazo, rues_futuro.result)
+        return self._completar_con_rues(nit, gov_data, plazo)
+
+    def _completar_con_rues(self, nit: str, gov_data: Optional[Dict[str, Any]], plazo: Optional[Plazo] = None,
+                            consulta_rues: Optional[Callable[[], Optional[Dict[str, Any]]]] = None) -> Empresa:
         """
-        fuentes = []
+        Consulta RUES con los datos ya obtenidos de datos.gov.co y construye la Empresa.
+        `consulta_rues` entrega el resultado de una consulta a RUES ya lanzada en paralelo.
+        """
+        rues_data = None
+        completa = True
         if gov_data:
-            fuentes.append('datos.gov.co')
-        if rues_data:
-            fuentes.append('rues.org.co')
-        
-        # Ayudante para obtener el primer valor disponible
-        def get_valor(key_gov: str, key_rues: str):
-            return gov_data.get(key_gov) or rues_data.get(key_rues)
-
-        # Mapear claves de RUES a claves de GOV donde difieren
-        empresa_data = {
-            "nit": nit,
-            "razon_social": get_valor("razon_social", "razon_social"),
-            "dv": get_valor("digito_verificacion", "dv"),
-            "camara_comercio": get_valor("camara_comercio", "camara"),
-            "matricula": get_valor("matricula", "matricula"),
-            "estado": get_valor("estado_matricula", "estado"),
-            "fecha_matricula": get_valor("fecha_matricula", "fecha_matricula"),
-            "fecha_renovacion": get_valor("fecha_renovacion", "fecha_renovacion"),
-            "ultimo_ano_renovado": get_valor("ultimo_ano_renovado", "ultimo_ano_renovado"),
-            "tipo_sociedad": get_valor("tipo_sociedad", "tipo_sociedad"),
-            "organizacion_juridica": get_valor("organizacion_juridica", "organizacion_juridica"),
-            "fuentes": fuentes
-        }
-
-        # Poblamos los campos CIIU primarios
-        empresa_data["cod_ciiu_act_econ_pri"] = get_valor("cod_ciiu_act_econ_pri", "cod_ciiu_act_econ_pri") or "9999"
-        empresa_data["desc_ciiu_act_econ_pri"] = get_valor("desc_ciiu_act_econ_pri", "desc_ciiu_act_econ_pri") or "Actividad No Homologada CIIU v4"
-
-        # Populate ciiu_principal using the already determined primary CIIU fields
-        ciiu_principal_codigo = empresa_data.get("cod_ciiu_act_econ_pri")
-        ciiu_principal_descripcion = empresa_data.get("desc_ciiu_act_econ_pri")
-
-        if ciiu_principal_codigo or ciiu_principal_descripcion:
-            empresa_data["ciiu_principal"] = Ciiu(
-                codigo=ciiu_principal_codigo,
-                descripcion=ciiu_principal_descripcion
-            )
-        else:
-            empresa_data["ciiu_principal"] = Ciiu() # Default empty Ciiu object
-        
-        # Poblamos ciiu2, ciiu3, ciiu4 como objetos Ciiu
-        # Para ciiu2 (secundario)
-        cod_ciiu_sec = rues_data.get("cod_ciiu_act_econ_sec")
-        desc_ciiu_sec = rues_data.get("desc_ciiu_act_econ_sec")
-        if cod_ciiu_sec or desc_ciiu_sec:
-            empresa_data["ciiu2"] = Ciiu(codigo=cod_ciiu_sec, descripcion=desc_ciiu_sec)
-        else:
-            empresa_data["ciiu2"] = Ciiu() # Default empty Ciiu object
+            self._aprender_codigo_rues(nit, gov_data)
+            if consulta_rues is None and self._rues_omitible(nit, plazo):
+                completa = False
+            else:
+                try:
+                    if consulta_rues is not None:
+                        rues_data = consulta_rues()
+                    else:
+                        rues_data = self.rues_service.consultar(
+                            nit,
+                            codigo_camara=gov_data.get("codigo_camara"),
+                            matricula=gov_data.get("matricula"),
+                            plazo=plazo
+                        )
+                except DataSourceError as e:
+                    if not self._rues_omitible(nit, plazo, e):
+                        raise
+                    completa = False
 
-        # Para ciiu3
-        cod_ciiu3 = rues_data.get("ciiu3")
-        desc_ciiu3 = rues_data.get("desc_ciiu3")
-        if cod_ciiu3 or desc_ciiu3:
-            empresa_data["ciiu3"] = Ciiu(codigo=cod_ciiu3, descripcion=desc_ciiu3)
-        else:
-            empresa_data["ciiu3"] = Ciiu() # Default empty Ciiu object
+        return self._construir_empresa(nit, gov_data, rues_data, completa)
 
-        # Para ciiu4
-        cod_ciiu4 = rues_data.get("ciiu4")
-        desc_ciiu4 = rues_data.get("desc_ciiu4")
-        if cod_ciiu4 or desc_ciiu4:
-            empresa_data["ciiu4"] = Ciiu(codigo=cod_ciiu4, descripcion=desc_ciiu4)
-        else:
-            empresa_data["ciiu4"] = Ciiu() # Default empty Ciiu object
+    def consultar_nits(self, nits: List[Any], max_concurrencia: int = 10, plazo: Optional[Plazo] = None) -> List[ResultadoConsulta]:
+        """
+        Consulta un lote de NITs en paralelo, con un máximo de `max_concurrencia` consultas simultáneas.
+
+        Un NIT inválido o fallido no interrumpe el lote: cada posición recibe su empresa o su error tipado,
+        en el mismo orden de entrada. Los NITs repetidos se consultan una sola vez.
+        """
+        preparados = self._preparar_lote(nits)
+        unicos = list(dict.fromkeys(item for item in preparados if isinstance(item, str)))
+
+        resultados, pendientes = self._resolver_lote_desde_cache(unicos)
+        if pendientes:
+            gov_lote = self._prefetch_gov_lote(pendientes, plazo)
 
+            def consultar_uno(nit: str) -> ResultadoConsulta:
+                try:
+                    try:
+                        if nit in gov_lote:
+                            empresa = self._completar_con_rues(nit, gov_lote[nit], plazo)
+                        else:
+                            empresa = self._consultar_fuentes(nit, plazo)
+                    except DataSourceError as e:
+                        empresa = self._respaldo_ultimo_valido(nit, e)
+                    return self._resultado_exitoso(nit, empresa)
+                except Exception as e:
+                    return self._resultado_error(nit, e)
 
-        return Empresa(**empresa_data)
+            with ThreadPoolExecutor(max_workers=max(1, min(max_concurrencia, len(pendientes)))) as executor:
+                # Cada hilo recibe una copia del contexto para que sus mediciones lleguen a la traza de la solicitud y,
+                # si se perfila, su trabajo al perfil
+                consultas = [executor.submit(copy_context().run, perfilar_en_hilo, consultar_uno, nit) for nit in pendientes]
+                resultados.update(zip(pendientes, (consulta.result() for consulta in consultas)))
+
+        return self._ensamblar_lote(preparados, resultados)
+
+    def _prefetch_gov_lote(self, nits: List[str], plazo: Optional[Plazo] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Obtiene los datos de datos.gov.co de todo el lote con consultas múltiples. Si la consulta
+        por lote falla, devuelve un diccionario vacío y cada NIT se consulta individualmente.
+        """
+        try:
+            return self.datos_gov_co_service.consultar_lote(nits, plazo=plazo)
+        except DataSourceError as e:
+            logging.warning(f"Falló la consulta por lote a datos.gov.co, se consultará NIT por NIT: {e}")
+            return {}
@@ -0,0 +1,88 @@
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, TYPE_CHECKING, TypeVar
+
+if TYPE_CHECKING:
+    import asyncio
+
+
+T = TypeVar("T")
+
+
+class _LlamadaEnVuelo:
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Deduplica llamadas concurrentes por clave entre hilos: mientras una llamada para una clave está en vuelo,
+    las demás esperan y reciben su mismo resultado o su misma excepción.
+    """
+    def __init__(self):
+        self._en_vuelo: Dict[str, _LlamadaEnVuelo] = {}
+        self._lock = threading.Lock()
+        self.lideres = 0
+        self.compartidas = 0
+
+    def ejecutar(self, clave: str, funcion: Callable[[], T]) -> T:
+        with self._lock:
+            llamada = self._en_vuelo.get(clave)
+            es_lider = llamada is None
+            if es_lider:
+                llamada = _LlamadaEnVuelo()
+                self._en_vuelo[clave] = llamada
+                self.lideres += 1
+            else:
+                self.compartidas += 1
+
+        if not es_lider:
+            llamada.evento.wait()
+            if llamada.error is not None:
+                raise llamada.error
+            return llamada.resultado
+
+        try:
+            llamada.resultado = funcion()
+            return llamada.resultado
+        except BaseException as e:
+            llamada.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._en_vuelo[clave]
+            llamada.evento.set()
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {"lideres": self.lideres, "compartidas": self.compartidas, "en_vuelo": len(self._en_vuelo)}
+
+
+class AsyncSingleFlight:
+    """
+    Versión asíncrona de SingleFlight: las corrutinas concurrentes con la misma clave esperan una única tarea.
+
+    La tarea compartida se protege con asyncio.shield, de modo que la cancelación de un llamador
+    no cancela la consulta de los demás.
+    """
+    def __init__(self):
+        self._en_vuelo: Dict[str, "asyncio.Future[Any]"] = {}
+        self.lideres = 0
+        self.compartidas = 0
+
+    async def ejecutar(self, clave: str, funcion: Callable[[], Awaitable[T]]) -> T:
+        import asyncio
+
+        futuro = self._en_vuelo.get(clave)
+        if futuro is None:
+            futuro = asyncio.ensure_future(funcion())
+            self._en_vuelo[clave] = futuro
+            futuro.add_done_callback(lambda _: self._en_vuelo.pop(clave, None))
+            self.lideres += 1
+        else:
+            self.compartidas += 1
+        return await asyncio.shield(futuro)
+
+    def estadisticas(self) -> Dict[str, int]:
+        return {"lideres": self.lideres, "compartidas": self.compartidas, "en_vuelo": len(self._en_vuelo)}
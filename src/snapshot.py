@@ -0,0 +1,297 @@
+"""
+Snapshot local del dataset c82u-588k de datos.gov.co, indexado por NIT en SQLite.
+
+Uso del constructor:
+
+    python -m src.snapshot construir --salida snapshot.sqlite3
+    python -m src.snapshot construir --salida snapshot.sqlite3 --desde-archivo exportacion.csv
+    python -m src.snapshot sincronizar --ruta snapshot.sqlite3
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+
+from src.exceptions import DataSourceError
+from src.plazo import Plazo
+from src.services import DataSource, crear_sesion_http
+
+
+DATOS_GOV_CO_URL = "https://www.datos.gov.co/resource/c82u-588k.json"
+
+_ESQUEMA = (
+    "CREATE TABLE IF NOT EXISTS registros (nit TEXT PRIMARY KEY, datos TEXT NOT NULL) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS metadatos (clave TEXT PRIMARY KEY, valor TEXT NOT NULL)",
+)
+
+
+class SnapshotDatosGovCo(DataSource):
+    """
+    Fuente de datos que responde desde un snapshot local indexado por NIT, sin llamadas de red.
+
+    El archivo se abre en modo solo lectura; se reabre automáticamente si el constructor lo reemplaza.
+    """
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._conexion: Optional[sqlite3.Connection] = None
+        self._inodo: Optional[int] = None
+
+    def _obtener_conexion(self) -> sqlite3.Connection:
+        inodo = os.stat(self.ruta).st_ino
+        if self._conexion is None or inodo != self._inodo:
+            if self._conexion is not None:
+                self._conexion.close()
+            self._conexion = sqlite3.connect(f"file:{self.ruta}?mode=ro", uri=True, check_same_thread=False)
+            self._inodo = inodo
+        return self._conexion
+
+    def consultar(self, nit: str, **kwargs) -> Optional[Dict[str, Any]]:
+        try:
+            with self._lock:
+                fila = self._obtener_conexion().execute("SELECT datos FROM registros WHERE nit = ?", (nit,)).fetchone()
+        except (OSError, sqlite3.Error) as e:
+            logging.error(f"Error al consultar el snapshot de Datos.gov.co: {e}")
+            raise DataSourceError(source_name="snapshot datos.gov.co", original_exception=e)
+        return json.loads(fila[0]) if fila else None
+
+    def consultar_lote(self, nits: Iterable[str], plazo: Optional[Plazo] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        return {nit: self.consultar(nit) for nit in nits}
+
+    def metadatos(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._obtener_conexion().execute("SELECT clave, valor FROM metadatos").fetchall())
+
+
+def paginar_datos_gov_co(base_url: str = DATOS_GOV_CO_URL, session: Optional[requests.Session] = None, tamano_pagina: int = 50000) -> Iterator[Dict[str, Any]]:
+    """
+    Recorre el dataset completo en páginas ordenadas por `:id` (paginación por clave, sin $offset),
+    devolviendo los registros uno a uno.
+    """
+    session = session or crear_sesion_http()
+    ultimo_id = None
+    while True:
+        params = {"$select": ":*, *", "$order": ":id", "$limit": tamano_pagina}
+        if ultimo_id is not None:
+            params["$where"] = f":id > '{ultimo_id}'"
+        response = session.get(base_url, params=params, timeout=60)
+        response.raise_for_status()
+        pagina = response.json()
+        yield from pagina
+        if len(pagina) < tamano_pagina:
+            return
+        ultimo_id = pagina[-1][":id"]
+
+
+def leer_exportacion(ruta: str) -> Iterator[Dict[str, Any]]:
+    """
+    Lee una exportación local del dataset: CSV con los nombres de campo de la API, JSON Lines o un arreglo JSON.
+    """
+    if ruta.endswith(".csv"):
+        with open(ruta, newline="", encoding="utf-8") as archivo:
+            yield from csv.DictReader(archivo)
+    elif ruta.endswith((".jsonl", ".ndjson")):
+        with open(ruta, encoding="utf-8") as archivo:
+            for linea in archivo:
+                if linea.strip():
+                    yield json.loads(linea)
+    else:
+        with open(ruta, encoding="utf-8") as archivo:
+            yield from json.load(archivo)
+
+
+def escribir_registros(conexion: sqlite3.Connection, registros: Iterable[Dict[str, Any]], tamano_bloque: int = 10000) -> int:
+    """
+    Inserta o reemplaza los registros por NIT en bloques, sin cargar todo el dataset en memoria.
+
+    Returns:
+        El número de registros escritos.
+    """
+    total = 0
+    bloque: List[tuple] = []
+    for registro in registros:
+        nit = str(registro.get("nit") or "").strip()
+        if not nit:
+            continue
+        bloque.append((nit, json.dumps(registro, ensure_ascii=False)))
+        if len(bloque) >= tamano_bloque:
+            conexion.executemany("INSERT OR REPLACE INTO registros (nit, datos) VALUES (?, ?)", bloque)
+            total += len(bloque)
+            bloque = []
+    if bloque:
+        conexion.executemany("INSERT OR REPLACE INTO registros (nit, datos) VALUES (?, ?)", bloque)
+        total += len(bloque)
+    return total
+
+
+def construir_snapshot(ruta: str, registros: Iterable[Dict[str, Any]]) -> int:
+    """
+    Construye el índice en un archivo temporal y lo reemplaza de forma atómica, para que los lectores
+    nunca vean un snapshot a medio escribir.
+
+    Returns:
+        El número de registros escritos.
+    """
+    temporal = f"{ruta}.tmp"
+    if os.path.exists(temporal):
+        os.remove(temporal)
+    conexion = sqlite3.connect(temporal)
+    try:
+        with conexion:
+            for sentencia in _ESQUEMA:
+                conexion.execute(sentencia)
+            total = escribir_registros(conexion, registros)
+            conexion.executemany(
+                "INSERT OR REPLACE INTO metadatos (clave, valor) VALUES (?, ?)",
+                [("construido_en", datetime.now(timezone.utc).isoformat()), ("registros", str(total))]
+            )
+            _guardar_marca(conexion, *_calcular_marca(conexion))
+    finally:
+        conexion.close()
+    os.replace(temporal, ruta)
+    return total
+
+
+@dataclass
+class ResultadoSincronizacion:
+    """
+    Resumen de una sincronización incremental del snapshot.
+    """
+    filas: int
+    paginas: int
+    marca_actualizacion: Optional[str]
+
+
+def _leer_marca(conexion: sqlite3.Connection) -> Tuple[Optional[str], Optional[str]]:
+    metadatos = dict(conexion.execute(
+        "SELECT clave, valor FROM metadatos WHERE clave IN ('marca_actualizacion', 'marca_id')"
+    ).fetchall())
+    return metadatos.get("marca_actualizacion"), metadatos.get("marca_id")
+
+
+def _guardar_marca(conexion: sqlite3.Connection, marca: Optional[str], marca_id: Optional[str]) -> None:
+    if marca is None:
+        return
+    conexion.executemany(
+        "INSERT OR REPLACE INTO metadatos (clave, valor) VALUES (?, ?)",
+        [("marca_actualizacion", marca), ("marca_id", marca_id or ""), ("sincronizado_en", datetime.now(timezone.utc).isoformat())]
+    )
+
+
+def _calcular_marca(conexion: sqlite3.Connection) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Obtiene la marca de agua (:updated_at, :id) más reciente de los registros almacenados.
+
+    Si varios registros comparten NIT solo se conserva uno, así que la marca puede quedar por debajo
+    de la real; eso solo provoca volver a descargar algunas filas, nunca perder cambios.
+    """
+    fila = conexion.execute(
+        "SELECT json_extract(datos, '$.\":updated_at\"') AS actualizado, json_extract(datos, '$.\":id\"') AS id "
+        "FROM registros WHERE actualizado IS NOT NULL ORDER BY actualizado DESC, id DESC LIMIT 1"
+    ).fetchone()
+    return (fila[0], fila[1]) if fila else (None, None)
+
+
+def paginar_cambios(
+    base_url: str = DATOS_GOV_CO_URL,
+    session: Optional[requests.Session] = None,
+    marca: Optional[str] = None,
+    marca_id: Optional[str] = None,
+    tamano_pagina: int = 10000
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Devuelve, página a página, las filas con (:updated_at, :id) posterior a la marca, en orden ascendente.
+    Sin marca recorre el dataset completo.
+    """
+    session = session or crear_sesion_http()
+    while True:
+        params = {"$select": ":*, *", "$order": ":updated_at, :id", "$limit": tamano_pagina}
+        if marca:
+            params["$where"] = f":updated_at > '{marca}' OR (:updated_at = '{marca}' AND :id > '{marca_id or ''}')"
+        response = session.get(base_url, params=params, timeout=60)
+        response.raise_for_status()
+        pagina = response.json()
+        if not pagina:
+            return
+        yield pagina
+        if len(pagina) < tamano_pagina:
+            return
+        marca, marca_id = pagina[-1][":updated_at"], pagina[-1][":id"]
+
+
+def sincronizar_snapshot(
+    ruta: str,
+    base_url: str = DATOS_GOV_CO_URL,
+    session: Optional[requests.Session] = None,
+    tamano_pagina: int = 10000
+) -> ResultadoSincronizacion:
+    """
+    Actualiza el snapshot con las filas modificadas desde la última marca de agua, usando `:updated_at`.
+
+    Cada página se escribe junto con la nueva marca en una sola transacción, de modo que si el proceso
+    se interrumpe la siguiente ejecución continúa desde la última página confirmada. Las filas se procesan
+    página a página, sin cargar el dataset en memoria.
+    """
+    conexion = sqlite3.connect(ruta)
+    try:
+        conexion.execute("PRAGMA journal_mode=WAL")
+        with conexion:
+            for sentencia in _ESQUEMA:
+                conexion.execute(sentencia)
+        marca, marca_id = _leer_marca(conexion)
+
+        filas = 0
+        paginas = 0
+        for pagina in paginar_cambios(base_url, session, marca, marca_id, tamano_pagina):
+            marca, marca_id = pagina[-1].get(":updated_at"), pagina[-1].get(":id")
+            with conexion:
+                filas += escribir_registros(conexion, pagina)
+                _guardar_marca(conexion, marca, marca_id)
+            paginas += 1
+            logging.info(f"Sincronización: página {paginas}, {filas} filas actualizadas hasta {marca}.")
+    finally:
+        conexion.close()
+    return ResultadoSincronizacion(filas=filas, paginas=paginas, marca_actualizacion=marca)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Snapshot local del dataset de RUES en datos.gov.co.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    construir = subparsers.add_parser("construir", help="Construye el snapshot completo.")
+    construir.add_argument("--salida", required=True, help="Ruta del archivo SQLite a generar.")
+    construir.add_argument("--desde-archivo", help="Exportación local (CSV, JSON Lines o JSON) en lugar de la API.")
+    construir.add_argument("--url", default=os.environ.get("DATOS_GOV_CO_URL", DATOS_GOV_CO_URL), help="URL del recurso Socrata.")
+    construir.add_argument("--tamano-pagina", type=int, default=50000)
+
+    sincronizar = subparsers.add_parser("sincronizar", help="Aplica al snapshot los cambios desde la última sincronización.")
+    sincronizar.add_argument("--ruta", required=True, help="Ruta del snapshot SQLite a actualizar.")
+    sincronizar.add_argument("--url", default=os.environ.get("DATOS_GOV_CO_URL", DATOS_GOV_CO_URL), help="URL del recurso Socrata.")
+    sincronizar.add_argument("--tamano-pagina", type=int, default=10000)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.comando == "sincronizar":
+        resultado = sincronizar_snapshot(args.ruta, args.url, tamano_pagina=args.tamano_pagina)
+        logging.info(f"Sincronización terminada: {resultado.filas} filas actualizadas en {resultado.paginas} páginas (marca {resultado.marca_actualizacion}).")
+        return
+
+    if args.desde_archivo:
+        registros = leer_exportacion(args.desde_archivo)
+    else:
+        registros = paginar_datos_gov_co(args.url, tamano_pagina=args.tamano_pagina)
+    total = construir_snapshot(args.salida, registros)
+    logging.info(f"Snapshot escrito en {args.salida} con {total} registros.")
+
+
+if __name__ == "__main__":
+    main()
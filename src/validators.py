@@ -0,0 +1,62 @@
+from typing import Any
+
+from src.exceptions import NitInvalidoError
+
+
+MENSAJE_NIT_REQUERIDO = "El NIT es requerido."
+MENSAJE_FORMATO_NIT_INVALIDO = "Formato de NIT inválido. Debe ser un número entre 8 y 10 dígitos."
+MENSAJE_DV_INVALIDO = "El dígito de verificación no corresponde al NIT."
+
+# Pesos del módulo 11 de la DIAN, aplicados a los dígitos del NIT de derecha a izquierda
+PESOS_DV = (3, 7, 13, 17, 19, 23, 29, 37, 41, 43, 47, 53, 59, 67, 71)
+
+
+def calcular_dv(nit: str) -> str:
+    """
+    Calcula el dígito de verificación de un NIT con el módulo 11 de la DIAN.
+
+    Args:
+        nit: El NIT sin dígito de verificación, solo dígitos.
+
+    Returns:
+        El dígito de verificación (de "0" a "9").
+    """
+    residuo = sum(int(digito) * peso for digito, peso in zip(reversed(nit), PESOS_DV)) % 11
+    return str(residuo if residuo < 2 else 11 - residuo)
+
+
+def normalizar_nit(nit: Any) -> str:
+    """
+    Limpia y valida el formato de un NIT.
+
+    Acepta el NIT con su dígito de verificación después de un guion ("900123456-8") y con puntos de miles
+    ("900.123.456-8"); si trae el dígito, se valida contra el calculado, de modo que un NIT mal digitado se
+    rechace sin consultar las fuentes.
+
+    Args:
+        nit: El NIT recibido en la solicitud (cadena o número).
+
+    Returns:
+        El NIT sin espacios, puntos ni dígito de verificación.
+
+    Raises:
+        NitInvalidoError: Si el NIT está vacío, no es un número entre 8 y 10 dígitos o su dígito de verificación
+            no corresponde.
+    """
+    if nit is None or not str(nit).strip():
+        raise NitInvalidoError(str(nit or ""), MENSAJE_NIT_REQUERIDO)
+
+    nit = str(nit).strip()
+    base, guion, dv = nit.partition("-")
+    base = base.strip().replace(".", "")
+    if not base.isdecimal() or not (8 <= len(base) <= 10):
+        raise NitInvalidoError(nit, MENSAJE_FORMATO_NIT_INVALIDO)
+
+    if guion:
+        dv = dv.strip()
+        if len(dv) != 1 or not dv.isdecimal():
+            raise NitInvalidoError(nit, MENSAJE_FORMATO_NIT_INVALIDO)
+        if dv != calcular_dv(base):
+            raise NitInvalidoError(nit, MENSAJE_DV_INVALIDO)
+
+    return base
@@ -1,7 +1,12 @@
 # tests/conftest.py
 # Los fixtures para la configuración de pruebas compartidas pueden ir aquí.
+import json
 import pytest
 import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
 
 # Asegurarse de que src esté en el path para las importaciones
 import sys
@@ -28,4 +33,52 @@ def setup_env():
     if original_rues_url is not None:
         os.environ["RUES_URL"] = original_rues_url
     else:
-        del os.environ["RUES_URL"]
\ No newline at end of file
+        del os.environ["RUES_URL"]
+
+class _StubUpstreamHandler(BaseHTTPRequestHandler):
+    """Responde con las respuestas registradas en el servidor para cada ruta (incluida la query)."""
+    def do_GET(self):
+        ruta = unquote(self.path)
+        self.server.solicitudes.append(ruta)
+        retardo = self.server.retardos.get(ruta)
+        if retardo:
+            time.sleep(retardo)
+        respuesta = self.server.rutas.get(ruta, (404, {"error": "ruta no registrada"}))
+        if isinstance(respuesta, list):
+            # Secuencia de respuestas: se entregan en orden y la última se repite
+            respuesta = respuesta.pop(0) if len(respuesta) > 1 else respuesta[0]
+        status, payload, cabeceras = respuesta if len(respuesta) == 3 else (*respuesta, {})
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for nombre, valor in cabeceras.items():
+            self.send_header(nombre, valor)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_upstream():
+    """
+    Levanta un servidor HTTP local que simula las APIs de datos.gov.co y RUES.
+
+    Las respuestas se registran en `servidor.rutas[ruta] = (status, json)` o `(status, json, cabeceras)`, o como una
+    lista de ellas que se entregan en orden (la última se repite); la latencia opcional de una ruta
+    en `servidor.retardos[ruta] = segundos`, y las rutas recibidas quedan en `servidor.solicitudes`.
+    La URL base está en `servidor.url`.
+    """
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _StubUpstreamHandler)
+    servidor.daemon_threads = True
+    servidor.rutas = {}
+    servidor.retardos = {}
+    servidor.solicitudes = []
+    servidor.url = f"http://127.0.0.1:{servidor.server_address[1]}"
+    hilo = threading.Thread(target=servidor.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    hilo.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
@@ -0,0 +1,351 @@
+# tests/test_async_services.py
+import asyncio
+import pytest
+
+from src.async_services import (
+    AsyncConsultaNitService,
+    AsyncDatosGovCoService,
+    AsyncRuesService,
+    EjecutorAsync,
+    SesionHttpAsync,
+)
+from src.exceptions import NitNotFoundError, DataSourceError
+from src.models import Empresa
+
+
+NIT = "900123456"
+
+GOV_REGISTRO = {
+    "razon_social": "EMPRESA GOV",
+    "nit": NIT,
+    "digito_verificacion": "1",
+    "camara_comercio": "BOGOTA",
+    "matricula": "12345",
+    "cod_ciiu_act_econ_pri": "G4711",
+    "codigo_camara": "12",
+}
+
+RUES_RESPUESTA = {
+    "codigo_error": "0000",
+    "registros": {
+        "razon_social": "EMPRESA RUES",
+        "tipo_sociedad": "Sociedad Anonima",
+        "cod_ciiu_act_econ_sec": "B0810",
+        "desc_ciiu_act_econ_sec": "Extracción de piedra",
+    },
+}
+
+
+def _servicio(stub_upstream):
+    sesion = SesionHttpAsync(timeout=2)
+    servicio = AsyncConsultaNitService(
+        AsyncDatosGovCoService(base_url=f"{stub_upstream.url}/gov", sesion=sesion),
+        AsyncRuesService(base_url=f"{stub_upstream.url}/rues", sesion=sesion),
+    )
+    return servicio, sesion
+
+
+async def _consultar(stub_upstream, nit):
+    servicio, sesion = _servicio(stub_upstream)
+    try:
+        return await servicio.consultar_nit(nit)
+    finally:
+        await sesion.cerrar()
+
+
+def test_async_consulta_ambas_fuentes(stub_upstream):
+    stub_upstream.rutas[f"/gov?nit={NIT}"] = (200, [GOV_REGISTRO])
+    stub_upstream.rutas["/rues/120000012345"] = (200, RUES_RESPUESTA)
+
+    empresa = asyncio.run(_consultar(stub_upstream, NIT))
+
+    assert isinstance(empresa, Empresa)
+    assert empresa.razon_social == "EMPRESA GOV"
+    assert empresa.tipo_sociedad == "Sociedad Anonima"
+    assert empresa.ciiu2.codigo == "B0810"
+    assert empresa.fuentes == ["datos.gov.co", "rues.org.co"]
+
+
+def test_async_normaliza_el_nit_con_puntos(stub_upstream):
+    stub_upstream.rutas[f"/gov?nit={NIT}"] = (200, [GOV_REGISTRO])
+    stub_upstream.rutas["/rues/120000012345"] = (200, RUES_RESPUESTA)
+
+    empresa = asyncio.run(_consultar(stub_upstream, "900.123.456"))
+
+    assert empresa.nit == NIT
+
+
+def test_async_y_sync_producen_el_mismo_resultado(stub_upstream):
+    from src.services import ConsultaNitService, DatosGovCoService, RuesService
+
+    stub_upstream.rutas[f"/gov?nit={NIT}"] = (200, [GOV_REGISTRO])
+    stub_upstream.rutas["/rues/120000012345"] = (200, RUES_RESPUESTA)
+
+    sync_service = ConsultaNitService(
+        DatosGovCoService(base_url=f"{stub_upstream.url}/gov"),
+        RuesService(base_url=f"{stub_upstream.url}/rues"),
+    )
+    empresa_async = asyncio.run(_consultar(stub_upstream, NIT))
+    assert empresa_async.model_dump_json() == sync_service.consultar_nit(NIT).model_dump_json()
+
+
+def test_async_nit_no_encontrado(stub_upstream):
+    stub_upstream.rutas["/gov?nit=999999999"] = (200, [])
+
+    with pytest.raises(NitNotFoundError):
+        asyncio.run(_consultar(stub_upstream, "999999999"))
+    assert not any(ruta.startswith("/rues") for ruta in stub_upstream.solicitudes)
+
+
+def test_async_error_de_fuente(stub_upstream):
+    stub_upstream.rutas[f"/gov?nit={NIT}"] = (500, {"error": "fallo"})
+
+    with pytest.raises(DataSourceError) as excinfo:
+        asyncio.run(_consultar(stub_upstream, NIT))
+    assert excinfo.value.source_name == "datos.gov.co"
+
+
+def test_async_rues_error_de_negocio(stub_upstream):
+    stub_upstream.rutas[f"/gov?nit={NIT}"] = (200, [GOV_REGISTRO])
+    stub_upstream.rutas["/rues/120000012345"] = (200, {"codigo_error": "1001", "mensaje_error": "No existe"})
+
+    empresa = asyncio.run(_consultar(stub_upstream, NIT))
+    assert empresa.fuentes == ["datos.gov.co"]
+
+
+def test_async_muchas_consultas_concurrentes_comparten_sesion(stub_upstream):
+    nits = [str(900000000 + i) for i in range(20)]
+    for nit in nits:
+        stub_upstream.rutas[f"/gov?nit={nit}"] = (200, [{"nit": nit, "razon_social": f"EMPRESA {nit}"}])
+
+    async def consultar_todos():
+        servicio, sesion = _servicio(stub_upstream)
+        try:
+            return await asyncio.gather(*(servicio.consultar_nit(nit) for nit in nits))
+        finally:
+            await sesion.cerrar()
+
+    empresas = asyncio.run(consultar_todos())
+    assert [empresa.nit for empresa in empresas] == nits
+
+
+def test_ejecutor_async_reutiliza_el_bucle(stub_upstream):
+    stub_upstream.rutas[f"/gov?nit={NIT}"] = (200, [GOV_REGISTRO])
+    stub_upstream.rutas["/rues/120000012345"] = (200, RUES_RESPUESTA)
+
+    servicio, sesion = _servicio(stub_upstream)
+    ejecutor = EjecutorAsync()
+
+    primera = ejecutor.ejecutar(servicio.consultar_nit(NIT))
+    session_inicial = sesion.obtener()
+    segunda = ejecutor.ejecutar(servicio.consultar_nit(NIT))
+
+    assert primera == segunda
+    assert sesion.obtener() is session_inicial
+    ejecutor.ejecutar(sesion.cerrar())
+
+
+def test_async_consultar_nits_no_falla_el_lote(stub_upstream):
+    stub_upstream.rutas[f"/gov?$limit=50000&$where=nit in('{NIT}','999999999')"] = (200, [GOV_REGISTRO])
+    stub_upstream.rutas["/rues/120000012345"] = (200, RUES_RESPUESTA)
+
+    async def consultar_lote():
+        servicio, sesion = _servicio(stub_upstream)
+        try:
+            return await servicio.consultar_nits([NIT, "12-34", "999999999", NIT], max_concurrencia=2)
+        finally:
+            await sesion.cerrar()
+
+    resultados = asyncio.run(consultar_lote())
+
+    assert [r.estado for r in resultados] == [200, 400, 404, 200]
+    assert resultados[0].empresa.razon_social == "EMPRESA GOV"
+    assert resultados[1].error.tipo == "nit_invalido"
+    assert [ruta for ruta in stub_upstream.solicitudes if ruta.startswith("/gov")] == [
+        f"/gov?$limit=50000&$where=nit in('{NIT}','999999999')"
+    ]
+
+
+def test_async_consultar_nits_falla_del_lote_consulta_nit_por_nit(stub_upstream):
+    stub_upstream.rutas[f"/gov?nit={NIT}"] = (200, [GOV_REGISTRO])
+    stub_upstream.rutas["/rues/120000012345"] = (200, RUES_RESPUESTA)
+
+    async def consultar_lote():
+        servicio, sesion = _servicio(stub_upstream)
+        try:
+            return await servicio.consultar_nits([NIT])
+        finally:
+            await sesion.cerrar()
+
+    resultados = asyncio.run(consultar_lote())
+
+    assert [r.estado for r in resultados] == [200]
+    assert f"/gov?nit={NIT}" in stub_upstream.solicitudes
+
+
+def test_async_sirve_obsoleta_y_refresca(stub_upstream):
+    from src.cache import CacheResultados
+
+    reloj = [1000.0]
+    cache = CacheResultados(ttl_encontrado=10, ventana_obsoleta=60, reloj=lambda: reloj[0])
+    cache.guardar(NIT, Empresa(nit=NIT, razon_social="ANTERIOR"))
+    stub_upstream.rutas[f"/gov?nit={NIT}"] = (200, [GOV_REGISTRO])
+    stub_upstream.rutas["/rues/120000012345"] = (200, RUES_RESPUESTA)
+    reloj[0] += 30
+
+    async def consultar():
+        servicio, sesion = _servicio(stub_upstream)
+        servicio.cache = cache
+        try:
+            empresa = await servicio.consultar_nit(NIT)
+            await asyncio.gather(*servicio._refrescos_en_curso.values())
+            return empresa
+        finally:
+            await sesion.cerrar()
+
+    empresa = asyncio.run(consultar())
+
+    assert empresa.razon_social == "ANTERIOR"
+    assert cache.obtener(NIT).empresa.razon_social == "EMPRESA GOV"
+
+
+def test_async_coalesce_consultas_concurrentes(stub_upstream):
+    stub_upstream.rutas[f"/gov?nit={NIT}"] = (200, [GOV_REGISTRO])
+    stub_upstream.rutas["/rues/120000012345"] = (200, RUES_RESPUESTA)
+
+    async def consultar():
+        servicio, sesion = _servicio(stub_upstream)
+        try:
+            return await asyncio.gather(*(servicio.consultar_nit(NIT) for _ in range(10)))
+        finally:
+            await sesion.cerrar()
+
+    empresas = asyncio.run(consultar())
+
+    assert len(empresas) == 10
+    assert stub_upstream.solicitudes.count(f"/gov?nit={NIT}") == 1
+    assert stub_upstream.solicitudes.count("/rues/120000012345") == 1
+
+def test_async_rues_fuera_de_plazo_responde_con_gov(stub_upstream):
+    from src.plazo import Plazo
+
+    stub_upstream.rutas[f"/gov?nit={NIT}"] = (200, [GOV_REGISTRO])
+    stub_upstream.rutas["/rues/120000012345"] = (200, RUES_RESPUESTA)
+    stub_upstream.retardos["/rues/120000012345"] = 0.5
+
+    async def consultar():
+        servicio, sesion = _servicio(stub_upstream)
+        try:
+            return await servicio.consultar_nit(NIT, plazo=Plazo(0.3, minimo_util=0.05))
+        finally:
+            await sesion.cerrar()
+
+    empresa = asyncio.run(consultar())
+
+    assert empresa.razon_social == "EMPRESA GOV"
+    assert empresa.fuentes == ["datos.gov.co"]
+
+def test_async_omite_rues_con_el_circuito_abierto(stub_upstream):
+    from src.async_services import AsyncFuenteConInterruptor
+    from src.circuito import Interruptor
+
+    stub_upstream.rutas[f"/gov?nit={NIT}"] = (200, [GOV_REGISTRO])
+    stub_upstream.rutas["/rues/120000012345"] = (503, {})
+
+    async def consultar():
+        servicio, sesion = _servicio(stub_upstream)
+        servicio.rues_service = AsyncFuenteConInterruptor(servicio.rues_service, "rues.org.co", Interruptor(umbral_fallos=1))
+        try:
+            with pytest.raises(DataSourceError):
+                await servicio.consultar_nit(NIT)
+            return await servicio.consultar_nit(NIT)
+        finally:
+            await sesion.cerrar()
+
+    empresa = asyncio.run(consultar())
+
+    assert empresa.fuentes == ["datos.gov.co"]
+    assert stub_upstream.solicitudes.count("/rues/120000012345") == 1
+
+def test_async_reintenta_errores_transitorios(stub_upstream):
+    from src.reintentos import PoliticaReintentos
+
+    stub_upstream.rutas[f"/gov?nit={NIT}"] = [(503, {}, {"Retry-After": "0"}), (200, [GOV_REGISTRO])]
+    stub_upstream.rutas["/rues/120000012345"] = [(500, {}), (200, RUES_RESPUESTA)]
+    reintentos = PoliticaReintentos(espera_base=0.001)
+
+    async def consultar():
+        servicio, sesion = _servicio(stub_upstream)
+        servicio.datos_gov_co_service.reintentos = reintentos
+        servicio.rues_service.reintentos = reintentos
+        try:
+            return await servicio.consultar_nit(NIT)
+        finally:
+            await sesion.cerrar()
+
+    empresa = asyncio.run(consultar())
+
+    assert empresa.fuentes == ["datos.gov.co", "rues.org.co"]
+    assert stub_upstream.solicitudes.count(f"/gov?nit={NIT}") == 2
+    assert reintentos.estadisticas()["reintentos"] == 2
+    assert reintentos.estadisticas()["rues.org.co:http_500"] == 1
+
+def test_async_consulta_en_paralelo_con_el_codigo_rues_aprendido(stub_upstream):
+    import time
+    from src.indice_rues import IndiceCodigosRues
+
+    stub_upstream.rutas[f"/gov?nit={NIT}"] = (200, [GOV_REGISTRO])
+    stub_upstream.rutas["/rues/120000012345"] = (200, RUES_RESPUESTA)
+    stub_upstream.retardos[f"/gov?nit={NIT}"] = 0.3
+    stub_upstream.retardos["/rues/120000012345"] = 0.3
+
+    async def consultar():
+        servicio, sesion = _servicio(stub_upstream)
+        servicio.indice_rues = IndiceCodigosRues()
+        try:
+            primera = await servicio.consultar_nit(NIT)
+            inicio = time.monotonic()
+            segunda = await servicio.consultar_nit(NIT)
+            return primera, segunda, time.monotonic() - inicio
+        finally:
+            await sesion.cerrar()
+
+    primera, segunda, duracion = asyncio.run(consultar())
+
+    assert segunda == primera
+    assert segunda.fuentes == ["datos.gov.co", "rues.org.co"]
+    assert duracion < 0.55
+
+def test_async_cobertura_cancela_la_consulta_perdedora():
+    from src.async_services import AsyncDataSource, AsyncFuenteConCobertura
+    from src.cobertura import PoliticaCobertura
+
+    canceladas = []
+
+    class FuenteConColaLenta(AsyncDataSource):
+        def __init__(self):
+            self.llamadas = 0
+
+        async def consultar(self, nit, **kwargs):
+            self.llamadas += 1
+            if self.llamadas == 1:
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    canceladas.append(nit)
+                    raise
+                return {"respuesta": "lenta"}
+            return {"respuesta": "cobertura"}
+
+    politica = PoliticaCobertura(retardo_minimo=0, muestras_minimas=1)
+    politica.registrar_latencia(0.05)
+    fuente = AsyncFuenteConCobertura(FuenteConColaLenta(), politica)
+
+    async def consultar():
+        resultado = await asyncio.wait_for(fuente.consultar(NIT), timeout=1)
+        await asyncio.sleep(0)
+        return resultado
+
+    assert asyncio.run(consultar()) == {"respuesta": "cobertura"}
+    assert canceladas == [NIT]
+    assert fuente.estadisticas()["coberturas_ganadoras"] == 1
@@ -0,0 +1,188 @@
+# tests/test_cache.py
+from src.cache import CacheLRU, CacheRespuestas, CacheResultados, CacheSQLite, EntradaCache, RespuestaSerializada, crear_cache_desde_entorno
+from src.models import Empresa, Ciiu
+
+
+class RelojFalso:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def test_cache_acierto_y_fallo():
+    cache = CacheResultados()
+    empresa = Empresa(nit="900123456")
+
+    assert cache.obtener("900123456") is None
+    cache.guardar("900123456", empresa)
+    assert cache.obtener("900123456").empresa is empresa
+
+    estadisticas = cache.estadisticas()
+    assert estadisticas["aciertos"] == 1
+    assert estadisticas["fallos"] == 1
+    assert estadisticas["entradas"] == 1
+
+def test_cache_negativa_usa_su_propio_ttl():
+    reloj = RelojFalso()
+    cache = CacheResultados(ttl_encontrado=100, ttl_no_encontrado=10, reloj=reloj)
+    cache.guardar("999999999", None)
+    cache.guardar("900123456", Empresa(nit="900123456"))
+
+    reloj.ahora += 9
+    entrada = cache.obtener("999999999")
+    assert entrada is not None and entrada.empresa is None
+    assert cache.estadisticas()["aciertos_negativos"] == 1
+
+    reloj.ahora += 2
+    assert cache.obtener("999999999") is None
+    assert cache.obtener("900123456") is not None
+    assert cache.estadisticas()["expiraciones"] == 1
+
+def test_cache_ventana_obsoleta():
+    reloj = RelojFalso()
+    cache = CacheResultados(ttl_encontrado=10, ventana_obsoleta=20, reloj=reloj)
+    cache.guardar("900123456", Empresa(nit="900123456"))
+
+    reloj.ahora += 15
+    entrada = cache.obtener("900123456")
+    assert entrada is not None
+    assert cache.es_obsoleta(entrada)
+    assert cache.estadisticas()["aciertos_obsoletos"] == 1
+
+    reloj.ahora += 20
+    assert cache.obtener("900123456") is None
+
+def test_cache_ultimo_valido_respeta_la_retencion():
+    reloj = RelojFalso()
+    cache = CacheResultados(ttl_encontrado=10, retencion_respaldo=100, reloj=reloj)
+    cache.guardar("900123456", Empresa(nit="900123456"))
+    cache.guardar("999999999", None)
+
+    reloj.ahora += 50
+    assert cache.obtener("900123456") is None
+    assert cache.ultimo_valido("900123456").nit == "900123456"
+    assert cache.ultimo_valido("999999999") is None
+
+    reloj.ahora += 60
+    assert cache.ultimo_valido("900123456") is None
+    assert cache.estadisticas()["respaldos"] == 1
+
+def test_cache_lru_expulsa_la_entrada_menos_usada():
+    cache = CacheLRU(max_entradas=2)
+    cache.guardar("1", EntradaCache(Empresa(nit="1"), 0))
+    cache.guardar("2", EntradaCache(Empresa(nit="2"), 0))
+    cache.obtener("1")
+    cache.guardar("3", EntradaCache(Empresa(nit="3"), 0))
+
+    assert cache.obtener("2") is None
+    assert cache.obtener("1") is not None
+    assert cache.obtener("3") is not None
+    assert cache.estadisticas()["expulsiones"] == 1
+
+def test_cache_invalidar():
+    cache = CacheResultados()
+    cache.guardar("1", Empresa(nit="1"))
+    cache.invalidar("1")
+    assert cache.obtener("1") is None
+
+def test_cache_contiene_solo_la_misma_instancia_en_memoria(tmp_path):
+    empresa = Empresa(nit="1")
+    en_memoria = CacheResultados()
+    en_sqlite = CacheResultados(backend=CacheSQLite(str(tmp_path / "cache.sqlite3")))
+    for cache in (en_memoria, en_sqlite):
+        cache.guardar("1", empresa)
+
+    assert en_memoria.contiene("1", empresa)
+    assert not en_memoria.contiene("1", Empresa(nit="1"))
+    assert not en_memoria.contiene("2", empresa)
+    assert not en_sqlite.contiene("1", en_sqlite.obtener("1").empresa)
+
+def test_cache_sqlite_persiste_entre_instancias(tmp_path):
+    ruta = str(tmp_path / "cache.sqlite3")
+    empresa = Empresa(nit="900123456", razon_social="EMPRESA", ciiu2=Ciiu(codigo="B0810"), fuentes=["datos.gov.co"])
+
+    primera = CacheSQLite(ruta)
+    primera.guardar("900123456", EntradaCache(empresa, 123.0))
+    primera.guardar("999999999", EntradaCache(None, 124.0))
+    primera.cerrar()
+
+    segunda = CacheSQLite(ruta)
+    entrada = segunda.obtener("900123456")
+    assert entrada.guardado_en == 123.0
+    assert entrada.empresa.model_dump_json() == empresa.model_dump_json()
+    assert segunda.obtener("999999999").empresa is None
+    segunda.invalidar("900123456")
+    assert segunda.obtener("900123456") is None
+
+def test_cache_sqlite_limita_las_entradas(tmp_path):
+    cache = CacheSQLite(str(tmp_path / "cache.sqlite3"), max_entradas=2)
+    for i in range(3):
+        cache.guardar(str(i), EntradaCache(None, float(i)))
+
+    assert cache.obtener("0") is None
+    assert cache.estadisticas() == {"expulsiones": 1, "entradas": 2}
+
+def test_crear_cache_desde_entorno(tmp_path):
+    cache = crear_cache_desde_entorno({
+        "CACHE_MAX_ENTRADAS": "5",
+        "CACHE_TTL_SEGUNDOS": "60",
+        "CACHE_TTL_NO_ENCONTRADO_SEGUNDOS": "6",
+        "CACHE_VENTANA_OBSOLETA_SEGUNDOS": "30",
+    })
+    assert isinstance(cache.backend, CacheLRU)
+    assert cache.backend.max_entradas == 5
+    assert cache.ttl_encontrado == 60
+    assert cache.ttl_no_encontrado == 6
+    assert cache.ventana_obsoleta == 30
+    assert crear_cache_desde_entorno({"CACHE_MAX_ENTRADAS": "0"}) is None
+
+    sqlite = crear_cache_desde_entorno({"CACHE_BACKEND": "sqlite", "CACHE_SQLITE_RUTA": str(tmp_path / "c.sqlite3")})
+    assert isinstance(sqlite.backend, CacheSQLite)
+
+
+# --- Caché de respuestas serializadas ---
+def _serializada(empresa, etag='"1"'):
+    return RespuestaSerializada(empresa, empresa.model_dump_json().encode("utf-8"), etag)
+
+def test_cache_respuestas_solo_entrega_el_cuerpo_de_la_misma_empresa():
+    cache = CacheRespuestas()
+    empresa = Empresa(nit="900123456", razon_social="EMPRESA")
+    guardada = _serializada(empresa)
+    cache.guardar("900123456", "json", guardada)
+
+    assert cache.obtener("900123456", "json", empresa) is guardada
+    # Una Empresa igual pero de otra entrada de la caché de resultados (p. ej. refrescada) no reutiliza el cuerpo
+    assert cache.obtener("900123456", "json", Empresa(nit="900123456", razon_social="EMPRESA")) is None
+    assert cache.obtener("900123456", "gzip", empresa) is None
+    assert cache.estadisticas() == {"aciertos": 1, "fallos": 2, "entradas": 1}
+
+def test_cache_respuestas_descarta_las_variantes_de_la_empresa_anterior():
+    cache = CacheRespuestas()
+    anterior, nueva = Empresa(nit="900123456", razon_social="ANTES"), Empresa(nit="900123456", razon_social="DESPUÉS")
+    cache.guardar("900123456", "gzip", _serializada(anterior))
+    cache.guardar("900123456", "json", _serializada(nueva))
+
+    assert cache.obtener("900123456", "gzip", anterior) is None
+    assert cache.obtener("900123456", "json", nueva) is not None
+
+def test_cache_respuestas_expulsa_el_nit_menos_usado_e_invalida():
+    cache = CacheRespuestas(max_entradas=2)
+    empresas = {nit: Empresa(nit=nit) for nit in ("1", "2", "3")}
+    cache.guardar("1", "json", _serializada(empresas["1"]))
+    cache.guardar("2", "json", _serializada(empresas["2"]))
+    cache.obtener("1", "json", empresas["1"])
+    cache.guardar("3", "json", _serializada(empresas["3"]))
+
+    assert cache.obtener("2", "json", empresas["2"]) is None
+    assert cache.obtener("1", "json", empresas["1"]) is not None
+    cache.invalidar("1")
+    assert cache.obtener("1", "json", empresas["1"]) is None
+
+def test_cache_respuestas_solo_sobre_el_backend_en_memoria(tmp_path):
+    from src.configuracion import crear_cache_respuestas
+
+    assert crear_cache_respuestas(None) is None
+    assert crear_cache_respuestas(CacheResultados(backend=CacheSQLite(str(tmp_path / "cache.sqlite3")))) is None
+    assert crear_cache_respuestas(CacheResultados(backend=CacheLRU(max_entradas=7))).max_entradas == 7
@@ -0,0 +1,54 @@
+# tests/test_ciiu.py
+from src.ciiu import _cargar_catalogo, campos_ciiu, describir_ciiu, jerarquia_ciiu, normalizar_codigo_ciiu
+
+
+def test_normalizar_codigo_ciiu():
+    assert normalizar_codigo_ciiu("G4711") == "4711"
+    assert normalizar_codigo_ciiu(" 4711 ") == "4711"
+    assert normalizar_codigo_ciiu("111") == "0111"
+    assert normalizar_codigo_ciiu("") is None
+    assert normalizar_codigo_ciiu("47A1") is None
+
+def test_describir_ciiu_en_todos_los_niveles():
+    assert describir_ciiu("0112") == "Cultivo de arroz"
+    assert describir_ciiu("A0112") == "Cultivo de arroz"
+    assert describir_ciiu("011") == "Cultivos agrícolas transitorios"
+    assert describir_ciiu("01") == "Agricultura, ganadería, caza y actividades de servicios conexas"
+    assert describir_ciiu("A") == "Agricultura, ganadería, caza, silvicultura y pesca"
+    assert describir_ciiu("9999") is None
+
+def test_jerarquia_ciiu():
+    jerarquia = jerarquia_ciiu("G4711")
+
+    assert jerarquia.seccion == "G"
+    assert jerarquia.division == "47"
+    assert jerarquia.grupo == "471"
+    assert jerarquia.clase == "4711"
+    assert jerarquia_ciiu("6201").seccion == "J"
+    assert jerarquia_ciiu("0010").seccion is None
+    assert jerarquia_ciiu("9999") is None
+
+def test_catalogo_es_consistente():
+    descripciones, secciones = _cargar_catalogo()
+    clases = [codigo for codigo in descripciones if len(codigo) == 4 and not codigo.startswith("00")]
+
+    assert len(secciones) == 88
+    for clase in clases:
+        assert clase[:3] in descripciones
+        assert clase[:2] in secciones
+
+def test_campos_ciiu_respeta_la_descripcion_de_la_fuente():
+    campos = campos_ciiu("B0811", "Extracción de piedra")
+    assert campos["descripcion"] == "Extracción de piedra"
+    assert campos["division"] == "08"
+
+    assert campos_ciiu("4711")["descripcion"].startswith("Comercio al por menor")
+    assert "seccion" not in campos_ciiu("9999", "Actividad No Homologada CIIU v4")
+    assert campos_ciiu(None) == {}
+
+def test_campos_ciiu_se_memoizan():
+    assert campos_ciiu("G4711") is campos_ciiu("G4711")
+    assert campos_ciiu("G4711", "Otra descripción") is not campos_ciiu("G4711")
+    assert campos_ciiu(None) == {}
+    # Un valor no hashable no rompe la memoización; la validación del modelo lo rechazará
+    assert campos_ciiu(["G4711"]) == {"codigo": ["G4711"], "descripcion": None}
@@ -0,0 +1,58 @@
+# tests/test_circuito.py
+from src.circuito import ABIERTO, CERRADO, SEMIABIERTO, Interruptor
+
+
+class RelojFalso:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def test_interruptor_se_abre_tras_el_umbral_de_fallos():
+    interruptor = Interruptor(umbral_fallos=3, reloj=RelojFalso())
+
+    for _ in range(2):
+        assert interruptor.permitir()
+        interruptor.registrar_fallo()
+    assert interruptor.estado == CERRADO
+
+    interruptor.registrar_exito()
+    assert interruptor.fallos_consecutivos == 0
+
+    for _ in range(3):
+        interruptor.registrar_fallo()
+    assert interruptor.estado == ABIERTO
+    assert not interruptor.permitir()
+    assert interruptor.estadisticas()["rechazos"] == 1
+    assert interruptor.estadisticas()["aperturas"] == 1
+
+def test_interruptor_semiabierto_limita_las_pruebas():
+    reloj = RelojFalso()
+    interruptor = Interruptor(umbral_fallos=1, tiempo_recuperacion=10, max_pruebas=1, reloj=reloj)
+    interruptor.registrar_fallo()
+
+    reloj.ahora += 10
+    assert interruptor.estado == SEMIABIERTO
+    assert interruptor.permitir()
+    assert not interruptor.permitir()
+
+    interruptor.registrar_exito()
+    assert interruptor.estado == CERRADO
+
+def test_interruptor_semiabierto_se_reabre_si_la_prueba_falla():
+    reloj = RelojFalso()
+    interruptor = Interruptor(umbral_fallos=1, tiempo_recuperacion=10, reloj=reloj)
+    interruptor.registrar_fallo()
+
+    reloj.ahora += 10
+    assert interruptor.permitir()
+    interruptor.registrar_fallo()
+    assert interruptor.estado == ABIERTO
+    assert interruptor.estadisticas()["aperturas"] == 2
+
+    reloj.ahora += 10
+    assert interruptor.permitir()
+    interruptor.liberar()
+    assert interruptor.permitir()
@@ -0,0 +1,56 @@
+# tests/test_cobertura.py
+from src.cobertura import PoliticaCobertura
+
+
+def test_sin_muestras_suficientes_no_se_cubre():
+    politica = PoliticaCobertura(muestras_minimas=3)
+    politica.registrar_latencia(0.2)
+    politica.registrar_latencia(0.3)
+
+    assert politica.iniciar_solicitud() is None
+
+def test_retardo_es_el_percentil_de_las_latencias_recientes():
+    politica = PoliticaCobertura(percentil=90, retardo_minimo=0, muestras_minimas=1, ventana=10, recalcular_cada=10)
+    for milisegundos in range(1, 11):
+        politica.registrar_latencia(milisegundos / 1000)
+
+    assert politica.retardo() == 0.009
+
+    # La ventana solo conserva las latencias más recientes
+    for _ in range(10):
+        politica.registrar_latencia(0.5)
+    assert politica.retardo() == 0.5
+
+def test_retardo_se_recalcula_cada_n_muestras():
+    politica = PoliticaCobertura(retardo_minimo=0, muestras_minimas=1, recalcular_cada=3)
+    politica.registrar_latencia(0.1)
+    assert politica.retardo() == 0.1
+
+    politica.registrar_latencia(0.9)
+    politica.registrar_latencia(0.9)
+    assert politica.retardo() == 0.1
+
+    politica.registrar_latencia(0.9)
+    assert politica.retardo() == 0.9
+
+def test_retardo_minimo():
+    politica = PoliticaCobertura(retardo_minimo=0.05, muestras_minimas=1)
+    politica.registrar_latencia(0.001)
+
+    assert politica.retardo() == 0.05
+
+def test_fraccion_maxima_limita_las_coberturas():
+    politica = PoliticaCobertura(fraccion_maxima=0.25, saldo_maximo=1, muestras_minimas=1)
+    politica.registrar_latencia(0.1)
+
+    permitidas = 0
+    for _ in range(20):
+        politica.iniciar_solicitud()
+        permitidas += politica.permitir_cobertura()
+
+    # La primera con el saldo inicial y luego una cada cuatro solicitudes
+    assert permitidas == 5
+    estadisticas = politica.estadisticas()
+    assert estadisticas["solicitudes"] == 20
+    assert estadisticas["coberturas"] == 5
+    assert estadisticas["coberturas_denegadas"] == 15
@@ -0,0 +1,47 @@
+# tests/test_fusion.py
+import pytest
+
+from src.fusion import DATOS_GOV_CO, PLAN_FUSION, RUES, PlanFusion, ReglaCampo
+
+
+def test_toma_el_primer_valor_no_vacio_por_prioridad():
+    plan = PlanFusion(("a", "b"), (ReglaCampo("nombre", {"a": "nombre_a", "b": "nombre_b"}),))
+
+    assert plan.aplicar(({"nombre_a": "A"}, {"nombre_b": "B"})) == {"nombre": "A"}
+    assert plan.aplicar(({"nombre_a": ""}, {"nombre_b": "B"})) == {"nombre": "B"}
+    assert plan.aplicar(({}, {"nombre_b": "B"})) == {"nombre": "B"}
+
+def test_sin_valores_queda_el_de_la_ultima_fuente():
+    plan = PlanFusion(("a", "b"), (ReglaCampo("nombre", {"a": "nombre", "b": "nombre"}),))
+
+    # Igual que `a or b`: si ambos son vacíos queda el segundo
+    assert plan.aplicar(({"nombre": None}, {"nombre": ""})) == {"nombre": ""}
+    assert plan.aplicar(({}, {})) == {"nombre": None}
+
+def test_valor_por_defecto():
+    plan = PlanFusion(("a", "b"), (ReglaCampo("codigo", {"a": "codigo", "b": "codigo"}, por_defecto="9999"),))
+
+    assert plan.aplicar(({}, {"codigo": ""})) == {"codigo": "9999"}
+    assert plan.aplicar(({}, {"codigo": "A0111"})) == {"codigo": "A0111"}
+
+def test_campo_de_una_sola_fuente_y_campo_sin_fuentes():
+    plan = PlanFusion(("a", "b"), (ReglaCampo("solo_b", {"b": "x"}), ReglaCampo("vacio")))
+
+    assert plan.aplicar(({"x": "de a"}, {"x": "de b"})) == {"solo_b": "de b", "vacio": None}
+
+def test_prioridad_la_define_el_orden_de_las_fuentes():
+    reglas = (ReglaCampo("nombre", {"a": "nombre", "b": "nombre", "c": "nombre"}),)
+    datos = {"a": {}, "b": {"nombre": "B"}, "c": {"nombre": "C"}}
+
+    for fuentes, esperado in ((("a", "b", "c"), "B"), (("c", "a", "b"), "C")):
+        plan = PlanFusion(fuentes, reglas)
+        assert plan.aplicar(tuple(datos[fuente] for fuente in fuentes)) == {"nombre": esperado}
+
+def test_rechaza_reglas_con_fuentes_no_declaradas():
+    with pytest.raises(ValueError, match="otra"):
+        PlanFusion(("a",), (ReglaCampo("nombre", {"a": "nombre", "otra": "nombre"}),))
+
+def test_fuentes_con_datos():
+    assert PLAN_FUSION.fuentes_con_datos(({"nit": "1"}, {})) == [DATOS_GOV_CO]
+    assert PLAN_FUSION.fuentes_con_datos(({}, {"nit": "1"})) == [RUES]
+    assert PLAN_FUSION.fuentes_con_datos(({"nit": "1"}, {"nit": "1"})) == [DATOS_GOV_CO, RUES]
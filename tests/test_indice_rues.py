@@ -0,0 +1,46 @@
+# tests/test_indice_rues.py
+from src.indice_rues import IndiceCodigosRues, crear_indice_rues_desde_entorno
+
+
+def test_indice_guarda_y_obtiene_codigos():
+    indice = IndiceCodigosRues()
+
+    assert indice.obtener("900123456") is None
+    indice.guardar("900123456", "120000012345")
+    assert indice.obtener("900123456") == "120000012345"
+
+    indice.invalidar("900123456")
+    assert indice.obtener("900123456") is None
+    assert indice.estadisticas() == {"aciertos": 1, "fallos": 2, "entradas": 0}
+
+def test_indice_expulsa_el_menos_usado():
+    indice = IndiceCodigosRues(max_entradas=2)
+    indice.guardar("1", "a")
+    indice.guardar("2", "b")
+    indice.obtener("1")
+    indice.guardar("3", "c")
+
+    assert indice.obtener("2") is None
+    assert indice.obtener("1") == "a"
+    assert indice.obtener("3") == "c"
+
+def test_indice_sqlite_persiste_entre_instancias(tmp_path):
+    ruta = str(tmp_path / "indice.sqlite3")
+    indice = IndiceCodigosRues(ruta=ruta)
+    indice.guardar("900123456", "120000012345")
+    indice.guardar("800111222", "040000000001")
+    indice.invalidar("800111222")
+    indice.cerrar()
+
+    recuperado = IndiceCodigosRues(ruta=ruta)
+    assert recuperado.obtener("900123456") == "120000012345"
+    assert recuperado.obtener("800111222") is None
+    recuperado.cerrar()
+
+def test_crear_indice_rues_desde_entorno(tmp_path):
+    assert crear_indice_rues_desde_entorno({"INDICE_RUES_MAX_ENTRADAS": "0"}) is None
+    assert crear_indice_rues_desde_entorno({}).ruta is None
+
+    indice = crear_indice_rues_desde_entorno({"INDICE_RUES_SQLITE_RUTA": str(tmp_path / "indice.sqlite3")})
+    assert indice.ruta == str(tmp_path / "indice.sqlite3")
+    indice.cerrar()
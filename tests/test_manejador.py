@@ -0,0 +1,325 @@
+# tests/test_manejador.py
+import asyncio
+import json
+import re
+
+import pytest
+
+from src.exceptions import DataSourceError, NitNotFoundError
+from src.cache import CacheRespuestas
+from src.configuracion import crear_cache_control
+from src.manejador import CUERPOS_ERROR, ManejadorConsultas, MENSAJE_CUERPO_MALFORMADO, SolicitudHttp, calcular_etag, etag_coincide
+from src.metricas import SumideroEnMemoria
+from src.models import Empresa, ResultadoConsulta
+
+
+class ServicioFalso:
+    """Responde según el NIT: 404 para 111111111, falla de fuente para 222222222 y error inesperado para 333333333."""
+    def __init__(self):
+        self.consultados = []
+
+    def consultar_nit(self, nit, plazo=None):
+        self.consultados.append(nit)
+        if nit == "111111111":
+            raise NitNotFoundError(nit)
+        if nit == "222222222":
+            raise DataSourceError("datos.gov.co", RuntimeError("caída"))
+        if nit == "333333333":
+            raise RuntimeError("inesperado")
+        return Empresa(nit=nit, razon_social="EMPRESA")
+
+    def consultar_nits(self, nits, max_concurrencia=10, plazo=None):
+        return [ResultadoConsulta(nit=str(nit), estado=200, empresa=self.consultar_nit(str(nit))) for nit in nits]
+
+
+class ServicioAsyncFalso(ServicioFalso):
+    async def consultar_nit(self, nit, plazo=None):
+        return super().consultar_nit(nit, plazo)
+
+    async def consultar_nits(self, nits, max_concurrencia=10, plazo=None):
+        return [ResultadoConsulta(nit=str(nit), estado=200, empresa=super(ServicioAsyncFalso, self).consultar_nit(str(nit)))
+                for nit in nits]
+
+
+@pytest.fixture
+def servicio():
+    return ServicioFalso()
+
+@pytest.fixture
+def manejador(servicio):
+    return ManejadorConsultas(servicio=servicio, max_nits=3)
+
+
+def _json(respuesta):
+    return json.loads(respuesta.cuerpo)
+
+
+# --- Consulta individual ---
+def test_nit_desde_la_query_string(manejador, servicio):
+    respuesta = manejador.consultar_nit(SolicitudHttp(parametros={"nit": " 900123456 "}))
+
+    assert respuesta.estado == 200
+    assert respuesta.cabeceras["Content-Type"] == "application/json"
+    assert _json(respuesta)["nit"] == "900123456"
+    assert servicio.consultados == ["900123456"]
+
+@pytest.mark.parametrize("cuerpo", ['{"nit": "900123456"}', b'{"nit": 900123456}'])
+def test_nit_desde_el_cuerpo_json(manejador, cuerpo):
+    respuesta = manejador.consultar_nit(SolicitudHttp(cuerpo=cuerpo))
+
+    assert respuesta.estado == 200
+    assert _json(respuesta)["nit"] == "900123456"
+
+@pytest.mark.parametrize("cuerpo", ["{no es json", "[1, 2]", b"\xff"])
+def test_cuerpo_malformado(manejador, servicio, cuerpo):
+    respuesta = manejador.consultar_nit(SolicitudHttp(cuerpo=cuerpo))
+
+    assert respuesta.estado == 400
+    assert _json(respuesta) == {"error": MENSAJE_CUERPO_MALFORMADO}
+    assert servicio.consultados == []
+
+@pytest.mark.parametrize("solicitud, mensaje", [
+    (SolicitudHttp(), "El NIT es requerido."),
+    (SolicitudHttp(parametros={"nit": "   "}), "El NIT es requerido."),
+    (SolicitudHttp(parametros={"nit": "12AB5678"}), "Formato de NIT inválido. Debe ser un número entre 8 y 10 dígitos."),
+    (SolicitudHttp(cuerpo='{"nit": "123"}'), "Formato de NIT inválido. Debe ser un número entre 8 y 10 dígitos."),
+])
+def test_nit_invalido_responde_400_sin_consultar(manejador, servicio, solicitud, mensaje):
+    respuesta = manejador.consultar_nit(solicitud)
+
+    assert respuesta.estado == 400
+    assert _json(respuesta) == {"error": mensaje}
+    assert servicio.consultados == []
+
+def test_dv_incorrecto_responde_400_sin_consultar(manejador, servicio):
+    respuesta = manejador.consultar_nit(SolicitudHttp(parametros={"nit": "900123456-1"}))
+
+    assert respuesta.estado == 400
+    assert _json(respuesta) == {"error": "El dígito de verificación no corresponde al NIT."}
+    assert servicio.consultados == []
+
+def test_nit_con_dv_correcto_consulta_sin_el_dv(manejador, servicio):
+    respuesta = manejador.consultar_nit(SolicitudHttp(parametros={"nit": "900123456-8"}))
+
+    assert respuesta.estado == 200
+    assert servicio.consultados == ["900123456"]
+
+def test_errores_constantes_usan_el_cuerpo_precodificado(manejador):
+    respuesta = manejador.consultar_nit(SolicitudHttp())
+
+    assert respuesta.cuerpo is CUERPOS_ERROR["El NIT es requerido."]
+
+@pytest.mark.parametrize("nit, estado", [("111111111", 404), ("222222222", 502), ("333333333", 500)])
+def test_excepciones_se_mapean_a_codigos_de_estado(manejador, nit, estado):
+    respuesta = manejador.consultar_nit(SolicitudHttp(parametros={"nit": nit}))
+
+    assert respuesta.estado == estado
+    assert "error" in _json(respuesta)
+
+def test_no_encontrado_incluye_el_nit(manejador):
+    respuesta = manejador.consultar_nit(SolicitudHttp(parametros={"nit": "111111111"}))
+
+    assert _json(respuesta) == {"error": "No se encontró información para el NIT: 111111111"}
+
+
+# --- Consulta por lote ---
+def test_lote(manejador):
+    respuesta = manejador.consultar_nits(SolicitudHttp(cuerpo='{"nits": ["900123456", "800111222"]}'))
+
+    assert respuesta.estado == 200
+    assert [r["nit"] for r in _json(respuesta)["resultados"]] == ["900123456", "800111222"]
+
+@pytest.mark.parametrize("cuerpo, mensaje", [
+    (None, "Debe proporcionar una lista 'nits' con al menos un NIT."),
+    ('{"nits": []}', "Debe proporcionar una lista 'nits' con al menos un NIT."),
+    ('{"nits": "900123456"}', "Debe proporcionar una lista 'nits' con al menos un NIT."),
+    ("{roto", "Cuerpo JSON malformado."),
+    ('{"nits": ["1", "2", "3", "4"]}', "El lote excede el máximo de 3 NITs."),
+])
+def test_lote_invalido(manejador, cuerpo, mensaje):
+    respuesta = manejador.consultar_nits(SolicitudHttp(cuerpo=cuerpo))
+
+    assert respuesta.estado == 400
+    assert _json(respuesta) == {"error": mensaje}
+
+
+# --- Motores ---
+def test_metodos_async_ejecutan_el_motor_sincrono_en_un_hilo(manejador):
+    respuesta = asyncio.run(manejador.consultar_nit_async(SolicitudHttp(parametros={"nit": "900123456"})))
+    lote = asyncio.run(manejador.consultar_nits_async(SolicitudHttp(cuerpo='{"nits": ["900123456"]}')))
+
+    assert respuesta.estado == 200
+    assert lote.estado == 200
+
+def test_motor_asincrono():
+    manejador = ManejadorConsultas(servicio_async=ServicioAsyncFalso())
+
+    respuesta = asyncio.run(manejador.consultar_nit_async(SolicitudHttp(parametros={"nit": "222222222"})))
+
+    assert respuesta.estado == 502
+
+def test_metodos_sincronos_con_solo_motor_asincrono():
+    manejador = ManejadorConsultas(servicio_async=ServicioAsyncFalso())
+
+    assert manejador.consultar_nit(SolicitudHttp(parametros={"nit": "900123456"})).estado == 200
+    assert manejador.consultar_nits(SolicitudHttp(cuerpo='{"nits": ["900123456"]}')).estado == 200
+
+def test_requiere_algun_servicio():
+    with pytest.raises(ValueError):
+        ManejadorConsultas()
+
+
+# --- Server-Timing ---
+def test_server_timing_incluye_serializacion_y_total(servicio):
+    manejador = ManejadorConsultas(servicio=servicio, server_timing=True)
+
+    respuesta = manejador.consultar_nit(SolicitudHttp(parametros={"nit": "900123456"}))
+
+    assert re.fullmatch(r"serializacion;dur=\d+\.\d, total;dur=\d+\.\d", respuesta.cabeceras["Server-Timing"])
+
+def test_server_timing_en_errores_y_en_el_motor_asincrono():
+    manejador = ManejadorConsultas(servicio_async=ServicioAsyncFalso(), server_timing=True)
+
+    respuesta = manejador.consultar_nit(SolicitudHttp(parametros={"nit": "222222222"}))
+
+    assert respuesta.estado == 502
+    assert respuesta.cabeceras["Server-Timing"].startswith("total;dur=")
+
+def test_sin_server_timing_por_defecto(manejador):
+    respuesta = manejador.consultar_nits(SolicitudHttp(cuerpo='{"nits": ["900123456"]}'))
+
+    assert "Server-Timing" not in respuesta.cabeceras
+
+def test_serializacion_registra_el_tamano(servicio):
+    sumidero = SumideroEnMemoria()
+    manejador = ManejadorConsultas(servicio=servicio, metricas=sumidero)
+
+    respuesta = manejador.consultar_nit(SolicitudHttp(parametros={"nit": "900123456"}))
+
+    assert [(m.etapa, m.tamano) for m in sumidero.mediciones()] == [("serializacion", len(respuesta.cuerpo))]
+
+
+# --- ETag y caché de respuestas ---
+class ServicioConCache:
+    """Devuelve la misma instancia de Empresa por NIT hasta que se invalida, como CacheResultados en memoria."""
+    def __init__(self):
+        self.empresas = {}
+
+    def refrescar(self, nit, razon_social):
+        self.empresas[nit] = Empresa(nit=nit, razon_social=razon_social)
+
+    def consultar_nit(self, nit, plazo=None):
+        if nit not in self.empresas:
+            self.refrescar(nit, "EMPRESA")
+        return self.empresas[nit]
+
+    def en_cache(self, empresa):
+        return self.empresas.get(empresa.nit) is empresa
+
+def test_respuesta_lleva_etag_del_contenido(manejador):
+    respuesta = manejador.consultar_nit(SolicitudHttp(parametros={"nit": "900123456"}))
+
+    assert respuesta.cabeceras["ETag"] == calcular_etag(respuesta.cuerpo)
+    assert re.fullmatch(r'"[0-9a-f]{32}"', respuesta.cabeceras["ETag"])
+
+def test_acierto_de_la_cache_de_respuestas_no_serializa():
+    sumidero = SumideroEnMemoria()
+    manejador = ManejadorConsultas(servicio=ServicioConCache(), metricas=sumidero, cache_respuestas=CacheRespuestas())
+
+    primera = manejador.consultar_nit(SolicitudHttp(parametros={"nit": "900123456"}))
+    segunda = manejador.consultar_nit(SolicitudHttp(parametros={"nit": "900123456"}))
+
+    assert segunda.cuerpo is primera.cuerpo
+    assert segunda.cabeceras == primera.cabeceras
+    assert len(sumidero.mediciones("serializacion")) == 1
+
+def test_no_guarda_el_cuerpo_de_empresas_fuera_de_la_cache():
+    class ServicioSinCache(ServicioConCache):
+        # Como un resultado incompleto o una Empresa leída del backend SQLite: no es la instancia en caché
+        def en_cache(self, empresa):
+            return False
+
+    cache_respuestas = CacheRespuestas()
+    manejador = ManejadorConsultas(servicio=ServicioSinCache(), cache_respuestas=cache_respuestas)
+
+    manejador.consultar_nit(SolicitudHttp(parametros={"nit": "900123456"}))
+
+    assert cache_respuestas.estadisticas()["entradas"] == 0
+
+def test_cache_de_respuestas_se_invalida_con_los_datos():
+    servicio = ServicioConCache()
+    manejador = ManejadorConsultas(servicio=servicio, cache_respuestas=CacheRespuestas())
+    primera = manejador.consultar_nit(SolicitudHttp(parametros={"nit": "900123456"}))
+
+    servicio.refrescar("900123456", "EMPRESA RENOVADA")
+    segunda = manejador.consultar_nit(SolicitudHttp(parametros={"nit": "900123456"}))
+
+    assert _json(segunda)["razon_social"] != _json(primera)["razon_social"]
+    assert segunda.cabeceras["ETag"] != primera.cabeceras["ETag"]
+
+
+# --- GET condicional ---
+@pytest.mark.parametrize("if_none_match, coincide", [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"xyz", "abc"', True),
+    ("*", True),
+    ('"xyz"', False),
+    ('abc', False),
+])
+def test_etag_coincide(if_none_match, coincide):
+    assert etag_coincide(if_none_match, '"abc"') is coincide
+
+def _get_condicional(manejador, etag, metodo="GET"):
+    return manejador.consultar_nit(SolicitudHttp(parametros={"nit": "900123456"}, cabeceras={"if-none-match": etag}, metodo=metodo))
+
+def test_if_none_match_vigente_responde_304_sin_cuerpo():
+    manejador = ManejadorConsultas(servicio=ServicioConCache(), cache_control="private, max-age=300")
+    etag = manejador.consultar_nit(SolicitudHttp(parametros={"nit": "900123456"})).cabeceras["ETag"]
+
+    respuesta = _get_condicional(manejador, etag)
+
+    assert respuesta.estado == 304
+    assert respuesta.cuerpo == b""
+    assert respuesta.cabeceras == {"ETag": etag, "Cache-Control": "private, max-age=300"}
+
+def test_if_none_match_de_datos_anteriores_responde_200():
+    servicio = ServicioConCache()
+    manejador = ManejadorConsultas(servicio=servicio)
+    etag = manejador.consultar_nit(SolicitudHttp(parametros={"nit": "900123456"})).cabeceras["ETag"]
+    servicio.refrescar("900123456", "EMPRESA RENOVADA")
+
+    respuesta = _get_condicional(manejador, etag)
+
+    assert respuesta.estado == 200
+    assert _json(respuesta)["razon_social"] == "EMPRESA RENOVADA"
+
+def test_post_ignora_if_none_match():
+    manejador = ManejadorConsultas(servicio=ServicioConCache())
+    etag = manejador.consultar_nit(SolicitudHttp(parametros={"nit": "900123456"})).cabeceras["ETag"]
+
+    assert _get_condicional(manejador, etag, metodo="POST").estado == 200
+
+def test_304_en_el_motor_asincrono():
+    manejador = ManejadorConsultas(servicio_async=ServicioAsyncFalso())
+    etag = manejador.consultar_nit(SolicitudHttp(parametros={"nit": "900123456"})).cabeceras["ETag"]
+
+    respuesta = asyncio.run(manejador.consultar_nit_async(
+        SolicitudHttp(parametros={"nit": "900123456"}, cabeceras={"if-none-match": etag})))
+
+    assert respuesta.estado == 304
+
+def test_cache_control_solo_en_respuestas_de_empresa():
+    manejador = ManejadorConsultas(servicio=ServicioFalso(), cache_control="no-cache")
+
+    assert manejador.consultar_nit(SolicitudHttp(parametros={"nit": "900123456"})).cabeceras["Cache-Control"] == "no-cache"
+    assert "Cache-Control" not in manejador.consultar_nit(SolicitudHttp(parametros={"nit": "111111111"})).cabeceras
+
+@pytest.mark.parametrize("entorno, valor", [
+    ({}, "private, max-age=300"),
+    ({"HTTP_CACHE_MAX_AGE_SEGUNDOS": "60"}, "private, max-age=60"),
+    ({"HTTP_CACHE_MAX_AGE_SEGUNDOS": "60", "HTTP_CACHE_PUBLICO": "1"}, "public, max-age=60"),
+    ({"HTTP_CACHE_MAX_AGE_SEGUNDOS": "0", "HTTP_CACHE_PUBLICO": "1"}, "no-cache"),
+])
+def test_crear_cache_control(entorno, valor):
+    assert crear_cache_control(entorno) == valor
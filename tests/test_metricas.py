@@ -0,0 +1,246 @@
+# tests/test_metricas.py
+import asyncio
+import logging
+import re
+import sys
+
+import pytest
+
+from src.async_services import AsyncConsultaNitService, AsyncDataSource, AsyncFuenteMedida
+from src.configuracion import crear_consulta_nit_service, crear_sumidero_metricas
+from src.exceptions import DataSourceError
+from src.metricas import (
+    Medicion,
+    SumideroEnMemoria,
+    ObservadorReintentos,
+    SumideroNulo,
+    SumideroOpenTelemetry,
+    TrazaSolicitud,
+    registrar_medicion,
+    trazar_solicitud,
+)
+from src.reintentos import Intento
+from src.services import ConsultaNitService, DataSource, FuenteMedida
+
+
+NIT = "900123456"
+GOV = {"nit": NIT, "razon_social": "EMPRESA GOV", "codigo_camara": "04", "matricula": "12345"}
+RUES = {"razon_social": "EMPRESA RUES", "tipo_sociedad": "SOCIEDAD COMERCIAL"}
+
+
+class FuenteFija(DataSource):
+    def __init__(self, datos=None, error=None):
+        self.datos = datos
+        self.error = error
+
+    def consultar(self, nit, **kwargs):
+        if self.error is not None:
+            raise self.error
+        return self.datos
+
+
+class AsyncFuenteFija(AsyncDataSource):
+    def __init__(self, datos=None, error=None):
+        self.datos = datos
+        self.error = error
+
+    async def consultar(self, nit, **kwargs):
+        if self.error is not None:
+            raise self.error
+        return self.datos
+
+
+def _etapas(sumidero):
+    return [(m.etapa, m.estado) for m in sumidero.mediciones()]
+
+
+# --- Sumideros ---
+def test_sumidero_en_memoria_resume_por_etapa():
+    sumidero = SumideroEnMemoria()
+    sumidero.registrar(Medicion("rues", 0.010))
+    sumidero.registrar(Medicion("rues", 0.030, "error"))
+    sumidero.registrar(Medicion("fusion", 0.001))
+
+    resumen = sumidero.resumen()
+
+    assert resumen["rues"]["conteo"] == 2
+    assert resumen["rues"]["errores"] == 1
+    assert resumen["rues"]["duracion_media_ms"] == pytest.approx(20.0)
+    assert resumen["rues"]["duracion_maxima_ms"] == pytest.approx(30.0)
+    assert sumidero.mediciones("fusion") == [Medicion("fusion", 0.001)]
+
+def test_sumidero_en_memoria_conserva_las_ultimas_mediciones():
+    sumidero = SumideroEnMemoria(max_mediciones=2)
+    for etapa in ("a", "b", "c"):
+        sumidero.registrar(Medicion(etapa, 0.0))
+
+    assert [m.etapa for m in sumidero.mediciones()] == ["b", "c"]
+
+class HistogramaFalso:
+    def __init__(self, nombre, unit, description):
+        self.nombre = nombre
+        self.unidad = unit
+        self.registros = []
+
+    def record(self, valor, attributes=None):
+        self.registros.append((valor, attributes))
+
+class MedidorFalso:
+    def __init__(self):
+        self.histogramas = {}
+
+    def create_histogram(self, nombre, unit="", description=""):
+        self.histogramas[nombre] = HistogramaFalso(nombre, unit, description)
+        return self.histogramas[nombre]
+
+def test_sumidero_opentelemetry_registra_en_histogramas():
+    medidor = MedidorFalso()
+    sumidero = SumideroOpenTelemetry(medidor)
+
+    sumidero.registrar(Medicion("serializacion", 0.002, tamano=512))
+    sumidero.registrar(Medicion("rues", 0.040, "error"))
+
+    duracion = medidor.histogramas["consulta_nit.etapa.duracion"]
+    tamano = medidor.histogramas["consulta_nit.etapa.tamano"]
+    assert duracion.unidad == "ms"
+    assert [(pytest.approx(v), a) for v, a in duracion.registros] == [
+        (2.0, {"etapa": "serializacion", "estado": "ok"}),
+        (40.0, {"etapa": "rues", "estado": "error"}),
+    ]
+    assert tamano.registros == [(512, {"etapa": "serializacion", "estado": "ok"})]
+
+@pytest.mark.parametrize("valor, tipo", [(None, SumideroNulo), ("nulo", SumideroNulo), ("memoria", SumideroEnMemoria)])
+def test_crear_sumidero_desde_entorno(valor, tipo):
+    entorno = {} if valor is None else {"METRICAS_SUMIDERO": valor}
+    assert isinstance(crear_sumidero_metricas(entorno), tipo)
+
+def test_crear_sumidero_otel_sin_opentelemetry_usa_el_nulo(monkeypatch, caplog):
+    monkeypatch.setitem(sys.modules, "opentelemetry", None)
+
+    with caplog.at_level(logging.WARNING):
+        sumidero = crear_sumidero_metricas({"METRICAS_SUMIDERO": "otel"})
+
+    assert isinstance(sumidero, SumideroNulo)
+    assert "opentelemetry-api" in caplog.text
+
+def test_crear_sumidero_desconocido():
+    with pytest.raises(ValueError):
+        crear_sumidero_metricas({"METRICAS_SUMIDERO": "statsd"})
+
+
+def test_observador_de_reintentos_registra_el_desenlace_de_cada_intento():
+    sumidero = SumideroEnMemoria()
+    observador = ObservadorReintentos(sumidero)
+
+    observador(Intento("rues.org.co", 1, "http_503", 0.01, espera=0.1))
+    observador(Intento("rues.org.co", 2, "http_503", 0.01, desistimiento="presupuesto_agotado"))
+    observador(Intento("rues.org.co", 1, "ok", 0.01))
+
+    assert _etapas(sumidero) == [("intento.rues.org.co", "reintento"), ("intento.rues.org.co", "presupuesto_agotado"),
+                                 ("intento.rues.org.co", "ok")]
+
+
+# --- Traza y Server-Timing ---
+def test_registrar_sin_traza_ni_sumidero_activo_no_mide():
+    class SumideroInactivo(SumideroEnMemoria):
+        activo = False
+
+    sumidero = SumideroInactivo()
+    registrar_medicion(sumidero, "fusion", 0.0)
+
+    assert sumidero.mediciones() == []
+
+def test_traza_agrega_las_mediciones_del_bloque():
+    with trazar_solicitud() as traza:
+        registrar_medicion(None, "fusion", 0.0)
+    registrar_medicion(None, "fusion", 0.0)
+
+    assert [m.etapa for m in traza.mediciones] == ["fusion"]
+
+def test_server_timing_suma_etapas_repetidas_y_marca_errores():
+    traza = TrazaSolicitud()
+    traza.agregar(Medicion("datos_gov_co", 0.0125))
+    traza.agregar(Medicion("rues", 0.010, "error"))
+    traza.agregar(Medicion("rues", 0.020))
+
+    cabecera = traza.server_timing()
+
+    assert re.fullmatch(r'datos_gov_co;dur=12\.5, rues;dur=30\.0;desc="error", total;dur=\d+\.\d', cabecera)
+
+
+# --- Fuentes medidas ---
+@pytest.mark.parametrize("fuente, estado", [
+    (FuenteFija(GOV), "ok"),
+    (FuenteFija(None), "vacio"),
+    (FuenteFija(error=DataSourceError("rues.org.co", RuntimeError("caída"))), "error"),
+])
+def test_fuente_medida_registra_el_estado(fuente, estado):
+    sumidero = SumideroEnMemoria()
+    medida = FuenteMedida(fuente, "rues", sumidero)
+
+    try:
+        medida.consultar(NIT)
+    except DataSourceError:
+        pass
+
+    assert _etapas(sumidero) == [("rues", estado)]
+
+def test_fuente_medida_registra_los_registros_devueltos():
+    class FuenteLote(FuenteFija):
+        def consultar_lote(self, nits, plazo=None):
+            return {nit: GOV if nit == NIT else None for nit in nits}
+
+    sumidero = SumideroEnMemoria()
+    medida = FuenteMedida(FuenteLote(GOV), "datos_gov_co", sumidero)
+
+    medida.consultar(NIT)
+    medida.consultar_lote([NIT, "800111222"])
+
+    assert [m.tamano for m in sumidero.mediciones()] == [1, 1]
+
+def test_async_fuente_medida_registra_los_registros_devueltos():
+    sumidero = SumideroEnMemoria()
+
+    asyncio.run(AsyncFuenteMedida(AsyncFuenteFija(None), "rues", sumidero).consultar(NIT))
+
+    assert [(m.estado, m.tamano) for m in sumidero.mediciones()] == [("vacio", 0)]
+
+def test_servicio_mide_fuentes_y_fusion():
+    sumidero = SumideroEnMemoria()
+    servicio = ConsultaNitService(FuenteMedida(FuenteFija(GOV), "datos_gov_co", sumidero),
+                                  FuenteMedida(FuenteFija(RUES), "rues", sumidero), metricas=sumidero)
+
+    servicio.consultar_nit(NIT)
+
+    assert _etapas(sumidero) == [("datos_gov_co", "ok"), ("rues", "ok"), ("fusion", "ok")]
+
+def test_lote_propaga_la_traza_a_los_hilos():
+    servicio = ConsultaNitService(FuenteMedida(FuenteFija(GOV), "datos_gov_co"), FuenteMedida(FuenteFija(RUES), "rues"))
+
+    with trazar_solicitud() as traza:
+        servicio.consultar_nits(["900123456", "800111222"], max_concurrencia=2)
+
+    # Una consulta por lote a datos.gov.co y, por cada NIT, RUES y la fusión
+    assert sorted(m.etapa for m in traza.mediciones) == ["datos_gov_co", "fusion", "fusion", "rues", "rues"]
+
+def test_async_mide_fuentes_y_fusion():
+    sumidero = SumideroEnMemoria()
+    servicio = AsyncConsultaNitService(AsyncFuenteMedida(AsyncFuenteFija(GOV), "datos_gov_co", sumidero),
+                                       AsyncFuenteMedida(AsyncFuenteFija(error=DataSourceError("rues.org.co", RuntimeError("caída"))), "rues", sumidero),
+                                       metricas=sumidero)
+
+    with pytest.raises(DataSourceError):
+        asyncio.run(servicio.consultar_nit(NIT))
+
+    assert _etapas(sumidero) == [("datos_gov_co", "ok"), ("rues", "error")]
+
+@pytest.mark.parametrize("entorno, medidas", [
+    ({}, True),
+    ({"METRICAS_SERVER_TIMING": "0"}, False),
+    ({"METRICAS_SERVER_TIMING": "0", "METRICAS_SUMIDERO": "memoria"}, True),
+])
+def test_configuracion_envuelve_las_fuentes_si_hay_que_medir(entorno, medidas):
+    servicio = crear_consulta_nit_service(entorno, metricas=crear_sumidero_metricas(entorno))
+
+    assert isinstance(servicio.datos_gov_co_service, FuenteMedida) is medidas
+    assert isinstance(servicio.rues_service, FuenteMedida) is medidas
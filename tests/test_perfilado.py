@@ -0,0 +1,137 @@
+# tests/test_perfilado.py
+import asyncio
+import cProfile
+import json
+import logging
+import pstats
+
+import pytest
+
+from src.configuracion import crear_perfilador
+from src.manejador import ManejadorConsultas, SolicitudHttp
+from src.models import Empresa
+from src.perfilado import Perfilador, firmar_token, resumir_perfil, token_valido
+from src.services import ConsultaNitService, DataSource
+
+
+SECRETO = "secreto-de-prueba"
+
+
+class ServicioFalso:
+    def consultar_nit(self, nit, plazo=None):
+        return Empresa(nit=nit, razon_social="EMPRESA")
+
+
+class FuenteFija(DataSource):
+    def consultar(self, nit, **kwargs):
+        return {"nit": nit, "razon_social": "EMPRESA"}
+
+
+def _funciones_perfiladas(directorio):
+    (ruta,) = directorio.iterdir()
+    return {funcion for _, _, funcion in pstats.Stats(str(ruta)).stats}
+
+
+# --- Tokens firmados ---
+def test_token_firmado_es_valido_hasta_que_vence():
+    token = firmar_token(SECRETO, vigencia_segundos=60, ahora=1000)
+
+    assert token_valido(token, SECRETO, ahora=1030)
+    assert not token_valido(token, SECRETO, ahora=1061)
+
+@pytest.mark.parametrize("token", ["", "sin-punto", "abc.def", f"9999999999.{'0' * 64}"])
+def test_token_mal_formado_o_mal_firmado(token):
+    assert not token_valido(token, SECRETO)
+
+def test_token_de_otro_secreto():
+    assert not token_valido(firmar_token("otro"), SECRETO)
+
+
+# --- Selección de solicitudes ---
+def test_tasa_de_muestreo():
+    assert Perfilador(tasa_muestreo=1).debe_perfilar({})
+    assert not Perfilador(tasa_muestreo=0).debe_perfilar({})
+
+def test_cabecera_firmada():
+    perfilador = Perfilador(secreto=SECRETO)
+
+    assert perfilador.debe_perfilar({"x-perfilar": firmar_token(SECRETO)})
+    assert not perfilador.debe_perfilar({"x-perfilar": firmar_token("otro")})
+    assert not perfilador.debe_perfilar({})
+
+def test_cabecera_ignorada_sin_secreto():
+    assert not Perfilador().debe_perfilar({"x-perfilar": firmar_token(SECRETO)})
+
+def test_un_perfil_a_la_vez(tmp_path):
+    perfilador = Perfilador(tasa_muestreo=1, directorio=str(tmp_path))
+
+    with perfilador.perfilar({}, "externa"):
+        with perfilador.perfilar({}, "interna"):
+            pass
+
+    assert [ruta.name.split("-")[0] for ruta in tmp_path.iterdir()] == ["externa"]
+
+
+# --- Entrega ---
+def test_perfil_en_archivo(tmp_path):
+    perfilador = Perfilador(tasa_muestreo=1, directorio=str(tmp_path))
+
+    with perfilador.perfilar({}, "consulta_nit"):
+        sorted(range(1000))
+
+    (ruta,) = tmp_path.iterdir()
+    assert ruta.suffix == ".prof"
+    assert any(funcion == "<built-in method builtins.sorted>" for _, _, funcion in pstats.Stats(str(ruta)).stats)
+
+def test_perfil_en_el_log(caplog):
+    perfilador = Perfilador(tasa_muestreo=1, max_funciones=3)
+
+    with caplog.at_level(logging.INFO):
+        with perfilador.perfilar({}, "consulta_nit"):
+            sorted(range(1000))
+
+    (registro,) = [r for r in caplog.records if r.getMessage().startswith("Perfil de consulta_nit")]
+    lineas = registro.getMessage().splitlines()
+    assert lineas[1].startswith("acum_ms")
+    assert len(lineas) <= 2 + 3
+
+def test_resumen_ordenado_por_tiempo_acumulado():
+    perfil = cProfile.Profile()
+    perfil.enable()
+    sorted(range(1000))
+    perfil.disable()
+
+    lineas = resumir_perfil(perfil).splitlines()[1:]
+    acumulados = [float(linea.split()[0]) for linea in lineas]
+    assert acumulados == sorted(acumulados, reverse=True)
+
+
+# --- Integración ---
+def test_manejador_perfila_la_solicitud_firmada(tmp_path):
+    manejador = ManejadorConsultas(servicio=ServicioFalso(), perfilador=Perfilador(secreto=SECRETO, directorio=str(tmp_path)))
+
+    manejador.consultar_nit(SolicitudHttp(parametros={"nit": "900123456"}))
+    manejador.consultar_nit(SolicitudHttp(parametros={"nit": "900123456"}, cabeceras={"x-perfilar": firmar_token(SECRETO)}))
+
+    assert len(list(tmp_path.iterdir())) == 1
+
+@pytest.mark.parametrize("entorno, habilitado", [
+    ({}, False),
+    ({"PERFILADO_TASA": "0.01"}, True),
+    ({"PERFILADO_SECRETO": SECRETO}, True),
+])
+def test_crear_perfilador_desde_entorno(entorno, habilitado):
+    assert (crear_perfilador(entorno) is not None) is habilitado
+
+@pytest.mark.parametrize("consulta, solicitud", [
+    ("consultar_nit_async", SolicitudHttp(parametros={"nit": "900123456"})),
+    ("consultar_nits_async", SolicitudHttp(cuerpo=json.dumps({"nits": ["900123456", "800111222"]}), metodo="POST")),
+])
+def test_perfil_incluye_el_motor_sincrono_ejecutado_en_otros_hilos(tmp_path, consulta, solicitud):
+    # El motor síncrono corre bajo asyncio.to_thread y los NITs de un lote en hilos propios
+    manejador = ManejadorConsultas(servicio=ConsultaNitService(FuenteFija(), FuenteFija()),
+                                   perfilador=Perfilador(tasa_muestreo=1, directorio=str(tmp_path)))
+
+    asyncio.run(getattr(manejador, consulta)(solicitud))
+
+    assert "_unificar_datos" in _funciones_perfiladas(tmp_path)
@@ -0,0 +1,42 @@
+# tests/test_plazo.py
+from src.configuracion import crear_plazo
+from src.plazo import Plazo, timeout_para
+
+
+class RelojFalso:
+    def __init__(self):
+        self.ahora = 100.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def test_plazo_restante_y_agotado():
+    reloj = RelojFalso()
+    plazo = Plazo(2.0, minimo_util=0.5, reloj=reloj)
+
+    assert plazo.restante() == 2.0
+    assert plazo.timeout(10) == 2.0
+    assert plazo.timeout(1) == 1
+
+    reloj.ahora += 1.6
+    assert plazo.agotado()
+    reloj.ahora += 5
+    assert plazo.restante() == 0.0
+
+def test_plazo_desde_milisegundos_reserva_el_margen():
+    reloj = RelojFalso()
+    assert Plazo.desde_milisegundos(3000, margen_milisegundos=500, reloj=reloj).restante() == 2.5
+    assert Plazo.desde_milisegundos(100, margen_milisegundos=500, reloj=reloj).restante() == 0.0
+
+def test_timeout_para():
+    reloj = RelojFalso()
+    assert timeout_para(None, 10) == 10
+    assert timeout_para(Plazo(3, reloj=reloj), 10) == 3
+    assert timeout_para(Plazo(0.01, reloj=reloj), 10) is None
+
+def test_crear_plazo_usa_el_menor_limite():
+    entorno = {"PLAZO_MAXIMO_MS": "5000", "PLAZO_MARGEN_MS": "1000"}
+
+    assert 3.9 < crear_plazo(entorno=entorno).restante() <= 4.0
+    assert 1.9 < crear_plazo(3000, entorno=entorno).restante() <= 2.0
@@ -0,0 +1,185 @@
+# tests/test_reintentos.py
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from src.plazo import Plazo
+from src.reintentos import PoliticaReintentos, PresupuestoReintentos, segundos_retry_after
+
+
+class ErrorTransitorio(Exception):
+    pass
+
+
+def clasificar(error):
+    if isinstance(error, ErrorTransitorio):
+        return "transitorio", getattr(error, "retry_after", None)
+    return None
+
+
+class Intentos:
+    """Falla con ErrorTransitorio las primeras `fallas` veces y luego devuelve "ok"."""
+    def __init__(self, fallas, error=ErrorTransitorio):
+        self.fallas = fallas
+        self.error = error
+        self.llamadas = 0
+
+    def __call__(self):
+        self.llamadas += 1
+        if self.llamadas <= self.fallas:
+            raise self.error()
+        return "ok"
+
+
+def _politica(**kwargs):
+    esperas = []
+    kwargs.setdefault("aleatorio", lambda minimo, maximo: maximo)
+    politica = PoliticaReintentos(dormir=esperas.append, **kwargs)
+    return politica, esperas
+
+
+def test_reintenta_con_backoff_exponencial_acotado():
+    politica, esperas = _politica(max_intentos=5, espera_base=0.1, espera_maxima=0.3)
+    intento = Intentos(fallas=4)
+
+    assert politica.ejecutar("fuente", intento, clasificar) == "ok"
+
+    assert intento.llamadas == 5
+    assert esperas == pytest.approx([0.1, 0.2, 0.3, 0.3])
+    estadisticas = politica.estadisticas()
+    assert estadisticas["intentos"] == 5
+    assert estadisticas["reintentos"] == 4
+    assert estadisticas["fuente:transitorio"] == 4
+    assert estadisticas["fuente:ok"] == 1
+
+def test_jitter_completo_usa_un_valor_aleatorio_hasta_el_backoff():
+    rangos = []
+    politica, esperas = _politica(espera_base=0.1, aleatorio=lambda minimo, maximo: rangos.append((minimo, maximo)) or 0.05)
+
+    politica.ejecutar("fuente", Intentos(fallas=2), clasificar)
+
+    assert rangos == [(0, 0.1), (0, 0.2)]
+    assert esperas == [0.05, 0.05]
+
+def test_no_reintenta_errores_no_reintentables():
+    politica, esperas = _politica()
+    intento = Intentos(fallas=1, error=ValueError)
+
+    with pytest.raises(ValueError):
+        politica.ejecutar("fuente", intento, clasificar)
+
+    assert intento.llamadas == 1
+    assert esperas == []
+    assert politica.estadisticas()["fuente:no_reintentable"] == 1
+
+def test_relanza_el_ultimo_error_al_agotar_los_intentos():
+    politica, _ = _politica(max_intentos=3)
+    intento = Intentos(fallas=10)
+
+    with pytest.raises(ErrorTransitorio):
+        politica.ejecutar("fuente", intento, clasificar)
+
+    assert intento.llamadas == 3
+
+def test_respeta_retry_after():
+    politica, esperas = _politica(espera_maxima=5)
+
+    def intento():
+        if not esperas:
+            error = ErrorTransitorio()
+            error.retry_after = "2"
+            raise error
+        return "ok"
+
+    politica.ejecutar("fuente", intento, clasificar)
+
+    assert esperas == [2.0]
+
+def test_no_reintenta_si_retry_after_supera_la_espera_maxima():
+    politica, esperas = _politica(espera_maxima=2)
+    llamadas = []
+
+    def intento():
+        llamadas.append(1)
+        error = ErrorTransitorio()
+        error.retry_after = "120"
+        raise error
+
+    async def intento_async():
+        intento()
+
+    with pytest.raises(ErrorTransitorio):
+        politica.ejecutar("fuente", intento, clasificar)
+    with pytest.raises(ErrorTransitorio):
+        asyncio.run(politica.ejecutar_async("fuente", intento_async, clasificar))
+
+    assert len(llamadas) == 2
+    assert esperas == []
+    assert politica.estadisticas()["reintentos_retry_after_excedido"] == 2
+
+def test_retry_after_en_segundos_y_como_fecha_http():
+    ahora = datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+    assert segundos_retry_after("3") == 3.0
+    assert segundos_retry_after("Thu, 01 Jan 2026 12:00:05 GMT", ahora=ahora) == 5.0
+    assert segundos_retry_after("Thu, 01 Jan 2026 11:00:00 GMT", ahora=ahora) == 0.0
+    assert segundos_retry_after("mañana") is None
+    assert segundos_retry_after(None) is None
+
+def test_no_reintenta_si_la_espera_no_cabe_en_el_plazo():
+    politica, esperas = _politica(espera_base=1.0)
+    intento = Intentos(fallas=1)
+
+    with pytest.raises(ErrorTransitorio):
+        politica.ejecutar("fuente", intento, clasificar, plazo=Plazo(0.5))
+
+    assert intento.llamadas == 1
+    assert esperas == []
+    assert politica.estadisticas()["reintentos_sin_plazo"] == 1
+
+def test_presupuesto_agotado_impide_reintentar():
+    presupuesto = PresupuestoReintentos(proporcion=0.5, saldo_maximo=1)
+    politica, _ = _politica(max_intentos=3, presupuesto=presupuesto)
+
+    # La primera consulta gasta el único reintento disponible
+    assert politica.ejecutar("fuente", Intentos(fallas=1), clasificar) == "ok"
+
+    intento = Intentos(fallas=1)
+    with pytest.raises(ErrorTransitorio):
+        politica.ejecutar("fuente", intento, clasificar)
+    assert intento.llamadas == 1
+    assert politica.estadisticas()["reintentos_denegados"] == 1
+
+    # Cada consulta aporta una fracción de reintento al presupuesto
+    assert politica.ejecutar("fuente", Intentos(fallas=1), clasificar) == "ok"
+    assert presupuesto.saldo == 0
+
+def test_presupuesto_no_supera_el_saldo_maximo():
+    presupuesto = PresupuestoReintentos(proporcion=0.1, saldo_maximo=2)
+
+    for _ in range(100):
+        presupuesto.depositar()
+
+    assert presupuesto.saldo == 2
+    assert presupuesto.retirar() and presupuesto.retirar()
+    assert not presupuesto.retirar()
+
+def test_observador_recibe_cada_intento():
+    registrados = []
+    politica, _ = _politica(observador=registrados.append)
+
+    politica.ejecutar("fuente", Intentos(fallas=1), clasificar)
+
+    assert [(i.numero, i.resultado) for i in registrados] == [(1, "transitorio"), (2, "ok")]
+    assert registrados[0].espera == pytest.approx(0.1)
+
+def test_ejecutar_async_reintenta():
+    politica = PoliticaReintentos(espera_base=0.001)
+    intento = Intentos(fallas=2)
+
+    async def intento_async():
+        return intento()
+
+    assert asyncio.run(politica.ejecutar_async("fuente", intento_async, clasificar)) == "ok"
+    assert intento.llamadas == 3
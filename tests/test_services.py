@@ -2,12 +2,21 @@
 import pytest # Importación añadida
 import requests_mock
 import json
+import re
 import requests
 
 
-from src.services import DatosGovCoService, RuesService, ConsultaNitService, DataSource
+from src.services import (
+    DatosGovCoService,
+    RuesService,
+    ConsultaNitService,
+    DataSource,
+    crear_sesion_http,
+    construir_consultas_socrata_por_nit,
+)
 from src.exceptions import NitNotFoundError, DataSourceError
 from src.models import Empresa, Ciiu
+from src.cache import CacheResultados
 
 
 # --- Fixtures para Servicios ---
@@ -24,6 +33,25 @@ def consulta_nit_service(datos_gov_co_service, rues_service):
     return ConsultaNitService(datos_gov_co_service, rues_service)
 
 
+# --- Pruebas para la sesión HTTP compartida ---
+def test_crear_sesion_http_configura_pool():
+    session = crear_sesion_http(pool_connections=3, pool_maxsize=7)
+    adapter = session.get_adapter("https://www.datos.gov.co")
+    assert adapter._pool_connections == 3
+    assert adapter._pool_maxsize == 7
+    assert session.get_adapter("http://mock-rues.org.co") is adapter
+
+def test_servicios_reutilizan_la_sesion_compartida(requests_mock):
+    session = crear_sesion_http()
+    gov = DatosGovCoService(base_url="http://mock-datos-gov.co/resource", session=session)
+    rues = RuesService(base_url="http://mock-rues.org.co/api", session=session)
+    assert gov.session is session
+    assert rues.session is session
+
+    requests_mock.get("http://mock-datos-gov.co/resource?nit=900123456", json=[{"nit": "900123456"}])
+    assert gov.consultar("900123456") == {"nit": "900123456"}
+
+
 # --- Pruebas para DatosGovCoService ---
 def test_datos_gov_co_service_success(datos_gov_co_service, requests_mock):
     nit = "900123456"
@@ -72,6 +100,37 @@ def test_datos_gov_co_service_network_error(datos_gov_co_service, requests_mock)
     assert isinstance(excinfo.value.original_exception, requests.exceptions.ConnectionError)
 
 
+def test_datos_gov_co_service_consultar_lote(datos_gov_co_service, requests_mock):
+    mock = requests_mock.get(re.compile(r"http://mock-datos-gov\.co/resource\?"), json=[
+        {"nit": "900123456", "razon_social": "PRIMERA"},
+        {"nit": "900123456", "razon_social": "DUPLICADA"},
+        {"nit": "800111222", "razon_social": "SEGUNDA"},
+    ])
+
+    resultado = datos_gov_co_service.consultar_lote(["900123456", "800111222", "999999999"])
+
+    assert mock.call_count == 1
+    assert mock.last_request.qs["$where"] == ["nit in('900123456','800111222','999999999')"]
+    assert resultado["900123456"]["razon_social"] == "PRIMERA"
+    assert resultado["800111222"]["razon_social"] == "SEGUNDA"
+    assert "999999999" in resultado and resultado["999999999"] is None
+
+def test_datos_gov_co_service_consultar_lote_error(datos_gov_co_service, requests_mock):
+    requests_mock.get(re.compile(r"http://mock-datos-gov\.co/resource\?"), status_code=503)
+
+    with pytest.raises(DataSourceError):
+        datos_gov_co_service.consultar_lote(["900123456"])
+
+def test_construir_consultas_socrata_respeta_la_longitud_maxima():
+    nits = [str(900000000 + i) for i in range(500)]
+
+    consultas = construir_consultas_socrata_por_nit("http://mock-datos-gov.co/resource", nits, max_longitud_url=1000)
+
+    assert len(consultas) > 1
+    assert all(len(url) <= 1000 for url, _ in consultas)
+    assert [nit for _, grupo in consultas for nit in grupo] == nits
+
+
 # --- Pruebas para RuesService ---
 def test_rues_service_success(rues_service, requests_mock):
     nit = "900123456"
@@ -205,6 +264,21 @@ def test_consulta_nit_service_both_sources_success(consulta_nit_service, request
     assert empresa.ciiu4.descripcion == "Fabricación de productos químicos básicos" # From RUES
 
 
+def test_consultar_nit_calcula_el_dv_si_ninguna_fuente_lo_trae(consulta_nit_service, requests_mock):
+    requests_mock.get("http://mock-datos-gov.co/resource?nit=900123456", json=[{"nit": "900123456", "razon_social": "SIN DV"}])
+
+    empresa = consulta_nit_service.consultar_nit("900123456")
+
+    assert empresa.dv == "8"
+
+def test_consultar_nit_normaliza_el_nit_con_puntos(consulta_nit_service, requests_mock):
+    requests_mock.get("http://mock-datos-gov.co/resource?nit=900123456", json=[{"nit": "900123456", "razon_social": "SIN DV"}])
+
+    empresa = consulta_nit_service.consultar_nit("900.123.456")
+
+    assert empresa.nit == "900123456"
+    assert empresa.dv == "8"
+
 def test_consulta_nit_service_only_gov_success(consulta_nit_service, requests_mock):
     nit = "900123456"
     
@@ -232,12 +306,14 @@ def test_consulta_nit_service_only_gov_success(consulta_nit_service, requests_mo
     assert empresa.nit == nit
     assert empresa.razon_social == "EMPRESA GOV ONLY"
     assert empresa.ciiu_principal.codigo == "G4711"
-    assert empresa.ciiu_principal.descripcion == "Actividad No Homologada CIIU v4" # Should be populated from default
+    # Sin descripción en las fuentes, se toma del catálogo CIIU empaquetado
+    assert empresa.ciiu_principal.descripcion.startswith("Comercio al por menor en establecimientos no especializados")
+    assert empresa.ciiu_principal.division == "47"
     assert "datos.gov.co" in empresa.fuentes
     assert "rues.org.co" not in empresa.fuentes # RUES no proporcionó datos
     # Assert new CIIU string fields default values
     assert empresa.cod_ciiu_act_econ_pri == "G4711" # From GOV
-    assert empresa.desc_ciiu_act_econ_pri == "Actividad No Homologada CIIU v4" # Default
+    assert empresa.desc_ciiu_act_econ_pri == empresa.ciiu_principal.descripcion # Del catálogo CIIU
     
     # Assert new CIIU objects default values
     assert isinstance(empresa.ciiu2, Ciiu)
@@ -282,7 +358,7 @@ def test_consulta_nit_service_no_ciiu_data_defaults(consulta_nit_service, reques
     assert empresa.ciiu_principal.codigo == "9999" # No primary CIIU from sources
     assert empresa.ciiu_principal.descripcion == "Actividad No Homologada CIIU v4" # Default
     assert empresa.cod_ciiu_act_econ_pri == "9999" # Default
-    assert empresa.desc_ciiu_act_econ_pri == "Actividad No Homologada CIIU v4" # Default
+    assert empresa.desc_ciiu_act_econ_pri == empresa.ciiu_principal.descripcion # Del catálogo CIIU
     
     # Assert new CIIU objects default values
     assert isinstance(empresa.ciiu2, Ciiu)
@@ -332,4 +408,552 @@ def test_consulta_nit_service_data_source_error_propagation(consulta_nit_service
     
     with pytest.raises(DataSourceError) as excinfo:
         consulta_nit_service.consultar_nit(nit)
-    assert "datos.gov.co" in str(excinfo.value)
\ No newline at end of file
+    assert "datos.gov.co" in str(excinfo.value)
+
+# --- Pruebas para la consulta por lote ---
+URL_LOTE_GOV = re.compile(r"http://mock-datos-gov\.co/resource\?\$limit=\d+&\$where=")
+
+def test_consultar_nits_resultado_por_nit(consulta_nit_service, requests_mock):
+    requests_mock.get(URL_LOTE_GOV, json=[{"razon_social": "EMPRESA UNO", "nit": "900123456"}])
+
+    resultados = consulta_nit_service.consultar_nits(["900123456", "abc", "999999999"], max_concurrencia=2)
+
+    assert [r.nit for r in resultados] == ["900123456", "abc", "999999999"]
+    assert [r.estado for r in resultados] == [200, 400, 404]
+    assert resultados[0].empresa.razon_social == "EMPRESA UNO"
+    assert resultados[0].error is None
+    assert resultados[1].error.tipo == "nit_invalido"
+    assert resultados[2].error.tipo == "nit_no_encontrado"
+    assert resultados[2].empresa is None
+
+def test_consultar_nits_falla_del_lote_consulta_nit_por_nit(consulta_nit_service, requests_mock):
+    requests_mock.get(URL_LOTE_GOV, status_code=500)
+    requests_mock.get("http://mock-datos-gov.co/resource?nit=900123456", json=[{"nit": "900123456"}])
+    requests_mock.get("http://mock-datos-gov.co/resource?nit=800111222", status_code=500)
+
+    resultados = consulta_nit_service.consultar_nits(["900123456", "800111222"])
+
+    assert [r.estado for r in resultados] == [200, 502]
+    assert resultados[1].error.tipo == "fuente_no_disponible"
+
+def test_consultar_nits_consulta_una_vez_los_repetidos(consulta_nit_service, requests_mock):
+    mock = requests_mock.get(URL_LOTE_GOV, json=[{"nit": "900123456"}])
+
+    resultados = consulta_nit_service.consultar_nits(["900123456", " 900123456 "])
+
+    assert mock.call_count == 1
+    assert "900123456" in mock.last_request.qs["$where"][0]
+    assert [r.estado for r in resultados] == [200, 200]
+
+def test_consultar_nits_respeta_la_concurrencia_maxima(datos_gov_co_service, rues_service):
+    import threading
+    import time
+
+    activos = []
+    maximo = []
+    lock = threading.Lock()
+
+    class FuenteLenta(DataSource):
+        def consultar(self, nit, **kwargs):
+            with lock:
+                activos.append(nit)
+                maximo.append(len(activos))
+            time.sleep(0.01)
+            with lock:
+                activos.remove(nit)
+            return {"nit": nit}
+
+    servicio = ConsultaNitService(FuenteLenta(), rues_service)
+    resultados = servicio.consultar_nits([str(900000000 + i) for i in range(12)], max_concurrencia=3)
+
+    assert all(r.estado == 200 for r in resultados)
+    assert max(maximo) <= 3
+
+
+# --- Pruebas para la caché de resultados ---
+@pytest.fixture
+def consulta_nit_service_con_cache(datos_gov_co_service, rues_service):
+    return ConsultaNitService(datos_gov_co_service, rues_service, cache=CacheResultados())
+
+def test_consulta_nit_service_sirve_desde_cache(consulta_nit_service_con_cache, requests_mock):
+    mock = requests_mock.get("http://mock-datos-gov.co/resource?nit=900123456", json=[{"nit": "900123456", "razon_social": "EMPRESA"}])
+
+    primera = consulta_nit_service_con_cache.consultar_nit("900123456")
+    segunda = consulta_nit_service_con_cache.consultar_nit("900123456")
+
+    assert mock.call_count == 1
+    assert segunda == primera
+    assert consulta_nit_service_con_cache.cache.estadisticas()["aciertos"] == 1
+    assert consulta_nit_service_con_cache.en_cache(segunda)
+
+def test_consulta_nit_service_cache_negativa(consulta_nit_service_con_cache, requests_mock):
+    mock = requests_mock.get("http://mock-datos-gov.co/resource?nit=999999999", json=[])
+
+    for _ in range(2):
+        with pytest.raises(NitNotFoundError):
+            consulta_nit_service_con_cache.consultar_nit("999999999")
+
+    assert mock.call_count == 1
+
+def test_consulta_nit_service_no_guarda_errores_de_fuente(consulta_nit_service_con_cache, requests_mock):
+    mock = requests_mock.get("http://mock-datos-gov.co/resource?nit=900123456", status_code=500)
+
+    for _ in range(2):
+        with pytest.raises(DataSourceError):
+            consulta_nit_service_con_cache.consultar_nit("900123456")
+
+    assert mock.call_count == 2
+    assert consulta_nit_service_con_cache.cache.estadisticas()["entradas"] == 0
+
+def test_consultar_nits_usa_la_cache(consulta_nit_service_con_cache, requests_mock):
+    consulta_nit_service_con_cache.cache.guardar("900123456", Empresa(nit="900123456", razon_social="EN CACHE"))
+    consulta_nit_service_con_cache.cache.guardar("999999999", None)
+    mock = requests_mock.get(URL_LOTE_GOV, json=[{"nit": "800111222"}])
+
+    resultados = consulta_nit_service_con_cache.consultar_nits(["900123456", "999999999", "800111222"])
+
+    assert [r.estado for r in resultados] == [200, 404, 200]
+    assert resultados[0].empresa.razon_social == "EN CACHE"
+    assert mock.last_request.qs["$where"] == ["nit in('800111222')"]
+    assert consulta_nit_service_con_cache.cache.obtener("800111222") is not None
+
+def test_consulta_nit_service_sirve_obsoleta_y_refresca(datos_gov_co_service, rues_service, requests_mock):
+    reloj = [1000.0]
+    cache = CacheResultados(ttl_encontrado=10, ventana_obsoleta=60, reloj=lambda: reloj[0])
+    servicio = ConsultaNitService(datos_gov_co_service, rues_service, cache=cache)
+    cache.guardar("900123456", Empresa(nit="900123456", razon_social="ANTERIOR"))
+    mock = requests_mock.get("http://mock-datos-gov.co/resource?nit=900123456", json=[{"nit": "900123456", "razon_social": "NUEVA"}])
+
+    reloj[0] += 30
+    empresa = servicio.consultar_nit("900123456")
+    servicio._executor_refrescos.shutdown(wait=True)
+
+    assert empresa.razon_social == "ANTERIOR"
+    assert mock.call_count == 1
+    assert cache.obtener("900123456").empresa.razon_social == "NUEVA"
+
+def test_consulta_nit_service_respaldo_ultimo_valido(datos_gov_co_service, rues_service, requests_mock):
+    reloj = [1000.0]
+    cache = CacheResultados(ttl_encontrado=10, reloj=lambda: reloj[0])
+    servicio = ConsultaNitService(datos_gov_co_service, rues_service, cache=cache)
+    cache.guardar("900123456", Empresa(nit="900123456", razon_social="CONOCIDA"))
+    requests_mock.get("http://mock-datos-gov.co/resource?nit=900123456", status_code=503)
+    requests_mock.get("http://mock-datos-gov.co/resource?nit=800111222", status_code=503)
+    requests_mock.get(URL_LOTE_GOV, status_code=503)
+
+    reloj[0] += 100
+    assert servicio.consultar_nit("900123456").razon_social == "CONOCIDA"
+    assert servicio.consultar_nits(["900123456"])[0].empresa.razon_social == "CONOCIDA"
+    assert cache.estadisticas()["respaldos"] == 2
+
+    with pytest.raises(DataSourceError):
+        servicio.consultar_nit("800111222")
+
+def test_consulta_nit_service_coalesce_consultas_concurrentes(rues_service):
+    import threading
+    import time
+
+    llamadas = []
+    inicio = threading.Barrier(8)
+
+    class FuenteLenta(DataSource):
+        def consultar(self, nit, **kwargs):
+            llamadas.append(nit)
+            time.sleep(0.05)
+            return {"nit": nit, "razon_social": "EMPRESA"}
+
+    servicio = ConsultaNitService(FuenteLenta(), rues_service)
+    empresas = []
+
+    def llamador():
+        inicio.wait()
+        empresas.append(servicio.consultar_nit("900123456"))
+
+    hilos = [threading.Thread(target=llamador) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert llamadas == ["900123456"]
+    assert len(empresas) == 8
+
+
+# --- Pruebas para el plazo de la solicitud ---
+class RelojFalso:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+GOV_CON_MATRICULA = {"nit": "900123456", "razon_social": "EMPRESA GOV", "codigo_camara": "12", "matricula": "12345"}
+
+def test_consultar_nit_usa_el_plazo_como_timeout(consulta_nit_service, requests_mock):
+    from src.plazo import Plazo
+
+    requests_mock.get("http://mock-datos-gov.co/resource?nit=900123456", json=[GOV_CON_MATRICULA])
+    rues = requests_mock.get("http://mock-rues.org.co/api/120000012345", json={"codigo_error": "0000", "registros": {"tipo_sociedad": "SAS"}})
+
+    empresa = consulta_nit_service.consultar_nit("900123456", plazo=Plazo(3.0))
+
+    assert 0 < rues.last_request.timeout <= 3.0
+    assert requests_mock.request_history[0].timeout <= 3.0
+    assert empresa.fuentes == ["datos.gov.co", "rues.org.co"]
+
+def test_consultar_nit_omite_rues_sin_plazo(rues_service, requests_mock):
+    from src.plazo import Plazo
+
+    reloj = RelojFalso()
+
+    class GovLenta(DataSource):
+        def consultar(self, nit, **kwargs):
+            reloj.ahora += 2.95
+            return dict(GOV_CON_MATRICULA)
+
+    rues = requests_mock.get("http://mock-rues.org.co/api/120000012345", json={"codigo_error": "0000", "registros": {}})
+    cache = CacheResultados()
+    servicio = ConsultaNitService(GovLenta(), rues_service, cache=cache)
+
+    empresa = servicio.consultar_nit("900123456", plazo=Plazo(3.0, reloj=reloj))
+
+    assert rues.call_count == 0
+    assert empresa.razon_social == "EMPRESA GOV"
+    assert empresa.fuentes == ["datos.gov.co"]
+    assert cache.obtener("900123456") is None  # La respuesta incompleta no se guarda
+    assert not servicio.en_cache(empresa)
+
+def test_consultar_nit_rues_fuera_de_plazo_responde_con_gov(rues_service, requests_mock):
+    from src.plazo import Plazo
+
+    reloj = RelojFalso()
+
+    class Fuente(DataSource):
+        def consultar(self, nit, **kwargs):
+            return dict(GOV_CON_MATRICULA)
+
+    def rues_lento(request, context):
+        reloj.ahora += 5
+        raise requests.exceptions.ReadTimeout("timeout")
+
+    requests_mock.get("http://mock-rues.org.co/api/120000012345", json=rues_lento)
+    servicio = ConsultaNitService(Fuente(), rues_service)
+
+    empresa = servicio.consultar_nit("900123456", plazo=Plazo(3.0, reloj=reloj))
+    assert empresa.fuentes == ["datos.gov.co"]
+
+    # Sin plazo agotado, la falla de RUES se sigue propagando
+    with pytest.raises(DataSourceError):
+        servicio.consultar_nit("900123456", plazo=Plazo(30.0, reloj=reloj))
+
+
+# --- Pruebas para el circuit breaker ---
+def test_fuente_con_interruptor_falla_rapido_con_el_circuito_abierto(datos_gov_co_service, requests_mock):
+    from src.circuito import Interruptor
+    from src.exceptions import CircuitoAbiertoError
+    from src.services import FuenteConInterruptor
+
+    mock = requests_mock.get("http://mock-datos-gov.co/resource?nit=900123456", status_code=503)
+    fuente = FuenteConInterruptor(datos_gov_co_service, "datos.gov.co", Interruptor(umbral_fallos=2))
+
+    for _ in range(2):
+        with pytest.raises(DataSourceError):
+            fuente.consultar("900123456")
+    with pytest.raises(CircuitoAbiertoError):
+        fuente.consultar("900123456")
+
+    assert mock.call_count == 2
+    assert fuente.estadisticas()["estado"] == "abierto"
+
+def test_consultar_nit_omite_rues_con_el_circuito_abierto(rues_service, requests_mock):
+    from src.circuito import Interruptor
+    from src.services import FuenteConInterruptor
+
+    class Fuente(DataSource):
+        def consultar(self, nit, **kwargs):
+            return dict(GOV_CON_MATRICULA)
+
+    rues = requests_mock.get("http://mock-rues.org.co/api/120000012345", status_code=500)
+    servicio = ConsultaNitService(Fuente(), FuenteConInterruptor(rues_service, "rues.org.co", Interruptor(umbral_fallos=1)))
+
+    with pytest.raises(DataSourceError):
+        servicio.consultar_nit("900123456")
+
+    empresa = servicio.consultar_nit("900123456")
+
+    assert rues.call_count == 1
+    assert empresa.razon_social == "EMPRESA GOV"
+    assert empresa.fuentes == ["datos.gov.co"]
+
+
+# --- Pruebas para los reintentos ---
+def _politica_sin_esperas(**kwargs):
+    from src.reintentos import PoliticaReintentos
+
+    esperas = []
+    return PoliticaReintentos(dormir=esperas.append, aleatorio=lambda minimo, maximo: maximo, **kwargs), esperas
+
+def test_datos_gov_co_reintenta_errores_transitorios(requests_mock):
+    reintentos, esperas = _politica_sin_esperas(max_intentos=3)
+    mock = requests_mock.get("http://mock-datos-gov.co/resource?nit=900123456", [
+        {"status_code": 503, "headers": {"Retry-After": "1"}},
+        {"exc": requests.exceptions.ConnectionError("Connection reset by peer")},
+        {"json": [{"nit": "900123456", "razon_social": "EMPRESA GOV"}]},
+    ])
+    fuente = DatosGovCoService(base_url="http://mock-datos-gov.co/resource", reintentos=reintentos)
+
+    assert fuente.consultar("900123456")["razon_social"] == "EMPRESA GOV"
+
+    assert mock.call_count == 3
+    assert esperas == [1.0, 0.2]
+    assert reintentos.estadisticas()["datos.gov.co:http_503"] == 1
+    assert reintentos.estadisticas()["datos.gov.co:conexion"] == 1
+
+def test_datos_gov_co_no_reintenta_errores_del_cliente(requests_mock):
+    reintentos, _ = _politica_sin_esperas()
+    mock = requests_mock.get("http://mock-datos-gov.co/resource?nit=900123456", status_code=400)
+    fuente = DatosGovCoService(base_url="http://mock-datos-gov.co/resource", reintentos=reintentos)
+
+    with pytest.raises(DataSourceError):
+        fuente.consultar("900123456")
+
+    assert mock.call_count == 1
+
+def test_rues_agota_los_reintentos_y_lanza_data_source_error(requests_mock):
+    reintentos, _ = _politica_sin_esperas(max_intentos=2)
+    mock = requests_mock.get("http://mock-rues.org.co/api/120000012345", status_code=502)
+    fuente = RuesService(base_url="http://mock-rues.org.co/api", reintentos=reintentos)
+
+    with pytest.raises(DataSourceError) as excinfo:
+        fuente.consultar("900123456", codigo_camara="12", matricula="12345")
+
+    assert mock.call_count == 2
+    assert excinfo.value.source_name == "rues.org.co"
+
+def test_crear_politica_reintentos_desde_el_entorno():
+    from src.configuracion import crear_politica_reintentos
+
+    assert crear_politica_reintentos({"REINTENTOS_MAX_INTENTOS": "1"}) is None
+
+    politica = crear_politica_reintentos({"REINTENTOS_ESPERA_BASE_MS": "50", "REINTENTOS_PRESUPUESTO_MAXIMO": "3"})
+    assert politica.max_intentos == 3
+    assert politica.espera_base == 0.05
+    assert politica.presupuesto.saldo == 3
+
+def test_politica_reintentos_registra_los_intentos_en_las_metricas(requests_mock):
+    from src.configuracion import crear_politica_reintentos
+    from src.metricas import SumideroEnMemoria, SumideroNulo
+
+    assert crear_politica_reintentos({}, SumideroNulo()).observador is None
+
+    sumidero = SumideroEnMemoria()
+    politica = crear_politica_reintentos({"REINTENTOS_ESPERA_BASE_MS": "1", "REINTENTOS_PRESUPUESTO_MAXIMO": "1"}, sumidero)
+    requests_mock.get("http://mock-datos-gov.co/resource?nit=900123456", status_code=503)
+    fuente = DatosGovCoService(base_url="http://mock-datos-gov.co/resource", reintentos=politica)
+
+    for _ in range(2):
+        with pytest.raises(DataSourceError):
+            fuente.consultar("900123456")
+
+    # El primer fallo se reintenta con la única ficha del presupuesto; después ya no queda saldo para reintentar
+    assert [m.estado for m in sumidero.mediciones()] == ["reintento", "presupuesto_agotado", "presupuesto_agotado"]
+    assert {m.etapa for m in sumidero.mediciones()} == {"intento.datos.gov.co"}
+
+def test_motor_sincrono_no_carga_modulos_diferidos():
+    # En un proceso nuevo, para que los módulos que ya cargaron otras pruebas no oculten una importación
+    import os
+    import subprocess
+    import sys
+
+    codigo = (
+        "import sys\n"
+        "from src.configuracion import crear_consulta_nit_service\n"
+        "crear_consulta_nit_service({})\n"
+        "print(','.join(m for m in ('asyncio', 'aiohttp', 'sqlite3') if m in sys.modules))\n"
+    )
+    salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True,
+                            cwd=os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+    assert salida.stdout.strip() == ""
+
+
+# --- Pruebas para el índice NIT -> código RUES ---
+def test_consultar_nit_consulta_rues_en_paralelo_con_el_codigo_aprendido(stub_upstream):
+    import time
+    from src.indice_rues import IndiceCodigosRues
+
+    stub_upstream.rutas["/gov?nit=900123456"] = (200, [GOV_CON_MATRICULA])
+    stub_upstream.rutas["/rues/120000012345"] = (200, {"codigo_error": "0000", "registros": {"tipo_sociedad": "SAS"}})
+    stub_upstream.retardos["/gov?nit=900123456"] = 0.3
+    stub_upstream.retardos["/rues/120000012345"] = 0.3
+    indice = IndiceCodigosRues()
+    servicio = ConsultaNitService(
+        DatosGovCoService(base_url=f"{stub_upstream.url}/gov"),
+        RuesService(base_url=f"{stub_upstream.url}/rues"),
+        indice_rues=indice
+    )
+
+    primera = servicio.consultar_nit("900123456")
+    assert indice.obtener("900123456") == "120000012345"
+
+    inicio = time.monotonic()
+    segunda = servicio.consultar_nit("900123456")
+
+    assert time.monotonic() - inicio < 0.55
+    assert segunda == primera
+    assert segunda.fuentes == ["datos.gov.co", "rues.org.co"]
+    assert stub_upstream.solicitudes.count("/rues/120000012345") == 2
+
+def test_consultar_nit_descarta_el_codigo_aprendido_si_cambio(datos_gov_co_service, rues_service, requests_mock):
+    from src.indice_rues import IndiceCodigosRues
+
+    requests_mock.get("http://mock-datos-gov.co/resource?nit=900123456", json=[dict(GOV_CON_MATRICULA, codigo_camara="04")])
+    anterior = requests_mock.get("http://mock-rues.org.co/api/120000012345", json={"codigo_error": "0000", "registros": {"tipo_sociedad": "ANTERIOR"}})
+    actual = requests_mock.get("http://mock-rues.org.co/api/040000012345", json={"codigo_error": "0000", "registros": {"tipo_sociedad": "SAS"}})
+    indice = IndiceCodigosRues()
+    indice.guardar("900123456", "120000012345")
+    servicio = ConsultaNitService(datos_gov_co_service, rues_service, indice_rues=indice)
+
+    empresa = servicio.consultar_nit("900123456")
+
+    assert empresa.tipo_sociedad == "SAS"
+    assert actual.call_count == 1
+    assert anterior.call_count <= 1
+    assert indice.obtener("900123456") == "040000012345"
+
+def test_consultar_nit_invalida_el_codigo_si_el_nit_ya_no_esta_en_gov(datos_gov_co_service, rues_service, requests_mock):
+    from src.indice_rues import IndiceCodigosRues
+
+    requests_mock.get("http://mock-datos-gov.co/resource?nit=900123456", json=[])
+    requests_mock.get("http://mock-rues.org.co/api/120000012345", json={"codigo_error": "0000", "registros": {"tipo_sociedad": "SAS"}})
+    indice = IndiceCodigosRues()
+    indice.guardar("900123456", "120000012345")
+    servicio = ConsultaNitService(datos_gov_co_service, rues_service, indice_rues=indice)
+
+    with pytest.raises(NitNotFoundError):
+        servicio.consultar_nit("900123456")
+    assert indice.obtener("900123456") is None
+
+
+# --- Pruebas para las solicitudes de cobertura ---
+def _politica_cobertura_lista(**kwargs):
+    from src.cobertura import PoliticaCobertura
+
+    politica = PoliticaCobertura(retardo_minimo=0, muestras_minimas=1, **kwargs)
+    politica.registrar_latencia(0.05)
+    return politica
+
+def test_fuente_con_cobertura_usa_la_respuesta_mas_rapida():
+    import time
+    from src.services import FuenteConCobertura
+
+    class FuenteConColaLenta(DataSource):
+        def __init__(self):
+            self.llamadas = 0
+
+        def consultar(self, nit, **kwargs):
+            self.llamadas += 1
+            if self.llamadas == 1:
+                time.sleep(1)
+                return {"respuesta": "lenta"}
+            return {"respuesta": "cobertura"}
+
+    politica = _politica_cobertura_lista()
+    fuente = FuenteConCobertura(FuenteConColaLenta(), politica)
+
+    inicio = time.monotonic()
+    assert fuente.consultar("900123456") == {"respuesta": "cobertura"}
+    assert time.monotonic() - inicio < 0.5
+    assert fuente.estadisticas()["coberturas"] == 1
+    assert fuente.estadisticas()["coberturas_ganadoras"] == 1
+
+def test_fuente_con_cobertura_no_cubre_respuestas_rapidas_ni_supera_la_fraccion():
+    from src.services import FuenteConCobertura
+
+    class FuenteRapida(DataSource):
+        def consultar(self, nit, **kwargs):
+            return {"nit": nit}
+
+    fuente = FuenteConCobertura(FuenteRapida(), _politica_cobertura_lista(fraccion_maxima=0, saldo_maximo=0))
+
+    assert fuente.consultar("900123456") == {"nit": "900123456"}
+    assert fuente.estadisticas()["coberturas"] == 0
+
+def test_fuente_con_cobertura_propaga_el_error_si_ambas_fallan():
+    import time
+    from src.services import FuenteConCobertura
+
+    class FuenteCaida(DataSource):
+        def consultar(self, nit, **kwargs):
+            time.sleep(0.1)
+            raise DataSourceError("datos.gov.co", RuntimeError("caída"))
+
+    fuente = FuenteConCobertura(FuenteCaida(), _politica_cobertura_lista())
+
+    with pytest.raises(DataSourceError):
+        fuente.consultar("900123456")
+    assert fuente.estadisticas()["coberturas"] == 1
+
+
+def test_fuente_con_cobertura_sin_hilos_libres_consulta_en_el_hilo_que_pide():
+    import threading
+    from src.services import FuenteConCobertura
+
+    hilos = []
+
+    class FuenteRapida(DataSource):
+        def consultar(self, nit, **kwargs):
+            hilos.append(threading.current_thread())
+            return {"nit": nit}
+
+    fuente = FuenteConCobertura(FuenteRapida(), _politica_cobertura_lista(), max_hilos=1)
+    fuente._hilos_libres.acquire()  # El único hilo del pool está ocupado
+
+    assert fuente.consultar("900123456") == {"nit": "900123456"}
+    assert hilos == [threading.current_thread()]
+    assert fuente.estadisticas()["sin_hilos_libres"] == 1
+    assert fuente.estadisticas()["coberturas"] == 0
+
+    fuente._hilos_libres.release()
+    fuente.consultar("900123456")
+    assert hilos[1] is not threading.current_thread()
+
+
+# --- Pruebas para la fusión en una sola validación ---
+def test_unificar_datos_produce_el_mismo_json_que_con_modelos_ciiu():
+    from src.ciiu import campos_ciiu
+    from src.services import BaseConsultaNitService
+
+    gov = {"razon_social": "  EMPRESA GOV　", "digito_verificacion": "1", "cod_ciiu_act_econ_pri": "G4711"}
+    rues = {"razon_social": "EMPRESA RUES", "tipo_sociedad": "\x1cSAS ", "cod_ciiu_act_econ_sec": "B0811",
+            "desc_ciiu_act_econ_sec": " Extracción de piedra ", "ciiu3": "9999", "ciiu4": "J6201"}
+
+    empresa = BaseConsultaNitService()._unificar_datos("900123456", gov, rues)
+
+    esperada = Empresa(
+        nit="900123456",
+        razon_social=gov["razon_social"],
+        dv="1",
+        tipo_sociedad=rues["tipo_sociedad"],
+        cod_ciiu_act_econ_pri="G4711",
+        desc_ciiu_act_econ_pri=empresa.desc_ciiu_act_econ_pri,
+        ciiu_principal=Ciiu(**campos_ciiu("G4711", empresa.desc_ciiu_act_econ_pri)),
+        ciiu2=Ciiu(**campos_ciiu("B0811", " Extracción de piedra ")),
+        ciiu3=Ciiu(**campos_ciiu("9999")),
+        ciiu4=Ciiu(**campos_ciiu("J6201")),
+        fuentes=["datos.gov.co", "rues.org.co"],
+    )
+    assert empresa.model_dump_json() == esperada.model_dump_json()
+    assert empresa.razon_social == "EMPRESA GOV"
+    assert empresa.tipo_sociedad == "\x1cSAS"
+    # Los Ciiu no recortan espacios, igual que antes
+    assert empresa.ciiu2.descripcion == " Extracción de piedra "
+
+def test_unificar_datos_sigue_rechazando_valores_de_otro_tipo():
+    from pydantic import ValidationError
+    from src.services import BaseConsultaNitService
+
+    with pytest.raises(ValidationError):
+        BaseConsultaNitService()._unificar_datos("900123456", {"matricula": 12345}, {})
+    with pytest.raises(ValidationError):
+        BaseConsultaNitService()._unificar_datos("900123456", {}, {"razon_social": "X", "ciiu3": 4711})
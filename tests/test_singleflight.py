@@ -0,0 +1,98 @@
+# tests/test_singleflight.py
+import asyncio
+import threading
+import time
+
+from src.singleflight import SingleFlight, AsyncSingleFlight
+
+
+def test_single_flight_comparte_el_resultado_entre_hilos():
+    single_flight = SingleFlight()
+    llamadas = []
+    inicio = threading.Barrier(5)
+
+    def consulta_lenta():
+        llamadas.append(1)
+        time.sleep(0.05)
+        return {"nit": "900123456"}
+
+    resultados = []
+
+    def llamador():
+        inicio.wait()
+        resultados.append(single_flight.ejecutar("900123456", consulta_lenta))
+
+    hilos = [threading.Thread(target=llamador) for _ in range(5)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(llamadas) == 1
+    assert len(resultados) == 5
+    assert all(resultado is resultados[0] for resultado in resultados)
+    assert single_flight.estadisticas() == {"lideres": 1, "compartidas": 4, "en_vuelo": 0}
+
+def test_single_flight_comparte_la_excepcion():
+    single_flight = SingleFlight()
+    liberar = threading.Event()
+    errores = []
+
+    def consulta_fallida():
+        liberar.wait(1)
+        raise ValueError("fallo")
+
+    def llamador():
+        try:
+            single_flight.ejecutar("1", consulta_fallida)
+        except ValueError as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=llamador) for _ in range(3)]
+    for hilo in hilos:
+        hilo.start()
+    while single_flight.estadisticas()["compartidas"] < 2:
+        time.sleep(0.001)
+    liberar.set()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(errores) == 3
+    assert all(error is errores[0] for error in errores)
+
+def test_single_flight_nueva_llamada_tras_terminar():
+    single_flight = SingleFlight()
+    assert single_flight.ejecutar("1", lambda: 1) == 1
+    assert single_flight.ejecutar("1", lambda: 2) == 2
+
+def test_async_single_flight_comparte_una_tarea():
+    single_flight = AsyncSingleFlight()
+    llamadas = []
+
+    async def consulta():
+        llamadas.append(1)
+        await asyncio.sleep(0.01)
+        return "resultado"
+
+    async def principal():
+        return await asyncio.gather(*(single_flight.ejecutar("1", consulta) for _ in range(10)))
+
+    assert asyncio.run(principal()) == ["resultado"] * 10
+    assert len(llamadas) == 1
+    assert single_flight.estadisticas() == {"lideres": 1, "compartidas": 9, "en_vuelo": 0}
+
+def test_async_single_flight_cancelar_un_llamador_no_cancela_a_los_demas():
+    single_flight = AsyncSingleFlight()
+
+    async def consulta():
+        await asyncio.sleep(0.02)
+        return "resultado"
+
+    async def principal():
+        primera = asyncio.ensure_future(single_flight.ejecutar("1", consulta))
+        segunda = asyncio.ensure_future(single_flight.ejecutar("1", consulta))
+        await asyncio.sleep(0)
+        primera.cancel()
+        return await segunda
+
+    assert asyncio.run(principal()) == "resultado"
@@ -0,0 +1,209 @@
+# tests/test_snapshot.py
+import asyncio
+import json
+import re
+import pytest
+
+from src.snapshot import (
+    SnapshotDatosGovCo,
+    construir_snapshot,
+    leer_exportacion,
+    main,
+    paginar_datos_gov_co,
+    sincronizar_snapshot,
+)
+from src.services import ConsultaNitService, DataSource, FuenteConRespaldo, RuesService
+from src.async_services import AsyncDataSource, AsyncFuenteConRespaldo, AsyncFuenteLocal
+from src.configuracion import crear_consulta_nit_service
+from src.exceptions import DataSourceError
+
+
+REGISTROS = [
+    {"nit": "900123456", "razon_social": "EMPRESA UNO", "codigo_camara": "12", "matricula": "12345"},
+    {"nit": "800111222", "razon_social": "EMPRESA DOS"},
+    {"nit": "", "razon_social": "SIN NIT"},
+]
+
+
+class FuenteFija(DataSource):
+    def __init__(self, datos=None, error=None):
+        self.datos = datos or {}
+        self.error = error
+        self.consultas = []
+
+    def consultar(self, nit, **kwargs):
+        self.consultas.append(nit)
+        if self.error:
+            raise self.error
+        return self.datos.get(nit)
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    ruta = str(tmp_path / "snapshot.sqlite3")
+    construir_snapshot(ruta, REGISTROS)
+    return SnapshotDatosGovCo(ruta)
+
+
+def test_snapshot_consulta_por_nit(snapshot):
+    assert snapshot.consultar("900123456")["razon_social"] == "EMPRESA UNO"
+    assert snapshot.consultar("999999999") is None
+    assert snapshot.metadatos()["registros"] == "2"
+
+def test_snapshot_inexistente_lanza_data_source_error(tmp_path):
+    with pytest.raises(DataSourceError):
+        SnapshotDatosGovCo(str(tmp_path / "no_existe.sqlite3")).consultar("900123456")
+
+def test_snapshot_se_reabre_al_reconstruirse(snapshot):
+    assert snapshot.consultar("700000001") is None
+    construir_snapshot(snapshot.ruta, [{"nit": "700000001", "razon_social": "NUEVA"}])
+    assert snapshot.consultar("700000001")["razon_social"] == "NUEVA"
+
+def test_leer_exportacion_csv_y_jsonl(tmp_path):
+    csv_ruta = tmp_path / "exportacion.csv"
+    csv_ruta.write_text("nit,razon_social\n900123456,EMPRESA UNO\n", encoding="utf-8")
+    jsonl_ruta = tmp_path / "exportacion.jsonl"
+    jsonl_ruta.write_text("\n".join(json.dumps(r) for r in REGISTROS[:2]) + "\n", encoding="utf-8")
+
+    assert list(leer_exportacion(str(csv_ruta))) == [{"nit": "900123456", "razon_social": "EMPRESA UNO"}]
+    assert [r["nit"] for r in leer_exportacion(str(jsonl_ruta))] == ["900123456", "800111222"]
+
+def test_paginar_datos_gov_co_usa_paginacion_por_clave(requests_mock):
+    url = "http://mock-datos-gov.co/resource"
+    mock = requests_mock.get(re.compile(r"http://mock-datos-gov\.co/resource\?"), [
+        {"json": [{":id": "row-1", "nit": "1"}, {":id": "row-2", "nit": "2"}]},
+        {"json": [{":id": "row-3", "nit": "3"}]},
+    ])
+
+    registros = list(paginar_datos_gov_co(url, tamano_pagina=2))
+
+    assert [r["nit"] for r in registros] == ["1", "2", "3"]
+    assert mock.call_count == 2
+    assert "$where" not in mock.request_history[0].qs
+    assert mock.request_history[1].qs["$where"] == [":id > 'row-2'"]
+
+def test_main_construye_desde_archivo(tmp_path):
+    exportacion = tmp_path / "exportacion.jsonl"
+    exportacion.write_text("\n".join(json.dumps(r) for r in REGISTROS), encoding="utf-8")
+    salida = str(tmp_path / "snapshot.sqlite3")
+
+    main(["construir", "--salida", salida, "--desde-archivo", str(exportacion)])
+
+    assert SnapshotDatosGovCo(salida).consultar("800111222")["razon_social"] == "EMPRESA DOS"
+
+def test_fuente_con_respaldo_usa_el_snapshot_primero(snapshot):
+    en_vivo = FuenteFija({"700000001": {"nit": "700000001", "razon_social": "EN VIVO"}})
+    fuente = FuenteConRespaldo(snapshot, en_vivo)
+
+    assert fuente.consultar("900123456")["razon_social"] == "EMPRESA UNO"
+    assert en_vivo.consultas == []
+    assert fuente.consultar("700000001")["razon_social"] == "EN VIVO"
+    assert fuente.consultar_lote(["800111222", "700000001"]) == {
+        "800111222": REGISTROS[1],
+        "700000001": {"nit": "700000001", "razon_social": "EN VIVO"},
+    }
+
+def test_fuente_con_respaldo_cuando_falla_la_primaria():
+    fuente = FuenteConRespaldo(FuenteFija(error=DataSourceError("snapshot", OSError())), FuenteFija({"1": {"nit": "1"}}))
+    assert fuente.consultar("1") == {"nit": "1"}
+
+def test_consulta_nit_service_con_snapshot_y_api_caida(snapshot, requests_mock):
+    servicio = ConsultaNitService(
+        FuenteConRespaldo(snapshot, FuenteFija(error=DataSourceError("datos.gov.co", OSError()))),
+        RuesService(base_url="http://mock-rues.org.co/api")
+    )
+    requests_mock.get("http://mock-rues.org.co/api/120000012345", json={"codigo_error": "0000", "registros": {"tipo_sociedad": "SAS"}})
+
+    empresa = servicio.consultar_nit("900123456")
+
+    assert empresa.razon_social == "EMPRESA UNO"
+    assert empresa.tipo_sociedad == "SAS"
+
+def test_async_fuente_con_respaldo(snapshot):
+    class AsyncFuenteFija(AsyncDataSource):
+        async def consultar(self, nit, **kwargs):
+            return {"nit": nit, "razon_social": "EN VIVO"}
+
+    fuente = AsyncFuenteConRespaldo(AsyncFuenteLocal(snapshot), AsyncFuenteFija())
+
+    assert asyncio.run(fuente.consultar("900123456"))["razon_social"] == "EMPRESA UNO"
+    assert asyncio.run(fuente.consultar("700000001"))["razon_social"] == "EN VIVO"
+
+def test_configuracion_usa_el_snapshot(snapshot):
+    servicio = crear_consulta_nit_service({"SNAPSHOT_DATOS_GOV_CO_RUTA": snapshot.ruta, "METRICAS_SERVER_TIMING": "0"})
+
+    assert isinstance(servicio.datos_gov_co_service, FuenteConRespaldo)
+    assert isinstance(servicio.datos_gov_co_service.primaria, SnapshotDatosGovCo)
+
+
+# --- Sincronización incremental ---
+URL_GOV = re.compile(r"http://mock-datos-gov\.co/resource\?")
+
+
+def _fila(nit, actualizado, id_fila, razon_social="EMPRESA"):
+    return {":id": id_fila, ":updated_at": actualizado, "nit": nit, "razon_social": razon_social}
+
+
+def test_construir_snapshot_guarda_la_marca_de_agua(tmp_path):
+    ruta = str(tmp_path / "snapshot.sqlite3")
+    construir_snapshot(ruta, [
+        _fila("1", "2024-01-02T00:00:00.000Z", "row-b"),
+        _fila("2", "2024-01-03T00:00:00.000Z", "row-a"),
+    ])
+
+    metadatos = SnapshotDatosGovCo(ruta).metadatos()
+    assert metadatos["marca_actualizacion"] == "2024-01-03T00:00:00.000Z"
+    assert metadatos["marca_id"] == "row-a"
+
+def test_sincronizar_aplica_solo_los_cambios(tmp_path, requests_mock):
+    ruta = str(tmp_path / "snapshot.sqlite3")
+    construir_snapshot(ruta, [_fila("1", "2024-01-01T00:00:00.000Z", "row-1", "ANTERIOR")])
+    mock = requests_mock.get(URL_GOV, [
+        {"json": [_fila("1", "2024-02-01T00:00:00.000Z", "row-1", "ACTUALIZADA"), _fila("2", "2024-02-02T00:00:00.000Z", "row-2")]},
+        {"json": [_fila("3", "2024-02-03T00:00:00.000Z", "row-3")]},
+    ])
+
+    resultado = sincronizar_snapshot(ruta, "http://mock-datos-gov.co/resource", tamano_pagina=2)
+
+    assert resultado.filas == 3
+    assert resultado.paginas == 2
+    assert resultado.marca_actualizacion == "2024-02-03T00:00:00.000Z"
+    # requests_mock normaliza la query a minúsculas.
+    assert mock.request_history[0].qs["$where"] == [
+        ":updated_at > '2024-01-01t00:00:00.000z' or (:updated_at = '2024-01-01t00:00:00.000z' and :id > 'row-1')"
+    ]
+    assert mock.request_history[0].qs["$order"] == [":updated_at, :id"]
+    assert "2024-02-02t00:00:00.000z" in mock.request_history[1].qs["$where"][0]
+
+    snapshot = SnapshotDatosGovCo(ruta)
+    assert snapshot.consultar("1")["razon_social"] == "ACTUALIZADA"
+    assert snapshot.consultar("3") is not None
+
+def test_sincronizar_sin_cambios(tmp_path, requests_mock):
+    ruta = str(tmp_path / "snapshot.sqlite3")
+    construir_snapshot(ruta, [_fila("1", "2024-01-01T00:00:00.000Z", "row-1")])
+    requests_mock.get(URL_GOV, json=[])
+
+    resultado = sincronizar_snapshot(ruta, "http://mock-datos-gov.co/resource")
+
+    assert resultado.filas == 0
+    assert resultado.marca_actualizacion == "2024-01-01T00:00:00.000Z"
+
+def test_sincronizar_se_reanuda_tras_una_falla(tmp_path, requests_mock):
+    ruta = str(tmp_path / "snapshot.sqlite3")
+    requests_mock.get(URL_GOV, [
+        {"json": [_fila("1", "2024-02-01T00:00:00.000Z", "row-1"), _fila("2", "2024-02-02T00:00:00.000Z", "row-2")]},
+        {"status_code": 500},
+    ])
+
+    with pytest.raises(Exception):
+        sincronizar_snapshot(ruta, "http://mock-datos-gov.co/resource", tamano_pagina=2)
+
+    assert SnapshotDatosGovCo(ruta).metadatos()["marca_actualizacion"] == "2024-02-02T00:00:00.000Z"
+
+    mock = requests_mock.get(URL_GOV, json=[_fila("3", "2024-02-03T00:00:00.000Z", "row-3")])
+    resultado = sincronizar_snapshot(ruta, "http://mock-datos-gov.co/resource", tamano_pagina=2)
+
+    assert resultado.filas == 1
+    assert "2024-02-02t00:00:00.000z" in mock.last_request.qs["$where"][0]
+    assert SnapshotDatosGovCo(ruta).consultar("1") is not None
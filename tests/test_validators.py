@@ -0,0 +1,47 @@
+# tests/test_validators.py
+import pytest
+
+from src.validators import calcular_dv, normalizar_nit
+from src.exceptions import NitInvalidoError
+
+
+def test_normalizar_nit_valido():
+    assert normalizar_nit(" 900123456 ") == "900123456"
+    assert normalizar_nit(900123456) == "900123456"
+
+@pytest.mark.parametrize("nit", [None, "", "   "])
+def test_normalizar_nit_requerido(nit):
+    with pytest.raises(NitInvalidoError) as excinfo:
+        normalizar_nit(nit)
+    assert excinfo.value.mensaje == "El NIT es requerido."
+
+@pytest.mark.parametrize("nit", ["1234567", "12345678901", "90012345A"])
+def test_normalizar_nit_formato_invalido(nit):
+    with pytest.raises(NitInvalidoError) as excinfo:
+        normalizar_nit(nit)
+    assert "Formato de NIT inválido" in excinfo.value.mensaje
+
+@pytest.mark.parametrize("nit, dv", [
+    ("800197268", "4"),
+    ("860034313", "7"),
+    ("890903938", "8"),
+    ("899999068", "1"),
+    ("900123456", "8"),
+])
+def test_calcular_dv(nit, dv):
+    assert calcular_dv(nit) == dv
+
+@pytest.mark.parametrize("nit", ["900123456-8", " 900123456 - 8 ", "900.123.456-8", "900.123.456"])
+def test_normalizar_nit_con_dv_y_puntos(nit):
+    assert normalizar_nit(nit) == "900123456"
+
+def test_normalizar_nit_rechaza_dv_incorrecto():
+    with pytest.raises(NitInvalidoError) as excinfo:
+        normalizar_nit("900123456-1")
+    assert excinfo.value.mensaje == "El dígito de verificación no corresponde al NIT."
+
+@pytest.mark.parametrize("nit", ["900123456-", "900123456-12", "900123456-X", "-8"])
+def test_normalizar_nit_dv_con_formato_invalido(nit):
+    with pytest.raises(NitInvalidoError) as excinfo:
+        normalizar_nit(nit)
+    assert "Formato de NIT inválido" in excinfo.value.mensaje